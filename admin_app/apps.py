@@ -6,3 +6,6 @@ class AdminAppConfig(AppConfig):
     name = "admin_app"
 
     # salom
+
+    def ready(self):
+        import admin_app.signals  # Dashboard metrics refresh
@@ -0,0 +1,121 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q, Sum
+from django.utils import timezone
+
+from admin_app.models import DashboardMetrics
+from users_app.models import Exercise, Meal, User, UserProgram, UserSubscription
+
+
+logger = logging.getLogger(__name__)
+
+
+REFRESH_PENDING_KEY = 'dashboard:refresh-pending'
+
+UNIQUE_FIELDS = ('date', 'country', 'is_total')
+USER_COUNTERS = ('total_users', 'users_today', 'registered_last_7_days', 'registered_last_month',
+                 'premium_users', 'non_premium_users', 'active_users', 'inactive_users')
+PROGRAM_COUNTERS = ('active_subscriptions', 'inactive_subscriptions', 'income')
+
+
+def refresh_dashboard_metrics(date=None):
+    """
+    Recompute the dashboard snapshot of `date` (today by default) and upsert its rows.
+
+    Two grouped queries, one over User and one over active UserPrograms. The
+    subscription check is an EXISTS, so a user with several subscriptions or
+    programs is never counted twice. Rows are upserted on (date, country,
+    is_total), so overlapping refreshes cannot leave duplicates. Returns the
+    number of country rows written.
+    """
+    date = date or timezone.localdate()
+    now = timezone.now()
+
+    users = (
+        User.objects.order_by().values('country').annotate(
+            total_users=Count('id'),
+            users_today=Count('id', filter=Q(date_joined__date=date)),
+            registered_last_7_days=Count('id', filter=Q(date_joined__date__gte=date - timedelta(days=7))),
+            registered_last_month=Count('id', filter=Q(date_joined__date__gte=date - timedelta(days=30))),
+            premium_users=Count('id', filter=Q(is_premium=True)),
+            non_premium_users=Count('id', filter=Q(is_premium=False)),
+            active_users=Count('id', filter=Q(is_active=True)),
+            inactive_users=Count('id', filter=Q(is_active=False)),
+        )
+    )
+    subscribed = Exists(UserSubscription.objects.filter(user_id=OuterRef('user_id'), is_active=True))
+    programs = (
+        UserProgram.objects.filter(is_active=True, user__isnull=False)
+        .annotate(subscribed=subscribed)
+        .order_by().values('user__country').annotate(
+            active_subscriptions=Count('id', filter=Q(subscribed=True)),
+            inactive_subscriptions=Count('id', filter=Q(subscribed=False)),
+            income=Sum('amount', filter=Q(subscribed=True)),
+        )
+    )
+
+    rows = {}
+
+    def add(country, item, counters):
+        # NULL and '' countries share the '' row
+        row = rows.setdefault(country or '', DashboardMetrics(date=date, country=country or '', refreshed_at=now))
+        for counter in counters:
+            setattr(row, counter, getattr(row, counter) + (item[counter] or 0))
+
+    for item in users:
+        add(item['country'], item, USER_COUNTERS)
+    for item in programs:
+        add(item['user__country'], item, PROGRAM_COUNTERS)
+
+    total = DashboardMetrics(date=date, is_total=True, refreshed_at=now,
+                             total_exercises=Exercise.objects.count(), total_meals=Meal.objects.count())
+    for row in rows.values():
+        for counter in USER_COUNTERS + PROGRAM_COUNTERS:
+            setattr(total, counter, getattr(total, counter) + getattr(row, counter))
+
+    with transaction.atomic():
+        DashboardMetrics.objects.bulk_create(
+            [total, *rows.values()],
+            update_conflicts=True, unique_fields=UNIQUE_FIELDS,
+            update_fields=USER_COUNTERS + PROGRAM_COUNTERS + ('total_exercises', 'total_meals', 'refreshed_at'),
+        )
+        # Countries that no longer have any user
+        DashboardMetrics.objects.filter(date=date, is_total=False).exclude(country__in=rows).delete()
+    return len(rows)
+
+
+def latest_dashboard_metrics():
+    """ The rows of the most recent snapshot (totals row first), in one query. """
+    latest = DashboardMetrics.objects.order_by('-date').values('date')[:1]
+    return list(DashboardMetrics.objects.filter(date=latest).order_by('-is_total', 'country'))
+
+
+# ------------------------------
+# Refresh scheduling
+# ------------------------------
+def _enqueue_refresh():
+    debounce = getattr(settings, 'DASHBOARD_METRICS_DEBOUNCE', 60)
+    try:
+        if not cache.add(REFRESH_PENDING_KEY, True, timeout=debounce):
+            return  # a refresh is already queued and will see this change
+    except Exception as e:
+        logger.warning(f"Dashboard refresh debounce unavailable: {e}")
+
+    from admin_app.tasks import refresh_dashboard_metrics_task
+    try:
+        refresh_dashboard_metrics_task.apply_async(countdown=debounce)
+    except Exception as e:
+        # The periodic refresh (CELERY_BEAT_SCHEDULE) will pick the change up
+        logger.warning(f"Could not enqueue dashboard refresh: {e}")
+
+
+def schedule_dashboard_refresh():
+    """
+    Ask for a refresh of today's snapshot once the current transaction commits.
+    Bursts of changes within DASHBOARD_METRICS_DEBOUNCE seconds share one refresh.
+    """
+    transaction.on_commit(_enqueue_refresh)
@@ -1,3 +1,44 @@
 from django.db import models
 
-# Create your models here.
+
+class DashboardMetrics(models.Model):
+    """
+    Materialized numbers for the admin dashboard (AdminUserStatisticsView), one
+    snapshot per day: a row per country plus one row with is_total=True holding
+    the totals. Written by admin_app.metrics.refresh_dashboard_metrics(); never
+    edited by hand.
+    """
+    date = models.DateField()
+    # '' for users without a country (and on the totals row): never NULL, so the
+    # unique constraint below holds on every backend
+    country = models.CharField(max_length=50, blank=True, default='')
+    is_total = models.BooleanField(default=False)
+
+    total_users = models.PositiveIntegerField(default=0)
+    users_today = models.PositiveIntegerField(default=0)
+    registered_last_7_days = models.PositiveIntegerField(default=0)
+    registered_last_month = models.PositiveIntegerField(default=0)
+    premium_users = models.PositiveIntegerField(default=0)
+    non_premium_users = models.PositiveIntegerField(default=0)
+    active_users = models.PositiveIntegerField(default=0)
+    inactive_users = models.PositiveIntegerField(default=0)
+    active_subscriptions = models.PositiveIntegerField(default=0)
+    inactive_subscriptions = models.PositiveIntegerField(default=0)
+    income = models.BigIntegerField(default=0)
+    # Only filled on the totals row
+    total_exercises = models.PositiveIntegerField(default=0)
+    total_meals = models.PositiveIntegerField(default=0)
+
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-date'], name='dashboard_metrics_date'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'country', 'is_total'], name='dashboard_metrics_unique_row'),
+        ]
+
+    def __str__(self):
+        scope = "all countries" if self.is_total else (self.country or "no country")
+        return f"Dashboard metrics {self.date} ({scope})"
@@ -1,6 +1,56 @@
-from rest_framework.pagination import PageNumberPagination
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
 
 class AdminPageNumberPagination(PageNumberPagination):
     page_size = 10  # You can change this to fit your UI
     page_size_query_param = 'page_size'
     max_page_size = 100
+
+
+def estimated_count(queryset):
+    """
+    Row count of an unfiltered queryset from the planner statistics (pg_class.reltuples)
+    instead of COUNT(*). Returns None when no estimate is available (other databases,
+    a filtered queryset, or a table that was never analyzed).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql' or queryset.query.where:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                       [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    if not row or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(DjangoPaginator):
+    """ Django Paginator whose count comes from estimated_count() when it can. """
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        self.count_is_estimated = estimate is not None
+        return estimate if estimate is not None else super().count
+
+
+class AdminEstimatedCountPagination(AdminPageNumberPagination):
+    """ ?count=estimate: page numbers as usual, but no COUNT(*) over the whole table. """
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_is_estimated'] = getattr(self.page.paginator, 'count_is_estimated', False)
+        return response
+
+
+class AdminUserKeysetPagination(CursorPagination):
+    """ ?pagination=keyset: newest users first, no COUNT and no OFFSET however deep the page. """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-date_joined', '-id')
@@ -0,0 +1,57 @@
+from django.db.models import DEFERRED
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from users_app.models import Exercise, Meal, User, UserProgram, UserSubscription
+from .metrics import schedule_dashboard_refresh
+
+
+# Fields the snapshot is computed from; saves that change none of them (logins,
+# profile edits, progress updates, ...) do not queue a refresh
+DASHBOARD_FIELDS = {
+    User: ('country', 'is_premium', 'is_active'),
+    UserProgram: ('user_id', 'is_active', 'amount'),
+    UserSubscription: ('user_id', 'is_active'),
+}
+
+
+def dashboard_state(instance):
+    # Read __dict__ so a deferred field is not loaded just to be compared
+    return tuple(instance.__dict__.get(field, DEFERRED) for field in DASHBOARD_FIELDS[type(instance)])
+
+
+@receiver(post_init, sender=User)
+@receiver(post_init, sender=UserProgram)
+@receiver(post_init, sender=UserSubscription)
+def remember_dashboard_state(sender, instance, **kwargs):
+    instance._dashboard_state = dashboard_state(instance)
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=UserProgram)
+@receiver(pre_save, sender=UserSubscription)
+def compare_dashboard_state(sender, instance, **kwargs):
+    # Compared before other post_save receivers get a chance to load deferred fields
+    instance._dashboard_changed = dashboard_state(instance) != instance._dashboard_state
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=UserProgram)
+@receiver(post_save, sender=UserSubscription)
+def refresh_dashboard_on_save(sender, instance, created, **kwargs):
+    if created or instance._dashboard_changed:
+        schedule_dashboard_refresh()
+    instance._dashboard_state = dashboard_state(instance)
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=UserProgram)
+@receiver(post_delete, sender=UserSubscription)
+@receiver(post_save, sender=Exercise)
+@receiver(post_delete, sender=Exercise)
+@receiver(post_save, sender=Meal)
+@receiver(post_delete, sender=Meal)
+def refresh_dashboard_on_change(sender, created=True, **kwargs):
+    # Exercises and meals only count towards the totals: edits do not matter
+    if created:
+        schedule_dashboard_refresh()
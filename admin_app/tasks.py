@@ -0,0 +1,11 @@
+from celery import shared_task
+from django.core.cache import cache
+
+from .metrics import REFRESH_PENDING_KEY, refresh_dashboard_metrics
+
+
+@shared_task
+def refresh_dashboard_metrics_task():
+    # Changes made from here on queue the next refresh
+    cache.delete(REFRESH_PENDING_KEY)
+    return refresh_dashboard_metrics()
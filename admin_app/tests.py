@@ -1,3 +1,142 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users_app.models import User
+
+
+class AdminUserListTests(TestCase):
+    url = "/api/admin/admin/users/"
+
+    def setUp(self):
+        User.objects.all().delete()  # users seeded by data migrations
+        self.admin = User.objects.create_user("+998900000000", password="secret", is_staff=True, is_active=True)
+        joined = timezone.now() - timedelta(days=30)
+        self.users = [
+            User.objects.create_user(f"+99890100000{index}", password="secret", is_active=True,
+                                     is_premium=index % 2 == 0, country='Uzbekistan' if index < 3 else 'Russia',
+                                     date_joined=joined + timedelta(days=index))
+            for index in range(6)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def phones(self, response):
+        return [user["email_or_phone"] for user in response.data["results"]]
+
+    def test_default_pages_are_ordered_newest_first(self):
+        response = self.client.get(self.url, {"page_size": 3})
+        self.assertEqual(response.data["count"], 7)
+        self.assertEqual(self.phones(response), [self.admin.email_or_phone, "+998901000005", "+998901000004"])
+
+    def test_keyset_mode_walks_every_user_once(self):
+        seen = []
+        response = self.client.get(self.url, {"pagination": "keyset", "page_size": 2})
+        while True:
+            self.assertNotIn("count", response.data)
+            seen += self.phones(response)
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(seen, [self.admin.email_or_phone] + [f"+99890100000{i}" for i in range(5, -1, -1)])
+
+    def test_filters(self):
+        response = self.client.get(self.url, {"country": "Uzbekistan", "is_premium": "true", "pagination": "keyset"})
+        self.assertEqual(self.phones(response), ["+998901000002", "+998901000000"])
+
+    def test_estimated_count_falls_back_to_exact_count(self):
+        # Without PostgreSQL planner statistics the exact count is used and flagged as such
+        response = self.client.get(self.url, {"count": "estimate"})
+        self.assertEqual(response.data["count"], 7)
+        self.assertFalse(response.data["count_is_estimated"])
+
+
+class DashboardMetricsTests(TestCase):
+    url = "/api/admin/admin/dashboard"
+
+    def setUp(self):
+        from admin_app.models import DashboardMetrics
+        from users_app.models import Program, UserProgram, UserSubscription
+
+        User.objects.all().delete()  # users seeded by data migrations
+        DashboardMetrics.objects.all().delete()
+        self.admin = User.objects.create_user("+998900000000", password="secret", is_staff=True, is_active=True,
+                                              country='Uzbekistan')
+        program = Program.objects.create(program_goal='lose_weight')
+        for index, country in enumerate(('Uzbekistan', 'Uzbekistan', 'Russia')):
+            user = User.objects.create_user(f"+99890200000{index}", password="secret", is_active=True,
+                                            country=country)
+            UserProgram.objects.create(user=user, program=program, amount=100)
+            if index != 1:
+                # Renewal history must not multiply the counts
+                for days in (-40, 20):
+                    UserSubscription.objects.create(user=user, end_date=timezone.now().date() + timedelta(days=days))
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_snapshot_is_read_in_one_query_and_reports_freshness(self):
+        from admin_app.metrics import refresh_dashboard_metrics
+
+        self.assertEqual(refresh_dashboard_metrics(), 2)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        top = response.data["top_section"]
+        self.assertEqual((top["total_users"], top["premium_users"]), (4, 2))
+        self.assertEqual((top["active_subscriptions"], top["inactive_subscriptions"], top["total_income"]),
+                         (2, 1, 200))
+        countries = {row["country"]: row for row in response.data["bottom_section"]}
+        self.assertEqual(countries["Uzbekistan"]["total_users"], 3)
+        self.assertEqual(countries["Uzbekistan"]["active_subscriptions"], 1)
+        self.assertEqual(countries["Russia"]["income"], 100)
+        self.assertFalse(response.data["freshness"]["stale"])
+
+    def test_empty_snapshot_is_built_on_first_request(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["top_section"]["total_users"], 4)
+        self.assertIn("age_seconds", response.data["freshness"])
+
+    def test_changes_queue_one_debounced_refresh(self):
+        from unittest.mock import patch
+        from django.core.cache import cache
+        from admin_app.metrics import REFRESH_PENDING_KEY
+
+        cache.delete(REFRESH_PENDING_KEY)
+        with patch('admin_app.tasks.refresh_dashboard_metrics_task.apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                User.objects.create_user("+998902000009", password="secret")
+                User.objects.create_user("+998902000010", password="secret")
+        apply_async.assert_called_once()
+
+    def test_unrelated_saves_do_not_queue_a_refresh(self):
+        from unittest.mock import patch
+        from django.core.cache import cache
+        from admin_app.metrics import REFRESH_PENDING_KEY
+
+        cache.delete(REFRESH_PENDING_KEY)
+        user = User.objects.get(email_or_phone="+998902000000")
+        with patch('admin_app.tasks.refresh_dashboard_metrics_task.apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                user.first_name = "Ali"
+                user.save()
+                User.objects.only('id').get(pk=user.pk).save()
+            apply_async.assert_not_called()
+            with self.captureOnCommitCallbacks(execute=True):
+                user.country = 'Russia'
+                user.save()
+            apply_async.assert_called_once()
+
+    def test_overlapping_refreshes_upsert_the_same_rows(self):
+        from admin_app.metrics import refresh_dashboard_metrics
+        from admin_app.models import DashboardMetrics
 
-# Create your tests here.
+        refresh_dashboard_metrics()
+        User.objects.filter(country='Russia').update(country=None)
+        self.assertEqual(refresh_dashboard_metrics(), 2)
+        self.assertEqual(refresh_dashboard_metrics(), 2)
+        rows = DashboardMetrics.objects.filter(is_total=False)
+        self.assertEqual(sorted(rows.values_list('country', flat=True)), ['', 'Uzbekistan'])
+        self.assertEqual(DashboardMetrics.objects.filter(is_total=True).count(), 1)
+        countries = {row["country"]: row for row in self.client.get(self.url).data["bottom_section"]}
+        self.assertEqual(countries[None]["income"], 100)
@@ -1,18 +1,20 @@
 from django.shortcuts import render
-from django.utils.timezone import now, timedelta
+from django.utils.timezone import now
 from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView
-from django.db.models import Count, Sum, Q
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
-from users_app.models import User, UserProgram, SessionCompletion, Session, Meal, Exercise
+from users_app.models import User, SessionCompletion, Session, Meal
 from food.serializers import MealListSerializer
 from exercise.serializers import ExerciseBlockListSerializer
-from .pagination import AdminPageNumberPagination
+from django.conf import settings
+from .metrics import latest_dashboard_metrics, refresh_dashboard_metrics, schedule_dashboard_refresh
+from .pagination import (AdminPageNumberPagination, AdminEstimatedCountPagination,
+                         AdminUserKeysetPagination)
 from users_app.serializers import UserSerializer
 from rest_framework.permissions import AllowAny  # ✅ Add this line
 from rest_framework.generics import GenericAPIView  # ✅ Add this import
@@ -31,102 +33,64 @@ from django.utils import timezone
 
 
 class AdminUserStatisticsView(APIView):
+    """
+    Dashboard numbers, read from the materialized snapshot (admin_app.metrics) in one
+    query. The snapshot is refreshed by signals and a periodic task; a stale one is
+    still served, with a refresh queued, and "freshness" tells how old it is.
+    """
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        today = timezone.now().date()
-        seven_days_ago = today - timedelta(days=7)
-        one_month_ago = today - timedelta(days=30)
-
-        # Top section statistics
-        total_users = User.objects.count()
-        users_today = User.objects.filter(date_joined__date=today).count()
-        premium_users = User.objects.filter(is_premium=True).count()
-        non_premium_users = User.objects.filter(is_premium=False).count()
-        total_exercises = Exercise.objects.count()
-        total_meals = Meal.objects.count()
-        registered_last_7_days = User.objects.filter(date_joined__gte=seven_days_ago).count()
-        registered_last_month = User.objects.filter(date_joined__gte=one_month_ago).count()
-
-        # Replace is_paid filters with actual related field lookups
-        active_subscriptions = UserProgram.objects.filter(
-            is_active=True,
-            user__subscriptions__is_active=True,
-            user__subscriptions__end_date__gte=today
-        ).distinct().count()
-
-        inactive_subscriptions = UserProgram.objects.filter(
-            is_active=True
-        ).exclude(
-            user__subscriptions__is_active=True,
-            user__subscriptions__end_date__gte=today
-        ).distinct().count()
-
-        total_income_qs = UserProgram.objects.filter(
-            user__subscriptions__is_active=True,
-            user__subscriptions__end_date__gte=today
-        ).aggregate(total_income=Sum('amount'))
-        total_income = total_income_qs["total_income"] if total_income_qs["total_income"] is not None else 0
+        rows = latest_dashboard_metrics()
+        if not rows:
+            # First call on an empty table
+            refresh_dashboard_metrics()
+            rows = latest_dashboard_metrics()
+
+        total, countries = rows[0], rows[1:]
+        age_seconds = int((timezone.now() - total.refreshed_at).total_seconds())
+        stale = total.date < timezone.localdate() or age_seconds > getattr(settings, 'DASHBOARD_METRICS_MAX_AGE', 900)
+        if stale:
+            schedule_dashboard_refresh()
 
         top_section_data = {
-            "users_today": users_today,
-            "total_users": total_users,
-            "premium_users": premium_users,
-            "non_premium_users": non_premium_users,
-            "total_exercises": total_exercises,
-            "total_meals": total_meals,
-            "registered_last_7_days": registered_last_7_days,
-            "registered_last_month": registered_last_month,
-            "active_subscriptions": active_subscriptions,
-            "inactive_subscriptions": inactive_subscriptions,
-            "total_income": total_income,
+            "users_today": total.users_today,
+            "total_users": total.total_users,
+            "premium_users": total.premium_users,
+            "non_premium_users": total.non_premium_users,
+            "total_exercises": total.total_exercises,
+            "total_meals": total.total_meals,
+            "registered_last_7_days": total.registered_last_7_days,
+            "registered_last_month": total.registered_last_month,
+            "active_subscriptions": total.active_subscriptions,
+            "inactive_subscriptions": total.inactive_subscriptions,
+            "total_income": total.income,
         }
 
-        # Bottom section: Grouped by country
-        countries_data = (
-            User.objects.values("country")
-            .annotate(
-                total_users=Count("id"),
-                subscribers=Count("id", filter=Q(is_premium=True)),
-                non_subscribers=Count("id", filter=Q(is_premium=False)),
-                active_users=Count("id", filter=Q(is_active=True)),
-                inactive_users=Count("id", filter=Q(is_active=False)),
-                active_subscriptions=Count("user_programs", filter=Q(
-                    user_programs__is_active=True,
-                    subscriptions__is_active=True,
-                    subscriptions__end_date__gte=today
-                )),
-                inactive_subscriptions=Count("user_programs", filter=~Q(
-                    subscriptions__is_active=True,
-                    subscriptions__end_date__gte=today
-                )),
-                income=Sum("user_programs__amount", filter=Q(
-                    user_programs__is_active=True,
-                    subscriptions__is_active=True,
-                    subscriptions__end_date__gte=today
-                )),
-            )
-        )
-
         bottom_section_data = [
             {
-                "country": country["country"],
-                "total_users": country["total_users"],
-                "subscribers": country["subscribers"],
-                "non_subscribers": country["non_subscribers"],
-                "active_users": country["active_users"],
-                "inactive_users": country["inactive_users"],
-                "active_subscriptions": country["active_subscriptions"],
-                "inactive_subscriptions": country["inactive_subscriptions"],
-                "income": country["income"] or 0,
+                "country": country.country or None,
+                "total_users": country.total_users,
+                "subscribers": country.premium_users,
+                "non_subscribers": country.non_premium_users,
+                "active_users": country.active_users,
+                "inactive_users": country.inactive_users,
+                "active_subscriptions": country.active_subscriptions,
+                "inactive_subscriptions": country.inactive_subscriptions,
+                "income": country.income,
             }
-            for country in countries_data
+            for country in countries
         ]
 
         return Response(
             {
                 "top_section": top_section_data,
                 "bottom_section": bottom_section_data,
+                "freshness": {
+                    "refreshed_at": total.refreshed_at,
+                    "age_seconds": age_seconds,
+                    "stale": stale,
+                },
             },
             status=200,
         )
@@ -134,11 +98,47 @@ class AdminUserStatisticsView(APIView):
 
 ### **🔹 Admin User Management (Paginated User List)**
 class AdminGetAllUsersView(ListAPIView):
+    """
+    Users, newest first. Optional filters: ?country=, ?is_premium=true|false, ?is_active=true|false
+    (each backed by an index on User together with the (date_joined, id) order).
+
+    Pagination modes:
+    - default:             page numbers with an exact count
+    - ?count=estimate:     page numbers, count read from the planner statistics
+    - ?pagination=keyset:  opaque next/previous cursors, no count and no OFFSET
+    """
     permission_classes = [IsAdminUser]
     queryset = User.objects.all()
     pagination_class = AdminPageNumberPagination
     serializer_class = UserSerializer  # 🔹 You need a `UserSerializer`
 
+    BOOLEAN_FILTERS = ('is_premium', 'is_active')
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if params.get('pagination') == 'keyset':
+                self._paginator = AdminUserKeysetPagination()
+            elif params.get('count') == 'estimate':
+                self._paginator = AdminEstimatedCountPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_queryset(self):
+        queryset = User.objects.order_by('-date_joined', '-id')
+        params = self.request.query_params
+        if params.get('country'):
+            queryset = queryset.filter(country=params['country'])
+        for field in self.BOOLEAN_FILTERS:
+            value = params.get(field, '').lower()
+            if value in ('true', '1'):
+                queryset = queryset.filter(**{field: True})
+            elif value in ('false', '0'):
+                queryset = queryset.filter(**{field: False})
+        return queryset
+
 
 
 class AdminLoginView(GenericAPIView):  # ✅ Change from APIView to GenericAPIView
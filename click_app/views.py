@@ -7,6 +7,7 @@ from rest_framework.response import Response
 from pyclick import PyClick
 from pyclick.views import PyClickMerchantAPIView
 from users_app.models import UserSubscription
+from users_app.entitlements import invalidate_entitlements
 from datetime import timedelta
 from .serializers import ClickOrderSerializer
 import hashlib
@@ -116,6 +117,7 @@ class OrderCheckAndPayment(PyClick):
                 user=user_subscription.user,
                 is_active=True
             ).exclude(id=user_subscription.id).update(is_active=False, end_date=None)
+            invalidate_entitlements(user_subscription.user_id)
 
             user_subscription.extend_subscription(add_days)
             user_subscription.is_active = True
@@ -454,6 +456,7 @@ class ClickCompleteAPIView(APIView):
                         user=subscription.user,
                         is_active=True
                     ).exclude(id=subscription.id).update(is_active=False, end_date=None)
+                    invalidate_entitlements(subscription.user_id)
 
                     add_days = SUBSCRIPTION_DAYS.get(
                         subscription.pending_extension_type or subscription.subscription_type, 30)
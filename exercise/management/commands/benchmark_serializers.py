@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from exercise.projections import (ExerciseBlockListProjection, ExerciseListProjection, MealListProjection,
+                                  SessionPKProjection)
+from exercise.serializers import ExerciseBlockListSerializer, ExerciseListSerializer, SessionPKSerializer
+from food.serializers import MealListSerializer
+from users_app.models import Exercise, ExerciseBlock, Meal, Session
+
+
+class Command(BaseCommand):
+    help = "Compare the per-row cost of the list serializers and their .values() projections on existing data."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500, help="Rows serialized per run")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per serializer; the best one is reported")
+        parser.add_argument('--language', default='en')
+
+    def handle(self, *args, **options):
+        cases = [
+            ("exercises", Exercise.objects.all(), ExerciseListSerializer, ExerciseListProjection),
+            ("blocks", ExerciseBlock.objects.prefetch_related('exercises'),
+             ExerciseBlockListSerializer, ExerciseBlockListProjection),
+            ("meals", Meal.objects.prefetch_related('steps'), MealListSerializer, MealListProjection),
+            ("sessions", Session.objects.select_related('block').prefetch_related('meals'),
+             SessionPKSerializer, SessionPKProjection),
+        ]
+        context = {'language': options['language']}
+
+        for name, queryset, serializer_class, projection_class in cases:
+            queryset = queryset.order_by('pk')[:options['limit']]
+            rows = queryset.count()
+            if not rows:
+                self.stdout.write(f"{name}: no rows, skipped")
+                continue
+            serializer = self.measure(serializer_class, queryset, context, options['repeat'])
+            projection = self.measure(projection_class, queryset, context, options['repeat'])
+            self.stdout.write(
+                f"{name} ({rows} rows): "
+                f"serializer {serializer[0] / rows * 1e6:.1f} us/row ({serializer[1]} queries), "
+                f"projection {projection[0] / rows * 1e6:.1f} us/row ({projection[1]} queries), "
+                f"{serializer[0] / projection[0]:.1f}x"
+            )
+
+    @staticmethod
+    def measure(serializer_class, queryset, context, repeat):
+        """ (best wall time in seconds, queries) of serializing a fresh copy of `queryset`. """
+        best = None
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                serializer_class(queryset.all(), many=True, context=context).data
+                elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, len(queries)
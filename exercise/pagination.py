@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Keyset (cursor) pagination for the user-facing listings. Pages are fetched with
+    `?page_size=` and followed through the opaque `next`/`previous` links, so deep
+    pages cost an index seek instead of an OFFSET scan.
+
+    Opt-in: without `cursor` or `page_size` in the query string the full list is
+    returned as before, so existing clients keep working.
+    """
+    page_size = getattr(settings, 'CURSOR_PAGE_SIZE', 20)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'CURSOR_MAX_PAGE_SIZE', 100)
+    ordering = ('id',)
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class SessionCursorPagination(KeysetCursorPagination):
+    """
+    Sessions page on the composite key (session_number, id). Every program numbers
+    its sessions from 1, so session_number alone ties across programs, and DRF's
+    cursor (position on the first ordering field plus an offset into the ties)
+    would scan them. Here the cursor holds both values of the boundary row and
+    each page is a single seek past it.
+    """
+    ordering = ('session_number', 'id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self._key(self.cursor.position) if self.cursor and self.cursor.position else None
+
+        if position is not None:
+            number, pk = position
+            if reverse:
+                after = Q(session_number__lt=number) | Q(session_number=number, id__lt=pk)
+            else:
+                after = Q(session_number__gt=number) | Q(session_number=number, id__gt=pk)
+            queryset = queryset.filter(after)
+        queryset = queryset.order_by('-session_number', '-id') if reverse else queryset.order_by(*self.ordering)
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        if self.page:
+            self.first_position, self.last_position = self._position(self.page[0]), self._position(self.page[-1])
+        else:
+            # An empty page links back to where it started
+            self.first_position = self.last_position = self.cursor.position if self.cursor else None
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.last_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.first_position))
+
+    @staticmethod
+    def _position(session):
+        return f"{session.session_number}.{session.pk}"
+
+    def _key(self, position):
+        try:
+            number, pk = position.split('.')
+            return int(number), int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
@@ -0,0 +1,224 @@
+from collections import defaultdict
+
+from django.db import models
+from django.db.models import F, QuerySet, Value
+from django.db.models.functions import Coalesce, NullIf
+from rest_framework import serializers
+from rest_framework.utils.field_mapping import ClassLookupDict
+
+from users_app.choice_labels import choice_label
+from users_app.models import Exercise, ExerciseBlock, Meal, MealSteps, Session
+
+
+# ------------------------------
+# Read-only projections
+# ------------------------------
+# Drop-in replacements for the list serializers of the hot read endpoints. They
+# read .values() rows instead of model instances, pick the language in SQL and
+# build each output dict in one pass. Output is the same as the ModelSerializer
+# they stand in for (ProjectionParityTests keeps it that way); writes still go
+# through the DRF serializers.
+_drf_field_classes = ClassLookupDict(serializers.ModelSerializer.serializer_field_mapping)
+
+# DRF fields whose to_representation() leaves a database value unchanged
+_PASSTHROUGH = (serializers.CharField, serializers.IntegerField, serializers.BooleanField)
+
+
+def translated_column(model, field, language):
+    """ `<field>_<language>` unless empty, else `<field>`: translate_field() as an SQL expression. """
+    column = f"{field}_{language}"
+    if not any(f.name == column for f in model._meta.concrete_fields):
+        return F(field)
+    return Coalesce(NullIf(column, Value('')), F(field), output_field=models.TextField())
+
+
+class ProjectionSerializer:
+    """
+    Serializer-compatible (instance, many, context) -> .data over .values() rows.
+
+    fields:     output keys, in order
+    translated: keys read from <key>_<language>, falling back to <key>
+    choices:    keys rendered with choice_label()
+    files:      output key -> file column, rendered as an (absolute) URL
+    nested:     output key -> method name; the method gets the parent pks and
+                returns {parent pk: value}
+    Any other key is a model column rendered as the ModelSerializer would.
+    """
+    model = None
+    fields = ()
+    translated = ()
+    choices = ()
+    files = {}
+    nested = {}
+
+    _order = None
+
+    def __init__(self, instance=None, many=False, context=None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+        self.language = self.context.get('language', 'en')
+        request = self.context.get('request')
+        self.base_url = request.build_absolute_uri('/')[:-1] if request else ''
+
+    @property
+    def data(self):
+        items = self.render(self.queryset())
+        if self.many:
+            return [data for _, data in items]
+        return items[0][1] if items else None
+
+    def queryset(self):
+        if isinstance(self.instance, QuerySet):
+            return self.instance.prefetch_related(None)
+        # A page or a single object: load the same rows again, in the same order
+        objects = self.instance if self.many else [self.instance]
+        pks = [obj.pk for obj in objects]
+        order = {pk: index for index, pk in enumerate(pks)}
+        self._order = order.__getitem__
+        return self.model.objects.filter(pk__in=pks)
+
+    def render(self, queryset):
+        """ [(pk, data), ...] for the rows of `queryset`. """
+        plan, columns, expressions = self._plan()
+        rows = list(queryset.values('pk', *columns, **expressions))
+        if self._order:
+            rows.sort(key=lambda row: self._order(row['pk']))
+        pks = [row['pk'] for row in rows]
+        nested = {key: getattr(self, method)(pks) for key, method in self.nested.items()}
+
+        items = []
+        for row in rows:
+            data = {}
+            for key, source, render in plan:
+                if source is None:
+                    data[key] = nested[key].get(row['pk'], [])
+                    continue
+                value = row[source]
+                data[key] = value if value is None or render is None else render(value)
+            items.append((row['pk'], data))
+        return items
+
+    def _plan(self):
+        """ One (key, source column or None if nested, render) per output key, plus the columns to load. """
+        model_fields = {f.name: f for f in self.model._meta.get_fields()}
+        plan, columns, expressions = [], [], {}
+        for key in self.fields:
+            if key in self.nested:
+                plan.append((key, None, None))
+            elif key in self.translated:
+                alias = f"_{key}_{self.language}"
+                expressions[alias] = translated_column(self.model, key, self.language)
+                plan.append((key, alias, None))
+            elif key in self.choices:
+                columns.append(key)
+                plan.append((key, key, lambda value: choice_label(value, self.language)))
+            elif key in self.files:
+                column = self.files[key]
+                columns.append(column)
+                plan.append((key, column, self._file_url(model_fields[column].storage)))
+            else:
+                columns.append(key)
+                plan.append((key, key, self._field_render(model_fields[key])))
+        return plan, columns, expressions
+
+    def _file_url(self, storage):
+        base_url = self.base_url
+
+        def render(name):
+            if not name:
+                return None  # an empty file column is '' rather than NULL
+            url = storage.url(name)
+            return base_url + url if base_url and url.startswith('/') else url
+        return render
+
+    @staticmethod
+    def _field_render(model_field):
+        if model_field.is_relation:
+            return None  # a foreign key column is already the pk
+        if isinstance(model_field, models.DecimalField):
+            field = serializers.DecimalField(model_field.max_digits, model_field.decimal_places)
+        else:
+            field = _drf_field_classes[model_field]()
+        return None if isinstance(field, _PASSTHROUGH) else field.to_representation
+
+    def _m2m(self, field, pks, projection):
+        """ {parent pk: [child data, ...]} over a many-to-many field, children in link order. """
+        through = field.remote_field.through
+        parent_column = f"{field.m2m_field_name()}_id"
+        child_column = f"{field.m2m_reverse_field_name()}_id"
+        links = list(
+            through.objects.filter(**{f"{parent_column}__in": pks})
+            .order_by('pk').values_list(parent_column, child_column)
+        )
+        child = projection(many=True, context=self.context)
+        children = dict(child.render(child.model.objects.filter(pk__in={pk for _, pk in links})))
+        result = defaultdict(list)
+        for parent_pk, child_pk in links:
+            if child_pk in children:
+                result[parent_pk].append(children[child_pk])
+        return result
+
+
+class ExerciseListProjection(ProjectionSerializer):
+    """ ExerciseListSerializer """
+    model = Exercise
+    fields = ('id', 'name', 'sequence_number', 'exercise_time', 'description', 'image_url', 'exercise_type')
+    translated = ('name', 'description')
+    choices = ('exercise_type',)
+    files = {'image_url': 'image'}
+
+
+class ExerciseBlockListProjection(ProjectionSerializer):
+    """ ExerciseBlockListSerializer """
+    model = ExerciseBlock
+    fields = ('id', 'block_name', 'block_image_url', 'block_kkal', 'block_water_amount', 'description',
+              'video_url', 'block_time', 'calories_burned', 'exercises')
+    translated = ('block_name', 'description')
+    files = {'block_image_url': 'block_image'}
+    nested = {'exercises': 'block_exercises'}
+
+    def block_exercises(self, pks):
+        return self._m2m(ExerciseBlock.exercises.field, pks, ExerciseListProjection)
+
+
+class MealListProjection(ProjectionSerializer):
+    """ MealListSerializer """
+    model = Meal
+    fields = ('id', 'meal_type', 'food_name', 'calories', 'water_content', 'preparation_time', 'description',
+              'video_url', 'food_photo_url', 'steps', 'goal_type')
+    translated = ('food_name', 'description')
+    choices = ('meal_type', 'goal_type')
+    files = {'food_photo_url': 'food_photo'}
+    nested = {'steps': 'meal_steps'}
+
+    def meal_steps(self, pks):
+        language = self.language
+        steps = defaultdict(list)
+        for step in MealSteps.objects.filter(meal_id__in=pks).order_by('step_number', 'pk').values(
+            'id', 'meal_id', 'step_time', 'step_number',
+            _title=translated_column(MealSteps, 'title', language),
+            _text=translated_column(MealSteps, 'text', language),
+        ):
+            steps[step['meal_id']].append({
+                "id": step['id'],
+                "title": step['_title'],
+                "text": step['_text'],
+                "step_time": step['step_time'],
+                "step_number": step['step_number'],
+            })
+        return steps
+
+
+class SessionPKProjection(ProjectionSerializer):
+    """ SessionPKSerializer (read side) """
+    model = Session
+    fields = ('id', 'program', 'session_number', 'block', 'meals')
+    nested = {'meals': 'session_meals'}
+
+    def session_meals(self, pks):
+        links = Session.meals.through.objects.filter(session_id__in=pks).order_by('pk')
+        meals = defaultdict(list)
+        for session_id, meal_id in links.values_list('session_id', 'meal_id'):
+            meals[session_id].append(meal_id)
+        return meals
@@ -4,15 +4,14 @@ from users_app.models import (
     Program, Session, Exercise, UserProgress, Meal,
     UserProgram, SessionCompletion, ExerciseBlock
 )
-from googletrans import Translator
 from datetime import timedelta
 from threading import Timer
 from django.utils.timezone import now
 from celery import shared_task
 from drf_extra_fields.fields import Base64ImageField
-from users_app.models import translate_text
-
-translator = Translator()
+from users_app.choice_labels import choice_label
+from users_app.translation import translation_batch
+from django.db import transaction
 
 def translate_field(instance, field_name, language):
     translated_field = f"{field_name}_{language}"
@@ -46,7 +45,7 @@ class ProgramSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         data = super().to_representation(instance)
         language = self.context.get('language', 'en')
-        data['program_goal'] = translate_text(instance.get_program_goal_display(), language)
+        data['program_goal'] = choice_label(instance.program_goal, language)
         return data
 
 
@@ -244,7 +243,7 @@ class ExerciseListSerializer(serializers.ModelSerializer):
         language = self.context.get('language', 'en')
         data['name'] = translate_field(instance, 'name', language)
         data['description'] = translate_field(instance, 'description', language)
-        data['exercise_type'] = translate_text(instance.get_exercise_type_display(), language)
+        data['exercise_type'] = choice_label(instance.exercise_type, language)
         return data
 
 
@@ -272,7 +271,7 @@ class ExerciseDetailSerializer(serializers.ModelSerializer):
         language = self.context.get('language', 'en')
         data['name'] = translate_field(instance, 'name', language)
         data['description'] = translate_field(instance, 'description', language)
-        data['exercise_type'] = translate_text(instance.get_exercise_type_display(), language)
+        data['exercise_type'] = choice_label(instance.exercise_type, language)
         return data
 
 
@@ -293,7 +292,7 @@ class ExerciseCreateSerializer(serializers.ModelSerializer):
         language = self.context.get('language', 'en')
         data['name'] = translate_field(instance, 'name', language)
         data['description'] = translate_field(instance, 'description', language)
-        data['exercise_type'] = translate_text(instance.get_exercise_type_display(), language)
+        data['exercise_type'] = choice_label(instance.exercise_type, language)
         return data
 
 
@@ -311,7 +310,7 @@ class ExerciseUpdateSerializer(serializers.ModelSerializer):
         language = self.context.get('language', 'en')
         data['name'] = translate_field(instance, 'name', language)
         data['description'] = translate_field(instance, 'description', language)
-        data['exercise_type'] = translate_text(instance.get_exercise_type_display(), language)
+        data['exercise_type'] = choice_label(instance.exercise_type, language)
         return data
 
 
@@ -427,11 +426,13 @@ class ExerciseBlockCreateSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         exercises_data = validated_data.pop('exercises', [])
-        block = ExerciseBlock.objects.create(**validated_data)
-        for idx, ex_data in enumerate(exercises_data, start=1):
-            ex_data['sequence_number'] = idx
-            exercise = Exercise.objects.create(**ex_data)
-            block.exercises.add(exercise)
+        # One transaction and one translation task for the block and all its exercises
+        with transaction.atomic(), translation_batch():
+            block = ExerciseBlock.objects.create(**validated_data)
+            for idx, ex_data in enumerate(exercises_data, start=1):
+                ex_data['sequence_number'] = idx
+                exercise = Exercise.objects.create(**ex_data)
+                block.exercises.add(exercise)
         return block
 
 
@@ -468,25 +469,26 @@ class ExerciseBlockUpdateSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         exercises_data = validated_data.pop('exercises', None)
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-
-        if exercises_data is not None:
-            existing_exercises = {ex.id: ex for ex in instance.exercises.all()}
-            for idx, ex_data in enumerate(exercises_data, start=1):
-                ex_id = ex_data.get('id')
-                if ex_id and ex_id in existing_exercises:
-                    exercise_instance = existing_exercises[ex_id]
-                    for field, val in ex_data.items():
-                        if field != 'id':
-                            setattr(exercise_instance, field, val)
-                    exercise_instance.sequence_number = idx
-                    exercise_instance.save()
-                else:
-                    ex_data['sequence_number'] = idx
-                    new_exercise = Exercise.objects.create(**ex_data)
-                    instance.exercises.add(new_exercise)
+        with transaction.atomic(), translation_batch():
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+
+            if exercises_data is not None:
+                existing_exercises = {ex.id: ex for ex in instance.exercises.all()}
+                for idx, ex_data in enumerate(exercises_data, start=1):
+                    ex_id = ex_data.get('id')
+                    if ex_id and ex_id in existing_exercises:
+                        exercise_instance = existing_exercises[ex_id]
+                        for field, val in ex_data.items():
+                            if field != 'id':
+                                setattr(exercise_instance, field, val)
+                        exercise_instance.sequence_number = idx
+                        exercise_instance.save()
+                    else:
+                        ex_data['sequence_number'] = idx
+                        new_exercise = Exercise.objects.create(**ex_data)
+                        instance.exercises.add(new_exercise)
 
         return instance
 
@@ -0,0 +1,9 @@
+from django.dispatch import receiver
+
+from users_app.caching import content_version_changed
+from .snapshots import schedule_snapshot_rebuild
+
+
+@receiver(content_version_changed)
+def rebuild_snapshots_on_content_change(sender, **kwargs):
+    schedule_snapshot_rebuild()
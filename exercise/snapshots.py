@@ -0,0 +1,245 @@
+import json
+import logging
+import mmap
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Prefetch
+
+from exercise.serializers import ExerciseBlockDetailSerializer
+from food.serializers import MealDetailSerializer
+from users_app.caching import get_content_version
+from users_app.models import Exercise, Meal, Program, Session, User
+from users_app.translation import TRANSLATION_LANGUAGES
+
+
+logger = logging.getLogger(__name__)
+
+
+REBUILD_PENDING_KEY = 'snapshots:rebuild-pending'
+
+
+# ------------------------------
+# Compiling
+# ------------------------------
+# One file per (program, goal, language, content version):
+#
+#     {"program_id": 1, "goal": "lose_weight", "language": "en", "version": 17,
+#      "sessions": {"1": [offset, length], ...}}\n
+#     [{"id": 3, "session_number": 1, "block": {...}, "meals": [...]}, ...]
+#
+# The first line is the index; offsets are relative to the body that follows it.
+# The body is a JSON array of every session of the program, and each session's
+# range is a JSON object on its own, so both are served as bytes without parsing.
+# Image URLs are stored relative (no request while compiling). Like the rest of the
+# program endpoints, a snapshot only holds the exercises and meals of its goal.
+def snapshot_dir():
+    return getattr(settings, 'PROGRAM_SNAPSHOT_DIR', os.path.join(settings.BASE_DIR, 'snapshots'))
+
+
+def snapshot_path(program_id, goal, language, version):
+    return os.path.join(snapshot_dir(), f"program-{program_id}-{goal}-{language}-{version}.json")
+
+
+def program_sessions_data(program_id, goal, language):
+    """
+    Every session of the program with its block (and the exercises of `goal`) and
+    meals of `goal` (and their steps), serialized.
+    """
+    sessions = (
+        Session.objects.filter(program_id=program_id)
+        .select_related('block')
+        .prefetch_related(
+            Prefetch('block__exercises', queryset=Exercise.objects.filter(exercise_type=goal)),
+            Prefetch('meals', queryset=Meal.objects.filter(goal_type=goal).prefetch_related('steps')),
+        )
+        .order_by('session_number')
+    )
+    context = {'language': language}
+    data = []
+    for session in sessions:
+        block = getattr(session, 'block', None)
+        data.append({
+            "id": session.id,
+            "session_number": session.session_number,
+            "block": ExerciseBlockDetailSerializer(block, context=context).data if block else None,
+            "meals": MealDetailSerializer(session.meals.all(), many=True, context=context).data,
+        })
+    return data
+
+
+def compile_program_snapshot(program_id, goal, language, version):
+    """
+    Write the snapshot of one program for one goal in one language for `version`
+    and return its path. The file is written next to its final name and moved into place with
+    os.replace(), so readers only ever see a complete file.
+    """
+    chunks, index, offset = [], {}, 1  # body starts with "["
+    for item in program_sessions_data(program_id, goal, language):
+        chunk = json.dumps(item, cls=DjangoJSONEncoder, ensure_ascii=False).encode('utf-8')
+        if chunks:
+            offset += 1  # ","
+        index[str(item["session_number"])] = [offset, len(chunk)]
+        chunks.append(chunk)
+        offset += len(chunk)
+    header = {"program_id": program_id, "goal": goal, "language": language, "version": version,
+              "sessions": index}
+
+    path = snapshot_path(program_id, goal, language, version)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            f.write(b'[' + b','.join(chunks) + b']')
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return path
+
+
+def compile_all_snapshots(version=None):
+    """
+    Compile every active program for every goal in every language for the current
+    content version, then remove the files of older versions. Returns the number of
+    files written.
+    """
+    version = get_content_version() if version is None else version
+    if version is None:
+        logger.warning("Content version unavailable, program snapshots not compiled")
+        return 0
+    newest = newest_snapshot_version()
+    if newest is not None and newest > version:
+        # This process still has an older version memoized; the newer files stay
+        logger.info(f"Snapshots of version {newest} already on disk, version {version} not compiled")
+        return 0
+    written = 0
+    for program_id in Program.objects.filter(is_active=True).values_list('id', flat=True):
+        for goal, _ in User.GOAL_CHOICES:
+            for language in TRANSLATION_LANGUAGES:
+                compile_program_snapshot(program_id, goal, language, version)
+                written += 1
+    remove_stale_snapshots(version)
+    return written
+
+
+def snapshot_names():
+    try:
+        return [name for name in os.listdir(snapshot_dir()) if name.startswith('program-')]
+    except FileNotFoundError:
+        return []
+
+
+def newest_snapshot_version():
+    versions = []
+    for name in snapshot_names():
+        try:
+            versions.append(int(name[:-len('.json')].rsplit('-', 1)[1]))
+        except (IndexError, ValueError):
+            continue
+    return max(versions, default=None)
+
+
+def remove_stale_snapshots(version):
+    # Workers that still map an old file keep reading it; unlinking only drops the name
+    suffix = f"-{version}.json"
+    for name in snapshot_names():
+        if not name.endswith(suffix):
+            try:
+                os.unlink(os.path.join(snapshot_dir(), name))
+            except OSError as e:
+                logger.warning(f"Could not remove stale snapshot {name}: {e}")
+
+
+# ------------------------------
+# Reading
+# ------------------------------
+class ProgramSnapshot:
+    """ A compiled snapshot mapped read-only into memory; every worker maps the same pages. """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header_end = self.map.find(b'\n')
+        header = json.loads(self.map[:header_end])
+        self.version = header['version']
+        self.index = header['sessions']
+        self.body_start = header_end + 1
+
+    def program_size(self):
+        return len(self.map) - self.body_start
+
+    def program_chunks(self, chunk_size=64 * 1024):
+        """ All sessions, as a JSON array, in views over the mapping: nothing is copied up front. """
+        view = memoryview(self.map)
+        for start in range(self.body_start, len(self.map), chunk_size):
+            yield view[start:start + chunk_size]
+
+    def session_bytes(self, session_number):
+        """ One session as a JSON object, or None if the program has no such session. """
+        entry = self.index.get(str(session_number))
+        if entry is None:
+            return None
+        start = self.body_start + entry[0]
+        return self.map[start:start + entry[1]]
+
+
+_snapshots = {}
+
+
+def get_program_snapshot(program_id, goal, language):
+    """
+    The snapshot of the program for `goal` and the current content version. Once
+    the version moves on, the next call maps the new file and drops the old
+    mapping, so a request never mixes two versions. Returns None if the content
+    version is unavailable or the file is not compiled (yet, or any more): the
+    caller serves that request from the database, and a miss queues the
+    debounced rebuild rather than compiling inside the request.
+    """
+    version = get_content_version()
+    if version is None:
+        return None
+    key = (program_id, goal, language)
+    snapshot = _snapshots.get(key)
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    # Opened directly: a rebuild may remove the file at any time
+    try:
+        snapshot = ProgramSnapshot(snapshot_path(program_id, goal, language, version))
+    except FileNotFoundError:
+        _enqueue_rebuild()
+        return None
+    # Two threads may map the same file at once; either mapping is fine to keep
+    _snapshots[key] = snapshot
+    return snapshot
+
+
+# ------------------------------
+# Rebuild scheduling
+# ------------------------------
+def _enqueue_rebuild():
+    debounce = getattr(settings, 'PROGRAM_SNAPSHOT_DEBOUNCE', 30)
+    try:
+        if not cache.add(REBUILD_PENDING_KEY, True, timeout=debounce):
+            return  # a rebuild is already queued and will see this change
+    except Exception as e:
+        logger.warning(f"Snapshot rebuild debounce unavailable: {e}")
+
+    from exercise.tasks import compile_program_snapshots_task
+    try:
+        compile_program_snapshots_task.apply_async(countdown=debounce)
+    except Exception as e:
+        # Readers fall back to the database until the next rebuild
+        logger.warning(f"Could not enqueue program snapshot rebuild: {e}")
+
+
+def schedule_snapshot_rebuild():
+    """ Recompile the program snapshots once the current transaction commits (debounced). """
+    transaction.on_commit(_enqueue_rebuild)
@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+from django.db.models import F, IntegerField, Sum, Value
+from django.db.models.functions import Cast, ExtractDay, Floor, TruncWeek
+
+from users_app.models import UserProgress
+
+
+GRANULARITIES = ('week', 'isoweek', 'day')
+
+
+def _date_range(start_date, end_date):
+    current = start_date
+    while current <= end_date:
+        yield current
+        current += timedelta(days=1)
+
+
+def progress_by_day(user, start_date, end_date):
+    """
+    {date: {"completed_sessions", "total_calories_burned", "calories_gained"}} from the
+    user's daily rollup (UserProgress). One query over at most one row per day.
+    """
+    rows = (
+        UserProgress.objects
+        .filter(user=user, date__range=[start_date, end_date])
+        .values('date', 'completed_sessions', 'total_calories_burned', 'calories_gained')
+    )
+    return {row['date']: row for row in rows}
+
+
+def daily_statistics(user, start_date, end_date, include_calories=True):
+    """
+    Per-day statistics for every date in [start_date, end_date], days without
+    activity included:
+
+        {"2025-03-01": {"session_complete": true,
+                        "total_calories_burned": 120.0, "calories_gained": 165.0}, ...}
+    """
+    progress = progress_by_day(user, start_date, end_date)
+
+    result = {}
+    for day in _date_range(start_date, end_date):
+        row = progress.get(day)
+        day_info = {"session_complete": bool(row and row['completed_sessions'] > 0)}
+        if include_calories:
+            day_info["total_calories_burned"] = float(row['total_calories_burned']) if row else 0.0
+            day_info["calories_gained"] = float(row['calories_gained']) if row else 0.0
+        result[str(day)] = day_info
+    return result
+
+
+def month_bounds(date):
+    start_date = date.replace(day=1)
+    next_month = (start_date.replace(day=28) + timedelta(days=4))
+    end_date = next_month - timedelta(days=next_month.day)
+    return start_date, end_date
+
+
+def _bucket_expression(granularity, week_length):
+    if granularity == 'week':
+        # 0..3: the month split into four (week_length)-day chunks. EXTRACT is numeric on
+        # Postgres, so cast it first to keep the division integral on every backend
+        day = Cast(ExtractDay('date'), IntegerField())
+        return Floor((day - Value(1)) / Value(week_length), output_field=IntegerField())
+    if granularity == 'isoweek':
+        return TruncWeek('date')
+    return F('date')
+
+
+def _bucket_labels(granularity, start_date, end_date):
+    """ Every bucket of the range in order, as {bucket value: response key}. """
+    if granularity == 'week':
+        return {index: f"week_{index + 1}" for index in range(4)}
+    if granularity == 'isoweek':
+        monday = start_date - timedelta(days=start_date.weekday())
+        labels = {}
+        while monday <= end_date:
+            year, week, _ = monday.isocalendar()
+            labels[monday] = f"{year}-W{week:02d}"
+            monday += timedelta(days=7)
+        return labels
+    return {day: str(day) for day in _date_range(start_date, end_date)}
+
+
+def calories_by_bucket(user, start_date, end_date, granularity='week'):
+    """
+    Calories burned and gained per bucket between start_date and end_date, in one
+    GROUP BY over the daily rollup. Buckets without activity are filled with zeros:
+
+        {"week_1": {"total_calories_burned": 1200.0, "calories_gained": 5600.0}, ...}
+
+    granularity: 'week' (a month split into four equal chunks; start_date must be
+    the 1st), 'isoweek' (calendar weeks, keyed "2025-W10") or 'day' (keyed by date).
+    """
+    week_length = (end_date - start_date).days // 4 + 1
+    rows = (
+        UserProgress.objects
+        .filter(user=user, date__range=[start_date, end_date])
+        .annotate(bucket=_bucket_expression(granularity, week_length))
+        .order_by()
+        .values('bucket')
+        .annotate(burned=Sum('total_calories_burned'), gained=Sum('calories_gained'))
+    )
+    totals = {}
+    for row in rows:
+        bucket = row['bucket']
+        if hasattr(bucket, 'date'):
+            bucket = bucket.date()  # TruncWeek may hand back a datetime
+        totals[bucket] = row
+
+    result = {}
+    for bucket, label in _bucket_labels(granularity, start_date, end_date).items():
+        row = totals.get(bucket)
+        result[label] = {
+            "total_calories_burned": float(row['burned'] or 0) if row else 0.0,
+            "calories_gained": float(row['gained'] or 0) if row else 0.0,
+        }
+    return result
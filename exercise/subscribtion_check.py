@@ -1,7 +1,6 @@
-from django.utils import timezone
 from rest_framework.permissions import BasePermission
 from django.utils.translation import gettext_lazy as _
-from users_app.models import UserSubscription  # Ensure this import is correct
+from users_app.entitlements import get_entitlements
 
 
 class IsSubscriptionActive(BasePermission):
@@ -16,9 +15,7 @@ class IsSubscriptionActive(BasePermission):
             return True
 
         # ✅ Check if regular users have an active subscription
-        has_subscription = UserSubscription.objects.filter(
-            user=request.user, is_active=True, end_date__gte=timezone.now().date()
-        ).exists()
+        has_subscription = get_entitlements(request).has_active_subscription
 
         if not has_subscription:
             self.message = {
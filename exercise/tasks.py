@@ -0,0 +1,11 @@
+from celery import shared_task
+from django.core.cache import cache
+
+from .snapshots import REBUILD_PENDING_KEY, compile_all_snapshots
+
+
+@shared_task
+def compile_program_snapshots_task():
+    # Changes made from here on queue the next rebuild
+    cache.delete(REBUILD_PENDING_KEY)
+    return compile_all_snapshots()
@@ -1,3 +1,688 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users_app.models import (User, Program, Session, Meal, ExerciseBlock, UserProgram, UserSubscription,
+                              SessionCompletion, MealCompletion, ExerciseBlockCompletion)
+from users_app.models import UserProgress
+from users_app.progress import rebuild_user_progress
+from users_app.views import create_sessions_for_user
+
+
+class ProgramFixtureMixin:
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("+998901112233", password="secret", is_active=True)
+        self.program = Program.objects.create(program_goal='gain_muscle')
+        self.meals = [
+            Meal.objects.create(meal_type=meal_type, food_name=meal_type, calories=100,
+                                water_content=100, preparation_time=10)
+            for meal_type in ('breakfast', 'dinner')
+        ]
+        self.sessions = []
+        for number in range(1, 4):
+            session = Session.objects.create(program=self.program, session_number=number)
+            session.meals.set(self.meals)
+            ExerciseBlock.objects.create(session=session, block_name=f"Block {number}")
+            self.sessions.append(session)
+        self.user_program = UserProgram.objects.create(user=self.user, program=self.program)
+        UserSubscription.objects.create(user=self.user, end_date=timezone.now().date() + timedelta(days=30))
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def complete_session(self, session):
+        for meal in self.meals:
+            response = self.client.post("/api/food/api/meal/complete/",
+                                        {"session_id": session.id, "meal_id": meal.id}, format='json')
+            self.assertEqual(response.status_code, 200, response.data)
+        response = self.client.post("/api/exercise/api/block-complete/",
+                                    {"block_id": session.block.id}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response
+
+
+@override_settings(SESSION_MATERIALIZATION='lazy')
+class LazySessionMaterializationTests(ProgramFixtureMixin, TestCase):
+    def list_sessions(self):
+        response = self.client.get("/api/exercise/api/sessions/")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_rows_are_created_only_for_sessions_the_user_touches(self):
+        self.assertEqual(create_sessions_for_user(self.user, self.program), (0, 0, 0))
+        self.assertFalse(SessionCompletion.objects.filter(user=self.user).exists())
+
+        sessions = self.list_sessions()["sessions"]
+        self.assertEqual([s["locked"] for s in sessions], [False, True, True])
+
+        response = self.complete_session(self.sessions[0])
+        self.assertTrue(response.data["session_completed"])
+        self.assertEqual(SessionCompletion.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(MealCompletion.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(ExerciseBlockCompletion.objects.filter(user=self.user).count(), 1)
+
+        self.user_program.refresh_from_db()
+        self.assertEqual(self.user_program.last_completed_session_number, 1)
+        self.assertEqual(self.user_program.last_completed_date, timezone.now().date())
+
+        # Session 2 unlocks tomorrow, not today
+        sessions = self.list_sessions()["sessions"]
+        self.assertEqual([s["id"] for s in sessions], [self.sessions[1].id, self.sessions[2].id])
+        self.assertEqual([s["locked"] for s in sessions], [True, True])
+
+    def test_reset_rewinds_the_cursor(self):
+        self.complete_session(self.sessions[0])
+        response = self.client.post("/api/exercise/api/sessions/reset-last-session/")
+        self.assertEqual(response.status_code, 200)
+
+        self.user_program.refresh_from_db()
+        self.assertEqual(self.user_program.last_completed_session_number, 0)
+        sessions = self.list_sessions()["sessions"]
+        self.assertEqual(len(sessions), 3)
+        self.assertFalse(sessions[0]["locked"])
+
+    def test_meal_outside_the_users_program_is_rejected(self):
+        other_session = Session.objects.create(program=Program.objects.create(program_goal='lose_weight'),
+                                               session_number=1)
+        other_session.meals.set(self.meals)
+        response = self.client.post("/api/food/api/meal/complete/",
+                                    {"session_id": other_session.id, "meal_id": self.meals[0].id}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(MealCompletion.objects.filter(user=self.user).exists())
+
+    def test_block_outside_the_users_program_is_rejected(self):
+        other_session = Session.objects.create(program=Program.objects.create(program_goal='lose_weight'),
+                                               session_number=1)
+        other_session.meals.set(self.meals)
+        block = ExerciseBlock.objects.create(session=other_session, block_name="Other")
+        response = self.client.post("/api/exercise/api/block-complete/", {"block_id": block.id}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(SessionCompletion.objects.filter(user=self.user).exists())
+        self.assertFalse(ExerciseBlockCompletion.objects.filter(user=self.user).exists())
+
+
+class StatisticsEngineTests(ProgramFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        from users_app.models import Exercise
+
+        # Two exercises of the user's goal in the same block must not double its calories
+        block = self.sessions[0].block
+        block.calories_burned = 120
+        block.save()
+        for name in ("Squat", "Lunge"):
+            block.exercises.add(Exercise.objects.create(name=name, description=name, exercise_type='gain_muscle'))
+
+        self.day = timezone.now().date().replace(day=10)
+        ExerciseBlockCompletion.objects.create(user=self.user, block=block, is_completed=True,
+                                               completion_date=self.day)
+        for meal in self.meals:
+            MealCompletion.objects.create(user=self.user, session=self.sessions[0], meal=meal,
+                                          is_completed=True, completion_date=self.day)
+        rebuild_user_progress([self.user.id])
+
+    def post_statistics(self, query_type):
+        return self.client.post("/api/exercise/api/user/statistics/",
+                                {"type": query_type, "date": str(self.day)}, format='json')
+
+    def test_daily_and_weekly_read_one_rollup_query(self):
+        with self.assertNumQueries(1):
+            response = self.post_statistics("weekly")
+        self.assertEqual(len(response.data), 7)
+        self.assertEqual(response.data[str(self.day)], {
+            "session_complete": True,
+            "total_calories_burned": 120.0,
+            "calories_gained": 200.0,
+        })
+        other_day = next(day for day in response.data if day != str(self.day))
+        self.assertEqual(response.data[other_day], {
+            "session_complete": False,
+            "total_calories_burned": 0.0,
+            "calories_gained": 0.0,
+        })
+
+        response = self.post_statistics("daily")
+        self.assertEqual(list(response.data), [str(self.day)])
+
+    def test_monthly_only_reports_session_complete(self):
+        with self.assertNumQueries(1):
+            response = self.post_statistics("monthly")
+        self.assertEqual(response.data[str(self.day)], {"session_complete": True})
+        self.assertEqual(response.data[str(self.day.replace(day=1))], {"session_complete": False})
+
+    def test_weekly_calories_sums_month_per_week(self):
+        with self.assertNumQueries(1):
+            response = self.client.post("/api/exercise/api/weekly-calories/", {"date": str(self.day)}, format='json')
+        self.assertEqual(response.data["week_2"], {"total_calories_burned": 120.0, "calories_gained": 200.0})
+        self.assertEqual(response.data["week_1"], {"total_calories_burned": 0.0, "calories_gained": 0.0})
+
+    def test_weekly_calories_buckets_every_day_of_the_month(self):
+        from exercise.statistics import month_bounds
+
+        UserProgress.objects.filter(user=self.user).delete()
+        last_day = month_bounds(self.day)[1]
+        for date, burned in ((self.day.replace(day=3), 10), (self.day.replace(day=12), 20),
+                             (self.day.replace(day=20), 40), (last_day, 80)):
+            UserProgress.objects.create(user=self.user, date=date, week_number=date.isocalendar()[1],
+                                        completed_sessions=1, total_calories_burned=burned, calories_gained=0)
+        response = self.client.post("/api/exercise/api/weekly-calories/", {"date": str(self.day)}, format='json')
+        self.assertEqual([bucket["total_calories_burned"] for bucket in response.data.values()],
+                         [10.0, 20.0, 40.0, 80.0])
+
+    def test_weekly_calories_other_granularities(self):
+        for granularity in ("isoweek", "day"):
+            with self.assertNumQueries(1):
+                response = self.client.post("/api/exercise/api/weekly-calories/",
+                                            {"date": str(self.day), "granularity": granularity}, format='json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(sum(bucket["total_calories_burned"] for bucket in response.data.values()), 120.0)
+            self.assertEqual(sum(bucket["calories_gained"] for bucket in response.data.values()), 200.0)
+
+        year, week, _ = self.day.isocalendar()
+        self.assertEqual(response.data[str(self.day)]["calories_gained"], 200.0)
+        response = self.client.post("/api/exercise/api/weekly-calories/",
+                                    {"date": str(self.day), "granularity": "isoweek"}, format='json')
+        self.assertEqual(response.data[f"{year}-W{week:02d}"]["total_calories_burned"], 120.0)
+
+        response = self.client.post("/api/exercise/api/weekly-calories/",
+                                    {"date": str(self.day), "granularity": "hourly"}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class UserProgressRollupTests(ProgramFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        from users_app.models import Exercise
+
+        for session in self.sessions:
+            session.block.calories_burned = 50
+            session.block.save()
+            session.block.exercises.add(
+                Exercise.objects.create(name="Push-up", description="Push-up", exercise_type='gain_muscle')
+            )
+        create_sessions_for_user(self.user, self.program)
+
+    def rollup(self):
+        return list(UserProgress.objects.filter(user=self.user)
+                    .values_list('date', 'completed_sessions', 'total_calories_burned', 'calories_gained'))
+
+    def test_completions_apply_deltas_that_match_a_rebuild(self):
+        self.complete_session(self.sessions[0])
+        today = timezone.now().date()
+        self.assertEqual(self.rollup(), [(today, 1, 50, 200)])
+
+        rebuild_user_progress([self.user.id])
+        self.assertEqual(self.rollup(), [(today, 1, 50, 200)])
+
+    def test_reset_takes_the_session_back_out(self):
+        self.complete_session(self.sessions[0])
+        response = self.client.post("/api/exercise/api/sessions/reset-last-session/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.rollup(), [(timezone.now().date(), 0, 0, 0)])
+
+    def test_repeated_submits_are_counted_once(self):
+        self.complete_session(self.sessions[0])
+        before = self.rollup()
+        response = self.client.post("/api/food/api/meal/complete/",
+                                    {"session_id": self.sessions[0].id, "meal_id": self.meals[0].id}, format='json')
+        self.assertEqual(response.data["message"], "This meal has already been completed.")
+        response = self.client.post("/api/exercise/api/block-complete/",
+                                    {"block_id": self.sessions[0].block.id}, format='json')
+        self.assertEqual(response.data["message"], "Block already completed.")
+        self.assertEqual(self.rollup(), before)
+
+    def test_meal_completion_edits_take_their_calories_back(self):
+        self.complete_session(self.sessions[0])
+        first, second = MealCompletion.objects.filter(user=self.user, session=self.sessions[0]).order_by('pk')
+        url = "/api/food/api/mealcompletion/"
+        response = self.client.patch(f"{url}{first.pk}/", {"is_completed": False}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.rollup(), [(timezone.now().date(), 1, 50, 100)])
+
+        self.assertEqual(self.client.delete(f"{url}{second.pk}/").status_code, 204)
+        self.assertEqual(self.rollup(), [(timezone.now().date(), 1, 50, 0)])
+
+
+class EntitlementResolverTests(ProgramFixtureMixin, TestCase):
+    def assert_entitlement_queries(self, url, expected):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        sql = [query['sql'] for query in queries.captured_queries]
+        self.assertEqual(sum('FROM "users_app_usersubscription"' in q for q in sql), expected)
+        self.assertEqual(sum('FROM "users_app_userprogram"' in q for q in sql), expected)
+        return response
+
+    def test_block_and_meal_endpoints_resolve_entitlements_once(self):
+        response = self.assert_entitlement_queries("/api/exercise/api/exerciseblocks/", 1)
+        self.assertEqual(len(response.data), 3)
+        # Later requests are served from the shared cache
+        self.assert_entitlement_queries("/api/food/api/meals/", 0)
+        self.assert_entitlement_queries(f"/api/food/api/meals/{self.meals[0].id}/details/", 0)
+
+    def test_subscription_change_invalidates_cache(self):
+        self.assert_entitlement_queries("/api/exercise/api/exerciseblocks/", 1)
+        subscription = UserSubscription.objects.get(user=self.user)
+        subscription.end_date = timezone.now().date() - timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            subscription.save()
+        response = self.client.get("/api/exercise/api/exerciseblocks/")
+        self.assertEqual(response.status_code, 403)
+
+    def test_expired_subscription_is_rejected(self):
+        UserSubscription.objects.filter(user=self.user).update(end_date=timezone.now().date() - timedelta(days=1))
+        response = self.client.get("/api/exercise/api/exerciseblocks/")
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get("/api/food/api/meals/")
+        self.assertEqual(response.status_code, 403)
+
+
+class SessionListingTests(ProgramFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        create_sessions_for_user(self.user, self.program)
+
+    def test_listing_runs_a_fixed_number_of_queries(self):
+        for number in range(4, 31):
+            session = Session.objects.create(program=self.program, session_number=number)
+            session.meals.set(self.meals)
+            ExerciseBlock.objects.create(session=session, block_name=f"Block {number}")
+        create_sessions_for_user(self.user, self.program)
+        self.complete_session(self.sessions[0])
+
+        # UserProgram, completion rows, sessions + blocks, meals
+        with self.assertNumQueries(4):
+            response = self.client.get("/api/exercise/api/sessions/")
+        sessions = response.data["sessions"]
+        self.assertEqual(len(sessions), 29)
+        self.assertEqual(sessions[0]["meals"], [meal.id for meal in self.meals])
+        self.assertEqual(sessions[0]["block"], self.sessions[1].block.id)
+        self.assertTrue(all(session["locked"] for session in sessions))
+
+        with override_settings(SESSION_MATERIALIZATION='lazy'), self.assertNumQueries(4):
+            response = self.client.get("/api/exercise/api/sessions/")
+        self.assertEqual(len(response.data["sessions"]), 29)
+
+    def test_listing_reads_completions_without_joining_sessions(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.complete_session(self.sessions[0])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/exercise/api/sessions/")
+        self.assertEqual([s["id"] for s in response.data["sessions"]], [self.sessions[1].id, self.sessions[2].id])
+        completion_queries = [query['sql'] for query in queries.captured_queries
+                              if 'FROM "users_app_sessioncompletion"' in query['sql']]
+        self.assertEqual(len(completion_queries), 1)
+        self.assertNotIn('JOIN "users_app_session"', completion_queries[0])
+
+    def test_session_changes_are_copied_to_completion_rows(self):
+        session = self.sessions[2]
+        session.session_number = 7
+        session.save()
+        completion = SessionCompletion.objects.get(user=self.user, session=session)
+        self.assertEqual((completion.program_id, completion.session_number_private), (self.program.id, 7))
+
+    def test_backfill_command_fills_rows_written_before_the_column(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        SessionCompletion.objects.filter(user=self.user).update(program=None)
+        call_command('backfill_session_completion_program', batch_size=2, stdout=StringIO())
+        self.assertFalse(SessionCompletion.objects.filter(user=self.user, program__isnull=True).exists())
+
+    def test_migrate_backfills_rows_without_a_program(self):
+        from django.apps import apps
+        from django.db.models.signals import post_migrate
+
+        SessionCompletion.objects.filter(user=self.user).update(program=None)
+        post_migrate.send(sender=apps.get_app_config('users_app'), app_config=apps.get_app_config('users_app'))
+        response = self.client.get("/api/exercise/api/sessions/")
+        self.assertEqual(len(response.data["sessions"]), 3)
+
+    def test_cursor_pagination_walks_the_pending_sessions(self):
+        for number in range(4, 8):
+            session = Session.objects.create(program=self.program, session_number=number)
+            ExerciseBlock.objects.create(session=session, block_name=f"Block {number}")
+        create_sessions_for_user(self.user, self.program)
+
+        seen = []
+        url = "/api/exercise/api/sessions/?page_size=3"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data["sessions"]), 3)
+            seen += [(s["session_number"], s["locked"]) for s in response.data["sessions"]]
+            url = response.data["next"]
+        self.assertEqual(seen, [(1, False)] + [(number, True) for number in range(2, 8)])
+
+        # Without pagination parameters the whole list comes back as before
+        response = self.client.get("/api/exercise/api/sessions/")
+        self.assertEqual(len(response.data["sessions"]), 7)
+        self.assertNotIn("next", response.data)
+
+    def test_cursor_pagination_seeks_past_session_number_ties(self):
+        other = Program.objects.create(program_goal='lose_weight')
+        for number in range(1, 4):
+            Session.objects.create(program=other, session_number=number)
+        self.user.is_staff = True
+        self.user.save()
+        expected = list(Session.objects.order_by('session_number', 'id').values_list('id', flat=True))
+
+        pages, url = [], "/api/exercise/api/sessions/?page_size=2"
+        while url:
+            response = self.client.get(url)
+            pages.append([s["id"] for s in response.data["sessions"]])
+            last_url, url = url, response.data["next"]
+        self.assertEqual(sum(pages, []), expected)
+        self.assertEqual(pages[0], expected[:2])  # sessions 1 of both programs, split by id
+
+        # Walking back from the last page returns the same pages
+        back, url = [], self.client.get(last_url).data["previous"]
+        while url:
+            response = self.client.get(url)
+            back.insert(0, [s["id"] for s in response.data["sessions"]])
+            url = response.data["previous"]
+        self.assertEqual(back, pages[:-1])
+
+
+class CatalogResponseCacheTests(ProgramFixtureMixin, TestCase):
+    url = "/api/exercise/api/exerciseblocks/"
+
+    def test_repeated_read_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.data, first.data)
+
+    def test_catalog_change_invalidates(self):
+        self.client.get(self.url)
+        block = self.sessions[0].block
+        block.calories_burned = 321
+        with self.captureOnCommitCallbacks(execute=True):
+            block.save()
+        response = self.client.get(self.url)
+        self.assertIn("321.00", [item["calories_burned"] for item in response.data])
+
+    def test_m2m_change_invalidates(self):
+        from users_app.models import Exercise
+
+        exercise = Exercise.objects.create(name="Squat", description="Squat", exercise_type='gain_muscle')
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sessions[0].block.exercises.add(exercise)
+        response = self.client.get(self.url)
+        self.assertEqual(sum(len(item["exercises"]) for item in response.data), 1)
+
+    def test_entitlements_are_checked_before_a_cached_body(self):
+        self.client.get(self.url)
+        subscription = UserSubscription.objects.get(user=self.user)
+        subscription.end_date = timezone.now().date() - timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            subscription.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+
+class ConditionalGetTests(ProgramFixtureMixin, TestCase):
+    def test_catalog_read_answers_304_without_queries(self):
+        url = "/api/exercise/api/exerciseblocks/"
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_session_list_etag_follows_progress(self):
+        create_sessions_for_user(self.user, self.program)
+        url = "/api/exercise/api/sessions/"
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.complete_session(self.sessions[0])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(response.data["sessions"]), 2)
+
+    def test_statistics_get_matches_post(self):
+        create_sessions_for_user(self.user, self.program)
+        today = str(timezone.now().date())
+        posted = self.client.post("/api/exercise/api/user/statistics/", {"type": "daily", "date": today},
+                                  format='json')
+        response = self.client.get("/api/exercise/api/user/statistics/", {"type": "daily", "date": today})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, posted.data)
+        response = self.client.get("/api/exercise/api/user/statistics/", {"type": "daily", "date": today},
+                                   HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_other_users_etag_does_not_match(self):
+        create_sessions_for_user(self.user, self.program)
+        url = "/api/exercise/api/sessions/"
+        etag = self.client.get(url)["ETag"]
+        other = User.objects.create_user("+998901112244", password="secret", is_active=True)
+        UserProgram.objects.create(user=other, program=self.program)
+        create_sessions_for_user(other, self.program)
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ProgramSnapshotTests(ProgramFixtureMixin, TestCase):
+    url = "/api/exercise/api/program-snapshot/"
+
+    def setUp(self):
+        import tempfile
+
+        super().setUp()
+        snapshot_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(snapshot_dir.cleanup)
+        settings_override = override_settings(PROGRAM_SNAPSHOT_DIR=snapshot_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.snapshot_dir = snapshot_dir.name
+        # Mappings are kept per process; earlier tests may have left one for the same ids
+        from exercise.snapshots import _snapshots
+        _snapshots.clear()
+
+    def test_program_and_sessions_are_sliced_from_the_snapshot(self):
+        import json
+        from exercise.snapshots import compile_all_snapshots, program_sessions_data
+
+        compile_all_snapshots()
+        expected = json.loads(json.dumps(program_sessions_data(self.program.id, 'gain_muscle', 'en'), default=str))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(b"".join(response.streaming_content)), expected)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(f"{self.url}sessions/2/")
+        self.assertEqual(json.loads(response.content), expected[1])
+        self.assertEqual(self.client.get(f"{self.url}sessions/9/").status_code, 404)
+
+    def test_content_change_swaps_to_a_new_snapshot(self):
+        import json
+        import os
+        from exercise.snapshots import compile_all_snapshots
+
+        compile_all_snapshots()
+        self.client.get(self.url)
+        block = self.sessions[0].block
+        block.calories_burned = 321
+        with self.captureOnCommitCallbacks(execute=True):
+            block.save()
+        response = self.client.get(f"{self.url}sessions/1/")
+        self.assertEqual(json.loads(response.content)["block"]["calories_burned"], "321.00")
+
+        compile_all_snapshots()
+        self.assertEqual(len(os.listdir(self.snapshot_dir)), 9)  # one per goal and language, old version gone
+
+    def test_snapshot_holds_only_the_users_goal(self):
+        import json
+        from users_app.models import Exercise
+
+        block = self.sessions[0].block
+        block.exercises.add(Exercise.objects.create(name="Squat", description="Squat", exercise_type='gain_muscle'),
+                            Exercise.objects.create(name="Run", description="Run", exercise_type='lose_weight'))
+        salad = Meal.objects.create(meal_type='lunch', food_name="Salad", calories=50, water_content=100,
+                                    preparation_time=5, goal_type='lose_weight')
+        self.sessions[0].meals.add(salad)
+
+        def first_session():
+            return json.loads(self.client.get(f"{self.url}sessions/1/").content)
+
+        session = first_session()
+        self.assertEqual([e["name"] for e in session["block"]["exercises"]], ["Squat"])
+        self.assertNotIn(salad.id, [m["id"] for m in session["meals"]])
+
+        User.objects.filter(pk=self.user.pk).update(goal='lose_weight')
+        self.user.refresh_from_db()
+        cache.clear()
+        session = first_session()
+        self.assertEqual([e["name"] for e in session["block"]["exercises"]], ["Run"])
+        self.assertEqual([m["id"] for m in session["meals"]], [salad.id])
+
+    def test_miss_is_served_from_the_database_and_queues_a_rebuild(self):
+        import json
+        import os
+        from unittest.mock import patch
+        from exercise.snapshots import compile_all_snapshots, program_sessions_data
+        from users_app.caching import get_content_version
+
+        expected = json.loads(json.dumps(program_sessions_data(self.program.id, 'gain_muscle', 'en'), default=str))
+        with patch('exercise.snapshots._enqueue_rebuild') as enqueue:
+            response = self.client.get(self.url)
+        self.assertEqual(json.loads(response.content), expected)
+        enqueue.assert_called_once()
+        self.assertEqual(os.listdir(self.snapshot_dir), [])
+
+        # A worker that still sees an older version leaves the newer files alone
+        version = get_content_version()
+        self.assertEqual(compile_all_snapshots(version), 9)
+        self.assertEqual(compile_all_snapshots(version - 1), 0)
+        self.assertEqual(len(os.listdir(self.snapshot_dir)), 9)
+
+    def test_requires_an_active_subscription(self):
+        UserSubscription.objects.filter(user=self.user).update(is_active=False)
+        cache.clear()
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class FullProgramOverviewTests(ProgramFixtureMixin, TestCase):
+    url = "/api/exercise/api/user/full-program/"
+
+    def get_overview(self):
+        import json
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_completion_state_is_joined_in(self):
+        create_sessions_for_user(self.user, self.program)
+        self.complete_session(self.sessions[0])
+        sessions = self.get_overview()["sessions"]
+        self.assertEqual([s["is_completed"] for s in sessions], [True, False, False])
+        self.assertTrue(all(meal["is_completed"] for meal in sessions[0]["meals"]))
+        self.assertFalse(any(meal["is_completed"] for meal in sessions[1]["meals"]))
+
+    def test_query_count_does_not_grow_with_the_program(self):
+        from users_app.models import Exercise
+
+        create_sessions_for_user(self.user, self.program)
+        exercise = Exercise.objects.create(name="Squat", description="Squat", exercise_type='gain_muscle')
+        for session in self.sessions:
+            session.block.exercises.add(exercise)
+        with self.assertNumQueries(9):  # 2 of them load the entitlements into the cache
+            overview = self.get_overview()
+        self.assertEqual(len(overview["sessions"]), 3)
+        self.assertEqual(overview["program"]["id"], self.program.id)
+
+        for number in range(4, 10):
+            session = Session.objects.create(program=self.program, session_number=number)
+            session.meals.set(self.meals)
+            ExerciseBlock.objects.create(session=session, block_name=f"Block {number}").exercises.add(exercise)
+        with self.assertNumQueries(7):
+            self.assertEqual(len(self.get_overview()["sessions"]), 9)
+
+
+class ProjectionParityTests(ProgramFixtureMixin, TestCase):
+    """ The projections must render exactly what the serializers they replace do. """
+
+    def setUp(self):
+        from users_app.models import Exercise, MealSteps
+
+        super().setUp()
+        exercise = Exercise.objects.create(name="Squat", description="Legs", exercise_type='gain_muscle',
+                                           exercise_time=timedelta(minutes=1, seconds=30),
+                                           image='exercise_images/squat.png')
+        Exercise.objects.filter(pk=exercise.pk).update(name_ru="Приседания", description_ru='')
+        plain = Exercise.objects.create(name="Plank", description="Core", exercise_type='lose_weight')
+        block = self.sessions[0].block
+        block.exercises.add(exercise, plain)
+        ExerciseBlock.objects.filter(pk=block.pk).update(block_kkal=12.5, block_image='exercise_block_images/b.png',
+                                                         block_name_ru="Блок")
+        meal = self.meals[0]
+        Meal.objects.filter(pk=meal.pk).update(food_name_ru="Завтрак", food_photo='meal_photos/m.png')
+        MealSteps.objects.create(meal=meal, title="Boil", text="Water", step_number=2, step_time="5")
+        MealSteps.objects.create(meal=meal, title="Cut", step_number=1)
+
+    def assert_parity(self, serializer_class, projection_class, queryset):
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+
+        request = Request(APIRequestFactory().get("/", HTTP_HOST="testserver"))
+        for language in ('en', 'ru', 'uz'):
+            for context in ({'language': language}, {'language': language, 'request': request}):
+                self.assertEqual(projection_class(queryset, many=True, context=context).data,
+                                 serializer_class(queryset, many=True, context=context).data)
+                page = list(queryset.order_by('-pk'))  # a page of instances, as paginators hand over
+                self.assertEqual(projection_class(page, many=True, context=context).data,
+                                 serializer_class(page, many=True, context=context).data)
+
+    def test_exercises(self):
+        from exercise.projections import ExerciseListProjection
+        from exercise.serializers import ExerciseListSerializer
+        from users_app.models import Exercise
+
+        self.assert_parity(ExerciseListSerializer, ExerciseListProjection, Exercise.objects.order_by('pk'))
+
+    def test_blocks(self):
+        from exercise.projections import ExerciseBlockListProjection
+        from exercise.serializers import ExerciseBlockListSerializer
+
+        self.assert_parity(ExerciseBlockListSerializer, ExerciseBlockListProjection,
+                           ExerciseBlock.objects.order_by('pk'))
+
+    def test_meals(self):
+        from exercise.projections import MealListProjection
+        from food.serializers import MealListSerializer
+
+        self.assert_parity(MealListSerializer, MealListProjection, Meal.objects.order_by('pk'))
+
+    def test_sessions(self):
+        from exercise.projections import SessionPKProjection
+        from exercise.serializers import SessionPKSerializer
+
+        Session.objects.create(program=self.program, session_number=4)  # no block, no meals
+        self.assert_parity(SessionPKSerializer, SessionPKProjection, Session.objects.order_by('pk'))
+
+    def test_benchmark_command_reports_every_case(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('benchmark_serializers', limit=10, repeat=1, stdout=out)
+        for name in ("exercises", "blocks", "meals", "sessions"):
+            self.assertIn(f"{name} (", out.getvalue())
@@ -3,7 +3,8 @@ from rest_framework.routers import DefaultRouter
 from exercise.views import (ProgramViewSet, SessionViewSet,
                             ExerciseViewSet,UserProgramViewSet,
                             CompleteBlockView,StatisticsView,
-                            ExerciseBlockViewSet, WeeklyCaloriesView)
+                            ExerciseBlockViewSet, WeeklyCaloriesView,
+                            ProgramSnapshotView, UserFullProgramDetailView)
 
 from django.conf import settings
 from django.conf.urls.static import static
@@ -20,7 +21,11 @@ urlpatterns = [
     path('api/', include(router.urls)),
     path("api/block-complete/", CompleteBlockView.as_view(), name="complete-block"),
     path('api/user/statistics/', StatisticsView.as_view(), name='user-progress'),
+    path('api/user/full-program/', UserFullProgramDetailView.as_view(), name='user-full-program'),
     path('api/weekly-calories/', WeeklyCaloriesView.as_view(), name='weekly_calories'),
+    path('api/program-snapshot/', ProgramSnapshotView.as_view(), name='program-snapshot'),
+    path('api/program-snapshot/sessions/<int:session_number>/', ProgramSnapshotView.as_view(),
+         name='program-snapshot-session'),
 ]
 
 
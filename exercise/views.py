@@ -4,7 +4,8 @@ from exercise.serializers import *
 from django.utils.translation import gettext_lazy as _
 from drf_yasg.utils import swagger_auto_schema, no_body
 from exercise.permissions import IsAdminOrReadOnly
-from users_app.models import translate_text, SessionCompletion, ExerciseBlock
+from users_app.models import SessionCompletion, ExerciseBlock
+from users_app.translation import translate_text
 from rest_framework.views import APIView
 from datetime import timedelta
 from threading import Timer
@@ -16,13 +17,25 @@ from django.utils.dateparse import parse_date
 from django.shortcuts import get_object_or_404
 from rest_framework.parsers import MultiPartParser, JSONParser, FormParser
 from .subscribtion_check import IsSubscriptionActive
+from .pagination import KeysetCursorPagination, SessionCursorPagination
+from .projections import ExerciseBlockListProjection, ExerciseListProjection, SessionPKProjection
+from users_app.entitlements import get_entitlements
+from users_app.caching import catalog_response, progress_response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.utils import timezone
 from .subscribtion_check import IsSubscriptionActive
 from django.db.models import Q
 from django.db.models import Prefetch
 from django.utils.timezone import now, localdate
-from django.db.models import Sum, Count
+from django.db.models import Count
+from django.db import transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
+from users_app.progress import (lazy_materialization_enabled, materialize_session, pending_sessions,
+                                next_unlocked_session_number, advance_progress_cursor,
+                                refresh_progress_cursor, record_block_completion, record_meal_completion)
+from exercise.snapshots import get_program_snapshot, program_sessions_data
+from exercise.statistics import daily_statistics, calories_by_bucket, month_bounds, GRANULARITIES
 
 
 
@@ -58,6 +71,9 @@ class ProgramViewSet(viewsets.ModelViewSet):
             responses={200: ProgramSerializer(many=True)}
         )
         def list(self, request):
+            return catalog_response(request, self._list, gated=False)
+
+        def _list(self):
             queryset = self.get_queryset()
             serializer = self.get_serializer(queryset, many=True)
             return Response({"programs": serializer.data}, status=status.HTTP_200_OK)
@@ -146,6 +162,7 @@ class SessionViewSet(viewsets.ModelViewSet):
         serializer_class = SessionPKSerializer
         permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
         parser_classes = [MultiPartParser, FormParser, JSONParser]
+        pagination_class = SessionCursorPagination
 
         def get_serializer_context(self):
             context = super().get_serializer_context()
@@ -223,68 +240,91 @@ class SessionViewSet(viewsets.ModelViewSet):
             - Admins: Get all sessions.
             - Users: Get only incomplete sessions from their assigned program, with daily unlock logic.
             """
-            from users_app.models import UserProgram, SessionCompletion
-
             # 🔹 If user is an admin, return all sessions
             if request.user.is_superuser or request.user.is_staff:
-                sessions = Session.objects.all().order_by('session_number')
-                serializer = self.get_serializer(sessions, many=True)
-                return Response({"sessions": serializer.data}, status=status.HTTP_200_OK)
+                sessions = Session.objects.order_by('session_number')
+                return self._sessions_response(sessions)
+
+            # 🔹 Unchanged since the client's copy (same progress, same day): 304
+            return progress_response(request, lambda: self._list(request), gated=False)
+
+        def _list(self, request):
+            from users_app.models import UserProgram, SessionCompletion
 
             # 🔹 Check if the user has an active program
             user_program = UserProgram.objects.filter(user=request.user).first()
             if not user_program:
                 return Response({"error": _("No active program found for the user.")}, status=404)
 
-            # 🔹 Get the user's incomplete sessions
-            incomplete_sc = SessionCompletion.objects.filter(
+            if lazy_materialization_enabled():
+                return self._list_from_cursor(request, user_program)
+
+            # 🔹 One pass over the user's completion rows (program and order come from the row itself):
+            # the incomplete sessions, and the last completed one for the daily unlock
+            pending_ids = []
+            first_pending_number = last_completed_number = last_completed_date = None
+            for session_id, number, is_completed, completion_date in SessionCompletion.objects.filter(
                 user=request.user,
-                session__program=user_program.program,
-                is_completed=False
-            ).select_related('session').order_by('session__session_number')
+                program_id=user_program.program_id
+            ).order_by('session_number_private').values_list(
+                'session_id', 'session_number_private', 'is_completed', 'completion_date'
+            ):
+                if is_completed:
+                    last_completed_number, last_completed_date = number, completion_date
+                else:
+                    pending_ids.append(session_id)
+                    if first_pending_number is None:
+                        first_pending_number = number
 
-            if not incomplete_sc.exists():
+            if not pending_ids:
                 return Response({"message": _("You have completed all sessions!")}, status=200)
 
-            # 🔹 Determine the next session number to unlock based on daily progression
-            today = timezone.now().date()
+            # 🔹 Sessions unlock one per day after the last completed one
+            next_session_number = next_unlocked_session_number(
+                last_completed_number, last_completed_date, first_pending_number, timezone.now().date()
+            )
 
-            # Get the last completed session
-            last_completed = SessionCompletion.objects.filter(
-                user=request.user,
-                is_completed=True,
-                session__program=user_program.program
-            ).order_by('-session__session_number').first()
+            # 🔹 Serialized from .values() rows: block id is joined, meal ids come from one query
+            sessions = Session.objects.filter(id__in=pending_ids).order_by('session_number')
+            return self._sessions_response(sessions, next_session_number)
 
-            if not last_completed:
-                # No sessions completed yet, so the first incomplete session is unlocked
-                next_session_number = incomplete_sc.first().session.session_number
-            else:
-                # Check if today is at least the next day after the last completion
-                completion_date = last_completed.completion_date
-                next_day = completion_date + timedelta(days=1)
-                last_completed_number = last_completed.session.session_number
-
-                if today < next_day:
-                    # It's not yet the next day, so the next session remains locked
-                    # The next session number to unlock is the last completed + 1,
-                    # but we'll set the unlocked session number to the last completed
-                    next_session_number = last_completed_number
-                else:
-                    # It's the next day or later, so unlock the next session
-                    next_session_number = last_completed_number + 1
-
-            # 🔹 Get all incomplete session IDs
-            session_ids = [sc.session_id for sc in incomplete_sc]
+        def _sessions_response(self, sessions, next_session_number=None):
+            """
+            {"sessions": [...]} with each session marked "locked" past next_session_number.
+            With ?page_size= or ?cursor= only one page is returned, plus "next"/"previous" links.
+            """
+            page = self.paginate_queryset(sessions)
+            data = SessionPKProjection(page if page is not None else sessions, many=True,
+                                       context=self.get_serializer_context()).data
+            if next_session_number is not None:
+                data = [{**item, "locked": (item["session_number"] > next_session_number)} for item in data]
+
+            body = {"sessions": data}
+            if page is not None:
+                body["next"] = self.paginator.get_next_link()
+                body["previous"] = self.paginator.get_previous_link()
+            return Response(body, status=status.HTTP_200_OK)
+
+        def _list_from_cursor(self, request, user_program):
+            """
+            Lazy mode: pending sessions come from the program itself (minus the completed
+            ones) and the unlock point from the cursor stored on UserProgram.
+            """
+            sessions = pending_sessions(request.user, user_program.program_id)
+            first_pending_number = sessions.values_list('session_number', flat=True).first()
+            if first_pending_number is None:
+                return Response({"message": _("You have completed all sessions!")}, status=200)
 
-            # 🔹 Retrieve sessions and mark future ones as locked based on next_session_number
-            sessions = Session.objects.filter(id__in=session_ids).order_by('session_number')
-            data = [
-                {**self.get_serializer(s).data, "locked": (s.session_number > next_session_number)}
-                for s in sessions
-            ]
+            last_number = user_program.last_completed_session_number
+            last_date = user_program.last_completed_date
+            if not last_date:
+                # Cursor never written (e.g. rows from eager mode): rebuild it once
+                last_number, last_date = refresh_progress_cursor(request.user, user_program.program_id)
 
-            return Response({"sessions": data}, status=status.HTTP_200_OK)
+            next_session_number = next_unlocked_session_number(
+                last_number, last_date, first_pending_number, timezone.now().date()
+            )
+            return self._sessions_response(sessions, next_session_number)
 
         @swagger_auto_schema(
             tags=['Sessions'],
@@ -305,8 +345,7 @@ class SessionViewSet(viewsets.ModelViewSet):
         )
         @action(detail=False, methods=['get'], url_path='by-session-number')
         def get_by_session_number(self, request):
-            from users_app.models import UserProgram
-            user_program = UserProgram.objects.filter(user=request.user, is_active=True).first()
+            user_program = get_entitlements(request).user_program
             if not user_program:
                 return Response({"error": _("No active program found.")}, status=404)
             session_number = request.query_params.get('session_number')
@@ -331,6 +370,7 @@ class SessionViewSet(viewsets.ModelViewSet):
             url_path='reset-last-session',
             permission_classes=[IsAuthenticated]
         )
+        @transaction.atomic
         def reset_last_session(self, request):
             """
             1. Attempt to find the most recently completed SessionCompletion
@@ -338,7 +378,7 @@ class SessionViewSet(viewsets.ModelViewSet):
                (for the case where the session was already reset but the block wasn't)
             3. Reset that block + session + meals
             """
-            from users_app.models import SessionCompletion, ExerciseBlockCompletion, MealCompletion
+            from users_app.models import SessionCompletion, ExerciseBlockCompletion
 
             # 1) Try last completed session
             last_completed_sc = SessionCompletion.objects.filter(
@@ -361,15 +401,14 @@ class SessionViewSet(viewsets.ModelViewSet):
                     is_completed=True
                 ).first()
                 if block_comp:
+                    record_block_completion(request.user, block_comp.block, block_comp.completion_date, sign=-1)
                     block_comp.is_completed = False
                     block_comp.completion_date = None
                     block_comp.save()
 
                 # Reset meals
-                MealCompletion.objects.filter(
-                    user=request.user,
-                    session=session_to_reset
-                ).update(is_completed=False, completion_date=None, missed=False)
+                self._reset_meals(request.user, session_to_reset)
+                refresh_progress_cursor(request.user, session_to_reset.program_id)
 
                 return Response(
                     {"message": _("The last completed session has been reset successfully.")},
@@ -387,6 +426,8 @@ class SessionViewSet(viewsets.ModelViewSet):
                 session_to_reset = last_completed_bc.block.session
 
                 # 2a) Reset the block
+                record_block_completion(request.user, last_completed_bc.block,
+                                        last_completed_bc.completion_date, sign=-1)
                 last_completed_bc.is_completed = False
                 last_completed_bc.completion_date = None
                 last_completed_bc.save()
@@ -402,10 +443,8 @@ class SessionViewSet(viewsets.ModelViewSet):
                     sc.save()
 
                 # 2c) Reset meals
-                MealCompletion.objects.filter(
-                    user=request.user,
-                    session=session_to_reset
-                ).update(is_completed=False, completion_date=None, missed=False)
+                self._reset_meals(request.user, session_to_reset)
+                refresh_progress_cursor(request.user, session_to_reset.program_id)
 
                 return Response(
                     {"message": _("The last completed block has been reset successfully.")},
@@ -415,6 +454,22 @@ class SessionViewSet(viewsets.ModelViewSet):
             # 3) If neither a completed session nor a completed block is found...
             return Response({"error": _("No completed session or block left to reset.")}, status=404)
 
+        @staticmethod
+        def _reset_meals(user, session):
+            from users_app.models import MealCompletion
+
+            completed = MealCompletion.objects.filter(
+                user=user,
+                session=session,
+                is_completed=True
+            ).select_related('meal')
+            for meal_completion in completed:
+                record_meal_completion(user, meal_completion.meal, session, meal_completion.completion_date, sign=-1)
+            MealCompletion.objects.filter(
+                user=user,
+                session=session
+            ).update(is_completed=False, completion_date=None, missed=False)
+
 
 class ExerciseBlockViewSet(viewsets.ModelViewSet):
     """
@@ -429,7 +484,9 @@ class ExerciseBlockViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         # Use distinct serializers for create vs. update/partial_update
         if self.action == 'list':
-            return ExerciseBlockListSerializer
+            if getattr(self, 'swagger_fake_view', False):
+                return ExerciseBlockListSerializer
+            return ExerciseBlockListProjection
         elif self.action == 'retrieve':
             return ExerciseBlockDetailSerializer
         elif self.action == 'create':
@@ -475,11 +532,10 @@ class ExerciseBlockViewSet(viewsets.ModelViewSet):
         if user.is_staff or user.is_superuser:
             return ExerciseBlock.objects.all()
 
-        user_program = UserProgram.objects.filter(user=user, is_active=True).first()
-        if not user_program or not UserSubscription.objects.filter(
-                user=user, is_active=True, end_date__gte=timezone.now().date()
-        ).exists():
+        entitlements = get_entitlements(self.request)
+        if not entitlements.has_access:
             return ExerciseBlock.objects.none()
+        user_program = entitlements.user_program
 
         return ExerciseBlock.objects.filter(
             session__program=user_program.program
@@ -510,18 +566,16 @@ class ExerciseBlockViewSet(viewsets.ModelViewSet):
         }
     )
     def list(self, request, *args, **kwargs):
+        return catalog_response(request, lambda: self._list(request))
+
+    def _list(self, request):
         queryset = self.get_queryset()
 
         # Return custom error message if queryset is empty due to subscription
         if not queryset.exists() and not (request.user.is_staff or request.user.is_superuser):
-            user_program = UserProgram.objects.filter(user=request.user, is_active=True).first()
-            if user_program:
-                has_active_subscription = UserSubscription.objects.filter(
-                    user=request.user,
-                    is_active=True,
-                    end_date__gte=timezone.now().date()
-                ).exists()
-                if not has_active_subscription:
+            entitlements = get_entitlements(request)
+            if entitlements.user_program:
+                if not entitlements.has_active_subscription:
                     return Response({
                         "error": _("Please upgrade your subscription to access exercise blocks."),
                         "subscription_options_url": "https://owntrainer.uz/api/subscriptions/options/"
@@ -552,16 +606,14 @@ class ExerciseBlockViewSet(viewsets.ModelViewSet):
         }
     )
     def retrieve(self, request, *args, **kwargs):
+        return catalog_response(request, lambda: self._retrieve(request))
+
+    def _retrieve(self, request):
         instance = self.get_object()  # This uses get_queryset
         if not instance and not (request.user.is_staff or request.user.is_superuser):
-            user_program = UserProgram.objects.filter(user=request.user, is_active=True).first()
-            if user_program:
-                has_active_subscription = UserSubscription.objects.filter(
-                    user=request.user,
-                    is_active=True,
-                    end_date__gte=timezone.now().date()
-                ).exists()
-                if not has_active_subscription:
+            entitlements = get_entitlements(request)
+            if entitlements.user_program:
+                if not entitlements.has_active_subscription:
                     return Response({
                         "error": _("Please upgrade your subscription to access exercise blocks."),
                         "subscription_options_url": "https://owntrainer.uz/api/subscriptions/options/"
@@ -638,6 +690,7 @@ class ExerciseViewSet(viewsets.ModelViewSet):
     """
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     parser_classes = [JSONParser]
+    pagination_class = KeysetCursorPagination
 
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
@@ -650,15 +703,22 @@ class ExerciseViewSet(viewsets.ModelViewSet):
         if user.is_superuser or user.is_staff:
             return Exercise.objects.all()
 
-        user_program = UserProgram.objects.filter(user=user, is_active=True).first()
-        if not user_program or not user_program.is_subscription_active():
+        entitlements = get_entitlements(self.request)
+        if not entitlements.has_access:
             return Exercise.objects.none()
+        user_program = entitlements.user_program
 
         return Exercise.objects.filter(
             blocks__session__program=user_program.program,
             exercise_type=user.goal
         ).distinct()
 
+    def list(self, request, *args, **kwargs):
+        return catalog_response(request, lambda: super(ExerciseViewSet, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return catalog_response(request, lambda: super(ExerciseViewSet, self).retrieve(request, *args, **kwargs))
+
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -670,7 +730,9 @@ class ExerciseViewSet(viewsets.ModelViewSet):
 
     def get_serializer_class(self):
         if self.action == 'list':
-            return ExerciseListSerializer
+            if getattr(self, 'swagger_fake_view', False):
+                return ExerciseListSerializer
+            return ExerciseListProjection
         elif self.action == 'retrieve':
             return ExerciseDetailSerializer
         elif self.action == 'create':
@@ -735,11 +797,12 @@ def maybe_mark_session_completed(user, session):
     sc, created = SessionCompletion.objects.get_or_create(
         user=user,
         session=session,
-        defaults={'session_number_private': session.session_number}  # Provide default value here
+        defaults={'session_number_private': session.session_number, 'program_id': session.program_id}
     )
     sc.is_completed = True
     sc.completion_date = timezone.now().date()
     sc.save()
+    advance_progress_cursor(user, session, sc.completion_date)
 
     return True
 
@@ -776,10 +839,27 @@ class CompleteBlockView(APIView):
         # if mismatched_exercises.exists():
         #     return Response({"error": _("This block contains exercises that do not match your goal.")}, status=400)
 
-        # Mark the block as completed for this user
+        if lazy_materialization_enabled() and session:
+            # Only the user's own program is materialized (as in CompleteMealView)
+            user_program = get_entitlements(request).user_program
+            if user_program is None or session.program_id != user_program.program_id:
+                return Response({"error": _("Block not found in your program.")}, status=status.HTTP_404_NOT_FOUND)
+            materialize_session(request.user, session)
+
+        # Mark the block as completed for this user. The row is re-read under its lock,
+        # so of two concurrent posts only the first applies the rollup delta
         bc, created = block.completions.get_or_create(user=request.user)
-        if bc.is_completed:
-            session_completed = maybe_mark_session_completed(request.user, session)
+        with transaction.atomic():
+            bc = ExerciseBlockCompletion.objects.select_for_update().get(pk=bc.pk)
+            already_completed = bc.is_completed
+            if not already_completed:
+                bc.is_completed = True
+                bc.completion_date = timezone.now().date()
+                bc.save()
+                record_block_completion(request.user, block, bc.completion_date)
+
+        session_completed = maybe_mark_session_completed(request.user, session)
+        if already_completed:
             return Response({
                 "message": _("Block already completed."),
                 "block_time": block.block_time,
@@ -787,12 +867,6 @@ class CompleteBlockView(APIView):
                 "session_completed": session_completed
             }, status=200)
 
-        bc.is_completed = True
-        bc.completion_date = timezone.now().date()
-        bc.save()
-
-        session_completed = maybe_mark_session_completed(request.user, session)
-
         return Response({
             "message": _("Block completed."),
             "block_time": block.block_time,
@@ -960,98 +1034,119 @@ class UserProgramViewSet(viewsets.ModelViewSet):
             return Response({"message": message})
 
 class UserFullProgramDetailView(APIView):
-        permission_classes = [IsAuthenticated]
-
-        def get(self, request):
-            try:
-                user_program = UserProgram.objects.filter(user=request.user, is_active=True).select_related(
-                    "program").first()
-
-                if not user_program:
-                    return Response({"error": _("No active program found for the user.")},
-                                    status=status.HTTP_404_NOT_FOUND)
-
-                if not user_program.is_subscription_active():
-                    return Response({"error": _("Your subscription has ended. Please renew.")},
-                                    status=status.HTTP_403_FORBIDDEN)
-
-                sessions = Session.objects.filter(program=user_program.program) \
-                    .prefetch_related(
-                    Prefetch('exercises', queryset=Exercise.objects.filter(exercise_type=request.user.goal)),
-                    Prefetch('meals', queryset=Meal.objects.filter(goal_type=request.user.goal))
-                )
+    """
+    The user's whole program with their completion state, from a fixed number of
+    queries however long the program is: the structure is prefetched, completions
+    are read once into {session_id} and {(session_id, meal_id)} sets, and the JSON
+    is streamed one session at a time.
+    """
+    permission_classes = [IsAuthenticated]
 
-                response_data = {
-                    "program": {
-                        "id": user_program.program.id,
-                        "goal": user_program.program.program_goal,
-                        "progress": user_program.progress,
-                        "total_sessions": user_program.program.total_sessions,
-                        "is_active": user_program.is_active,
-                        "start_date": user_program.start_date,
-                        "end_date": user_program.end_date,
-                    },
-                    "sessions": [
+    @swagger_auto_schema(
+        tags=['Sessions'],
+        operation_description=_("Full program overview: sessions, exercises, meals and steps with completion state."),
+        responses={200: "Success", 403: "Subscription expired", 404: "No active program"},
+    )
+    def get(self, request):
+        entitlements = get_entitlements(request)
+        if entitlements.user_program is None:
+            return Response({"error": _("No active program found for the user.")},
+                            status=status.HTTP_404_NOT_FOUND)
+        if not entitlements.has_active_subscription:
+            return Response({"error": _("Your subscription has ended. Please renew.")},
+                            status=status.HTTP_403_FORBIDDEN)
+        return progress_response(request, lambda: self._get(request, entitlements.user_program))
+
+    def _get(self, request, user_program):
+        user = request.user
+        goal = user.goal
+        language = getattr(user, 'language', 'en')
+
+        # Everything is loaded up front; only the encoding is streamed
+        user_program = UserProgram.objects.select_related('program').get(pk=user_program.pk)
+        sessions = list(
+            Session.objects.filter(program_id=user_program.program_id)
+            .select_related('block')
+            .prefetch_related(
+                Prefetch('block__exercises',
+                         queryset=Exercise.objects.filter(exercise_type=goal).order_by('sequence_number')),
+                Prefetch('meals', queryset=Meal.objects.filter(goal_type=goal).prefetch_related('steps')),
+            )
+            .order_by('session_number')
+        )
+        completed_sessions = set(SessionCompletion.objects.filter(
+            user=user, program_id=user_program.program_id, is_completed=True
+        ).values_list('session_id', flat=True))
+        completed_meals = set(MealCompletion.objects.filter(
+            user=user, session__program_id=user_program.program_id, is_completed=True
+        ).values_list('session_id', 'meal_id'))
+
+        program = {
+            "id": user_program.program.id,
+            "goal": user_program.program.program_goal,
+            "progress": user_program.progress,
+            "total_sessions": user_program.program.total_sessions,
+            "is_active": user_program.is_active,
+            "start_date": user_program.start_date,
+            "end_date": user_program.end_date,
+        }
+        items = (
+            self._session_data(session, language, completed_sessions, completed_meals) for session in sessions
+        )
+        return StreamingHttpResponse(self._stream(program, items), content_type='application/json',
+                                     status=status.HTTP_200_OK)
+
+    @staticmethod
+    def _stream(program, sessions):
+        encode = DjangoJSONEncoder(ensure_ascii=False).encode
+        yield '{"program": ' + encode(program) + ', "sessions": ['
+        for index, session in enumerate(sessions):
+            yield (',' if index else '') + encode(session)
+        yield ']}'
+
+    @staticmethod
+    def _session_data(session, language, completed_sessions, completed_meals):
+        block = getattr(session, 'block', None)
+        return {
+            "id": session.id,
+            "session_number": session.session_number,
+            "calories_burned": block.calories_burned if block else None,
+            "is_completed": session.id in completed_sessions,
+            "exercises": [
+                {
+                    "id": exercise.id,
+                    "name": translate_field(exercise, 'name', language),
+                    "description": translate_field(exercise, 'description', language),
+                    "sequence_number": exercise.sequence_number,
+                    "exercise_time": exercise.exercise_time,
+                    "exercise_type": exercise.exercise_type,
+                }
+                for exercise in (block.exercises.all() if block else [])
+            ],
+            "meals": [
+                {
+                    "id": meal.id,
+                    "type": meal.meal_type,
+                    "food_name": translate_field(meal, 'food_name', language),
+                    "calories": meal.calories,
+                    "water_content": meal.water_content,
+                    "preparation_time": meal.preparation_time,
+                    "is_completed": (session.id, meal.id) in completed_meals,
+                    "goal_type": meal.goal_type,
+                    "steps": [
                         {
-                            "id": session.id,
-                            "session_number": session.session_number,
-                            "calories_burned": session.calories_burned,
-                            "is_completed": self._is_session_completed(request.user, session),
-                            "exercises": [
-                                {
-                                    "id": exercise.id,
-                                    "name": exercise.name,
-                                    "description": exercise.description,
-                                    "difficulty_level": exercise.difficulty_level,
-                                    "target_muscle": exercise.target_muscle,
-                                    "video_url": exercise.video_url,
-                                    "exercise_type": exercise.exercise_type,
-                                }
-                                for exercise in session.exercises.all()
-                            ],
-                            "meals": [
-                                {
-                                    "id": meal.id,
-                                    "type": meal.meal_type,
-                                    "food_name": meal.food_name,
-                                    "calories": meal.calories,
-                                    "water_content": meal.water_content,
-                                    "preparation_time": meal.preparation_time,
-                                    "is_completed": self._is_meal_completed(request.user, session, meal),
-                                    "goal_type": meal.goal_type,
-                                    "preparations": [
-                                        {
-                                            "id": preparation.id,
-                                            "name": preparation.name,
-                                            "description": preparation.description,
-                                            "preparation_time": preparation.preparation_time,
-                                        }
-                                        for preparation in meal.preparations.all()
-                                    ],
-                                }
-                                for meal in session.meals.all()
-                            ],
+                            "id": step.id,
+                            "title": translate_field(step, 'title', language),
+                            "text": translate_field(step, 'text', language),
+                            "step_number": step.step_number,
+                            "step_time": step.step_time,
                         }
-                        for session in sessions
+                        for step in meal.steps.all()
                     ],
                 }
-
-                return Response(response_data, status=status.HTTP_200_OK)
-
-            except Exception as e:
-                return Response({"error": _("An unexpected error occurred: ") + str(e)},
-                                status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        def _is_session_completed(self, user, session):
-            completion = SessionCompletion.objects.filter(user=user, session=session).only("is_completed").first()
-            return completion.is_completed if completion else False
-
-        def _is_meal_completed(self, user, session, meal):
-            meal_completion = MealCompletion.objects.filter(user=user, session=session, meal=meal).only("is_completed").first()
-            return meal_completion.is_completed if meal_completion else False
-
-
-
+                for meal in session.meals.all()
+            ],
+        }
 
 
 class StatisticsView(APIView):
@@ -1078,9 +1173,26 @@ class StatisticsView(APIView):
         responses={200: "Success", 400: "Invalid request"},
     )
     def post(self, request):
-        query_type = request.data.get("type")  # "daily", "weekly", or "monthly"
-        date_str = request.data.get("date")    # "YYYY-MM-DD"
+        return self.statistics(request, request.data.get("type"), request.data.get("date"))
 
+    @swagger_auto_schema(
+        operation_description="Same as POST with the parameters in the query string; supports If-None-Match.",
+        manual_parameters=[
+            openapi.Parameter('type', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              enum=["daily", "weekly", "monthly"], required=True),
+            openapi.Parameter('date', openapi.IN_QUERY, type=openapi.TYPE_STRING, format="date", required=True),
+        ],
+        responses={200: "Success", 304: "Not modified", 400: "Invalid request"},
+    )
+    def get(self, request):
+        return progress_response(
+            request,
+            lambda: self.statistics(request, request.query_params.get("type"), request.query_params.get("date")),
+            gated=False
+        )
+
+    def statistics(self, request, query_type, date_str):
+        """ query_type: "daily", "weekly" or "monthly"; date_str: "YYYY-MM-DD". """
         # Validate query_type
         if query_type not in ["daily", "weekly", "monthly"]:
             return Response({"error": "Invalid type. Use 'daily', 'weekly', or 'monthly'."}, status=400)
@@ -1113,10 +1225,7 @@ class StatisticsView(APIView):
           }
         }
         """
-        data_for_day = self._get_day_info(user, date, include_calories=True)
-        return {
-            str(date): data_for_day
-        }
+        return daily_statistics(user, date, date, include_calories=True)
 
     def get_weekly_data(self, user, date):
         """
@@ -1132,14 +1241,7 @@ class StatisticsView(APIView):
         start_date = date - timedelta(days=date.weekday())  # Monday
         end_date = start_date + timedelta(days=6)           # Sunday
 
-        result = {}
-        current = start_date
-        while current <= end_date:
-            data_for_day = self._get_day_info(user, current, include_calories=True)
-            result[str(current)] = data_for_day
-            current += timedelta(days=1)
-
-        return result
+        return daily_statistics(user, start_date, end_date, include_calories=True)
 
     def get_monthly_data(self, user, date):
         """
@@ -1160,52 +1262,8 @@ class StatisticsView(APIView):
         last_day = (next_month - timedelta(days=next_month.day)).day
         end_date = start_date.replace(day=last_day)
 
-        result = {}
-        current = start_date
-        while current <= end_date:
-            # We only want session_complete for monthly
-            day_info = self._get_day_info(user, current, include_calories=False)
-            result[str(current)] = {
-                "session_complete": day_info["session_complete"]
-            }
-            current += timedelta(days=1)
-
-        return result
-
-    def _get_day_info(self, user, date, include_calories=False):
-        # Check for completed blocks directly, instead of relying on SessionCompletion
-        blocks_this_day = ExerciseBlockCompletion.objects.filter(
-            user=user,
-            is_completed=True,
-            completion_date=date,
-            block__session__block__exercises__exercise_type=user.goal
-        ).distinct()
-
-        # Consider the session "complete" for statistics purposes if the block is completed
-        session_complete = blocks_this_day.exists()
-        day_info = {"session_complete": session_complete}
-
-        if include_calories:
-            # Calculate calories burned from completed blocks
-            total_burned = ExerciseBlockCompletion.objects.filter(
-                user=user,
-                completion_date=date,
-                is_completed=True,
-                block__session__block__exercises__exercise_type=user.goal
-            ).aggregate(Sum('block__calories_burned'))['block__calories_burned__sum'] or 0.0
-
-            # Calories gained from meals (unchanged)
-            total_gained = MealCompletion.objects.filter(
-                user=user,
-                completion_date=date,
-                is_completed=True,
-                meal__goal_type=user.goal
-            ).aggregate(Sum('meal__calories'))['meal__calories__sum'] or 0.0
-
-            day_info["total_calories_burned"] = float(total_burned)
-            day_info["calories_gained"] = float(total_gained)
-
-        return day_info
+        # We only want session_complete for monthly
+        return daily_statistics(user, start_date, end_date, include_calories=False)
 
 
 
@@ -1216,7 +1274,6 @@ from rest_framework.permissions import IsAuthenticated
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from datetime import datetime, timedelta
-from django.db.models import Sum
 from dateutil import parser as date_parser
 
 class WeeklyCaloriesView(APIView):
@@ -1232,6 +1289,11 @@ class WeeklyCaloriesView(APIView):
                     format="date",
                     description="Specify a date in the month (format: YYYY-MM-DD)"
                 ),
+                "granularity": openapi.Schema(
+                    type=openapi.TYPE_STRING,
+                    enum=list(GRANULARITIES),
+                    description="Buckets: 'week' (default, week_1..week_4), 'isoweek' (calendar weeks) or 'day'"
+                ),
             },
             required=["date"],
         ),
@@ -1239,6 +1301,10 @@ class WeeklyCaloriesView(APIView):
     )
     def post(self, request):
         date_str = request.data.get("date")  # "YYYY-MM-DD"
+        granularity = request.data.get("granularity", "week")
+
+        if granularity not in GRANULARITIES:
+            return Response({"error": "Invalid granularity. Use 'week', 'isoweek', or 'day'."}, status=400)
 
         # Parse date
         try:
@@ -1246,10 +1312,10 @@ class WeeklyCaloriesView(APIView):
         except (TypeError, ValueError):
             return Response({"error": "Invalid date format. Use YYYY-MM-DD."}, status=400)
 
-        result = self.get_monthly_weekly_calories(request.user, date)
+        result = self.get_monthly_weekly_calories(request.user, date, granularity)
         return Response(result, status=200)
 
-    def get_monthly_weekly_calories(self, user, date):
+    def get_monthly_weekly_calories(self, user, date, granularity='week'):
         """
         Return a dict with four keys (week_1, week_2, week_3, week_4), each containing
         total calories burned and gained for that week in the month.
@@ -1265,41 +1331,50 @@ class WeeklyCaloriesView(APIView):
           },
           ...
         }
+        With granularity 'isoweek' or 'day' the keys are calendar weeks ("2025-W10")
+        or dates instead. Every granularity is a single grouped query.
         """
-        # First day of the month
-        start_date = date.replace(day=1)
+        start_date, end_date = month_bounds(date)
+        return calories_by_bucket(user, start_date, end_date, granularity)
 
-        # Compute last day of the month
-        next_month = (start_date.replace(day=28) + timedelta(days=4))
-        last_day = (next_month - timedelta(days=next_month.day)).day
-        end_date = start_date.replace(day=last_day)
-
-        # Divide month into roughly 4 weeks (7-day periods, may not align with calendar weeks)
-        week_length = (end_date - start_date).days // 4 + 1
-        result = {}
-
-        for week in range(4):
-            week_start = start_date + timedelta(days=week * week_length)
-            week_end = min(week_start + timedelta(days=week_length - 1), end_date)
-
-            # Calculate calories for the week
-            total_burned = ExerciseBlockCompletion.objects.filter(
-                user=user,
-                completion_date__range=[week_start, week_end],
-                is_completed=True,
-                block__session__block__exercises__exercise_type=user.goal
-            ).aggregate(Sum('block__calories_burned'))['block__calories_burned__sum'] or 0.0
-
-            total_gained = MealCompletion.objects.filter(
-                user=user,
-                completion_date__range=[week_start, week_end],
-                is_completed=True,
-                meal__goal_type=user.goal
-            ).aggregate(Sum('meal__calories'))['meal__calories__sum'] or 0.0
-
-            result[f"week_{week + 1}"] = {
-                "total_calories_burned": float(total_burned),
-                "calories_gained": float(total_gained)
-            }
+class ProgramSnapshotView(APIView):
+    """
+    The user's whole program (sessions with block, exercises, meals and steps) for
+    their goal and in their language, sliced out of the compiled snapshot without
+    touching the ORM.
+    """
+    permission_classes = [IsAuthenticated]
 
-        return result
\ No newline at end of file
+    @swagger_auto_schema(
+        tags=['Sessions'],
+        operation_description=_("Compiled program content; one session when session_number is given."),
+        responses={200: "Success", 403: "Subscription expired", 404: "Session not found"},
+    )
+    def get(self, request, session_number=None):
+        entitlements = get_entitlements(request)
+        if not entitlements.has_access:
+            return Response({"error": _("Your subscription has ended. Please renew.")},
+                            status=status.HTTP_403_FORBIDDEN)
+        program_id = entitlements.program.pk
+        goal = request.user.goal
+        language = getattr(request.user, 'language', 'en')
+
+        snapshot = get_program_snapshot(program_id, goal, language)
+        if snapshot is None:
+            # Not compiled yet, or no content version (cache down): serialize from the database
+            data = program_sessions_data(program_id, goal, language)
+            if session_number is not None:
+                data = next((item for item in data if item["session_number"] == session_number), None)
+                if data is None:
+                    return Response({"error": _("Session not found.")}, status=status.HTTP_404_NOT_FOUND)
+            return Response(data, status=status.HTTP_200_OK)
+
+        if session_number is None:
+            # Streamed straight out of the mapping rather than copied into one bytes object
+            response = StreamingHttpResponse(snapshot.program_chunks(), content_type='application/json')
+            response['Content-Length'] = snapshot.program_size()
+            return response
+        body = snapshot.session_bytes(session_number)
+        if body is None:
+            return Response({"error": _("Session not found.")}, status=status.HTTP_404_NOT_FOUND)
+        return HttpResponse(body, content_type='application/json')
@@ -1,11 +1,10 @@
 from rest_framework import serializers
 from django.utils.translation import gettext_lazy as _
-from googletrans import Translator
 from django.utils.timezone import now
 from users_app.models import Meal, MealSteps, MealCompletion, Session
-from users_app.models import translate_text
-
-translator = Translator()
+from users_app.choice_labels import choice_label
+from users_app.translation import translation_batch
+from django.db import transaction
 
 def translate_field(instance, field_name, language):
     translated_field = f"{field_name}_{language}"
@@ -97,10 +96,10 @@ class MealListSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         data = super().to_representation(instance)
         language = self.context.get("language") or (self.context.get("request").user.language if self.context.get("request") else "en")
-        data['meal_type'] = getattr(instance, f"meal_type_{language}", None) or instance.get_meal_type_display()
+        data['meal_type'] = choice_label(instance.meal_type, language)
         data['food_name'] = translate_field(instance, 'food_name', language)
         data['description'] = translate_field(instance, 'description', language)
-        data['goal_type'] = translate_text(instance.get_goal_type_display(), language)
+        data['goal_type'] = choice_label(instance.goal_type, language)
         return data
 
 class MealDetailSerializer(serializers.ModelSerializer):
@@ -140,10 +139,10 @@ class MealDetailSerializer(serializers.ModelSerializer):
         language = self.context.get("language") or (
             self.context.get("request").user.language if self.context.get("request") else "en")
 
-        data['meal_type'] = getattr(instance, f"meal_type_{language}", None) or instance.get_meal_type_display()
+        data['meal_type'] = choice_label(instance.meal_type, language)
         data['food_name'] = translate_field(instance, 'food_name', language)
         data['description'] = translate_field(instance, 'description', language)
-        data['goal_type'] = translate_text(instance.get_goal_type_display(), language)
+        data['goal_type'] = choice_label(instance.goal_type, language)
         return data
 
 
@@ -233,35 +232,36 @@ class MealUpdateSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         steps_data = validated_data.pop('steps', None)
-        # Update Meal fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-
-        if steps_data is not None:
-            # Create a dictionary of existing steps keyed by their ID
-            existing_steps = {step.id: step for step in instance.steps.all()}
-            handled_ids = []
-
-            # Process each provided step
-            for step_dict in steps_data:
-                step_id = step_dict.get('id', None)
-                if step_id and step_id in existing_steps:
-                    # Update the existing step
-                    step_instance = existing_steps[step_id]
-                    for field, val in step_dict.items():
-                        setattr(step_instance, field, val)
-                    step_instance.save()
-                    handled_ids.append(step_id)
-                else:
-                    # Create a new step if no valid ID is provided
-                    new_step = MealSteps.objects.create(meal=instance, **step_dict)
-                    handled_ids.append(new_step.id)
-
-            # Optionally delete steps that were not provided in the update payload
-            for existing_id, step_obj in existing_steps.items():
-                if existing_id not in handled_ids:
-                    step_obj.delete()
+        with transaction.atomic(), translation_batch():
+            # Update Meal fields
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+
+            if steps_data is not None:
+                # Create a dictionary of existing steps keyed by their ID
+                existing_steps = {step.id: step for step in instance.steps.all()}
+                handled_ids = []
+
+                # Process each provided step
+                for step_dict in steps_data:
+                    step_id = step_dict.get('id', None)
+                    if step_id and step_id in existing_steps:
+                        # Update the existing step
+                        step_instance = existing_steps[step_id]
+                        for field, val in step_dict.items():
+                            setattr(step_instance, field, val)
+                        step_instance.save()
+                        handled_ids.append(step_id)
+                    else:
+                        # Create a new step if no valid ID is provided
+                        new_step = MealSteps.objects.create(meal=instance, **step_dict)
+                        handled_ids.append(new_step.id)
+
+                # Optionally delete steps that were not provided in the update payload
+                for existing_id, step_obj in existing_steps.items():
+                    if existing_id not in handled_ids:
+                        step_obj.delete()
 
         return instance
 
@@ -291,10 +291,12 @@ class MealCreateSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         steps_data = validated_data.pop('steps', [])
-        meal = Meal.objects.create(**validated_data)
-        # Create MealSteps (if any) and link them to the Meal
-        for idx, step_dict in enumerate(steps_data, start=1):
-            # Agar step_dict da step_number mavjud bo'lsa, uni olib tashlaymiz
-            step_dict.pop('step_number', None)
-            MealSteps.objects.create(meal=meal, step_number=idx, **step_dict)
+        # One transaction and one translation task for the meal and all its steps
+        with transaction.atomic(), translation_batch():
+            meal = Meal.objects.create(**validated_data)
+            # Create MealSteps (if any) and link them to the Meal
+            for idx, step_dict in enumerate(steps_data, start=1):
+                # Agar step_dict da step_number mavjud bo'lsa, uni olib tashlaymiz
+                step_dict.pop('step_number', None)
+                MealSteps.objects.create(meal=meal, step_number=idx, **step_dict)
         return meal
@@ -1,5 +1,4 @@
 from datetime import timedelta
-from django.utils import timezone
 from django.utils.timezone import localdate, now
 from rest_framework import viewsets, status
 from rest_framework.views import APIView
@@ -13,7 +12,7 @@ from rest_framework.decorators import action
 from django.shortcuts import get_object_or_404
 import json
 
-from users_app.models import Meal, MealSteps, MealCompletion, SessionCompletion, Session, UserProgram, UserSubscription
+from users_app.models import Meal, MealSteps, MealCompletion, SessionCompletion, Session
 from food.serializers import *
 
 from rest_framework import viewsets, status
@@ -21,24 +20,13 @@ from rest_framework.response import Response
 from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from rest_framework.decorators import action
 from drf_yasg.utils import swagger_auto_schema
-from django.utils import timezone
 from rest_framework.permissions import IsAuthenticated
 from exercise.views import maybe_mark_session_completed
+from users_app.progress import lazy_materialization_enabled, materialize_session, record_meal_completion
+from django.db import transaction
 # Import your serializerskkkkkkkk
 
 
-translator = Translator()
-
-
-def translate_text(text, target_language):
-    try:
-        translation = translator.translate(text, dest=target_language)
-        return translation.text if translation else text
-    except Exception as e:
-        print(f"Translation error: {e}")
-        return text
-
-
 
 # food/views.py
 
@@ -49,7 +37,11 @@ from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated
 from drf_yasg.utils import swagger_auto_schema
 
-from users_app.models import Meal, UserProgram, UserSubscription
+from users_app.models import Meal
+from users_app.entitlements import get_entitlements
+from users_app.caching import catalog_response, progress_response
+from exercise.pagination import KeysetCursorPagination
+from exercise.projections import MealListProjection
 from .serializers import (
     MealListSerializer,
     MealDetailSerializer,
@@ -65,6 +57,7 @@ class MealViewSet(viewsets.ModelViewSet):
     queryset = Meal.objects.all()
     permission_classes = [IsAuthenticated]
     parser_classes = [JSONParser]  # main endpoints: JSON only
+    pagination_class = KeysetCursorPagination
 
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
@@ -75,18 +68,10 @@ class MealViewSet(viewsets.ModelViewSet):
         if user.is_staff or user.is_superuser:
             return Meal.objects.all().prefetch_related("steps")
 
-        user_program = UserProgram.objects.filter(user=user, is_active=True).first()
-        if not user_program:
-            return Meal.objects.none()
-
-        has_active_subscription = UserSubscription.objects.filter(
-            user=user,
-            is_active=True,
-            end_date__gte=timezone.now().date()
-        ).exists()
-
-        if not has_active_subscription:
+        entitlements = get_entitlements(self.request)
+        if not entitlements.has_access:
             return Meal.objects.none()
+        user_program = entitlements.user_program
 
         return Meal.objects.filter(
             sessions__program=user_program.program,
@@ -95,7 +80,9 @@ class MealViewSet(viewsets.ModelViewSet):
 
     def get_serializer_class(self):
         if self.action == 'list':
-            return MealListSerializer
+            if getattr(self, 'swagger_fake_view', False):
+                return MealListSerializer
+            return MealListProjection
         elif self.action == 'retrieve':
             return MealDetailSerializer
         elif self.action == 'create':
@@ -166,10 +153,7 @@ class MealViewSet(viewsets.ModelViewSet):
         user = request.user
         # Allow admins to bypass subscription and program checks
         if not (user.is_staff or user.is_superuser):
-            user_program = UserProgram.objects.filter(user=user, is_active=True).first()
-            if not user_program or not UserSubscription.objects.filter(
-                user=user, is_active=True, end_date__gte=timezone.now().date()
-            ).exists():
+            if not get_entitlements(request).has_access:
                 return Response(
                     {
                         "error": _("Please upgrade your subscription to access meals."),
@@ -178,7 +162,7 @@ class MealViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_403_FORBIDDEN
                 )
 
-        return super().list(request, *args, **kwargs)
+        return catalog_response(request, lambda: super(MealViewSet, self).list(request, *args, **kwargs))
 
     @swagger_auto_schema(
         operation_description="Retrieve a single Meal (subscription required for non-admins)",
@@ -197,18 +181,16 @@ class MealViewSet(viewsets.ModelViewSet):
         }
     )
     def retrieve(self, request, pk=None, *args, **kwargs):
+        return catalog_response(request, lambda: self._retrieve(request))
+
+    def _retrieve(self, request):
         user = request.user
         # Check if the meal is accessible (for non-admins)
         instance = self.get_object()  # This uses get_queryset
         if not instance and not (user.is_staff or user.is_superuser):
-            user_program = UserProgram.objects.filter(user=user, is_active=True).first()
-            if user_program:
-                has_active_subscription = UserSubscription.objects.filter(
-                    user=user,
-                    is_active=True,
-                    end_date__gte=timezone.now().date()
-                ).exists()
-                if not has_active_subscription:
+            entitlements = get_entitlements(request)
+            if entitlements.user_program:
+                if not entitlements.has_active_subscription:
                     return Response(
                         {
                             "error": _("Please upgrade your subscription to access meals."),
@@ -263,9 +245,10 @@ class MealStepViewSet(viewsets.ModelViewSet):
         if user.is_staff:
             return MealSteps.objects.all()
 
-        user_program = UserProgram.objects.filter(user=user, is_active=True).first()
-        if not user_program or not user_program.is_subscription_active():
+        entitlements = get_entitlements(self.request)
+        if not entitlements.has_access:
             return MealSteps.objects.none()
+        user_program = entitlements.user_program
 
         # Only return steps for meals the user has access to
         accessible_meals = Meal.objects.filter(
@@ -283,6 +266,7 @@ class MealCompletionViewSet(viewsets.ModelViewSet):
     queryset = MealCompletion.objects.all()
     serializer_class = MealCompletionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetCursorPagination
 
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
@@ -291,6 +275,29 @@ class MealCompletionViewSet(viewsets.ModelViewSet):
             user=self.request.user,
             meal__goal_type=self.request.user.goal
         )
+
+    # Keep the daily rollup in step with edits made through this endpoint
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            # Read under the row lock, so a concurrent edit cannot land between the read and the delta
+            previous = MealCompletion.objects.select_for_update().get(pk=serializer.instance.pk)
+            if previous.is_completed:
+                record_meal_completion(self.request.user, previous.meal, previous.session,
+                                       previous.completion_date, sign=-1)
+            # Write through the locked row, not the instance loaded before the lock
+            serializer.instance = previous
+            meal_completion = serializer.save()
+            if meal_completion.is_completed:
+                record_meal_completion(self.request.user, meal_completion.meal, meal_completion.session,
+                                       meal_completion.completion_date)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            previous = MealCompletion.objects.select_for_update().get(pk=instance.pk)
+            if previous.is_completed:
+                record_meal_completion(self.request.user, previous.meal, previous.session,
+                                       previous.completion_date, sign=-1)
+            instance.delete()
     def get_serializer_context(self):
         context = super().get_serializer_context()
         if self.request.user.is_authenticated:
@@ -339,21 +346,34 @@ class CompleteMealView(APIView):
         # if meal.goal_type != request.user.goal:
         #     return Response({"error": _("This meal does not match your goal.")}, status=status.HTTP_400_BAD_REQUEST)
 
-        user_program = UserProgram.objects.filter(user=request.user, is_active=True).first()
-        if not user_program or not user_program.is_subscription_active():
+        entitlements = get_entitlements(request)
+        user_program = entitlements.user_program
+        if not entitlements.has_access:
             return Response({"error": _("Your subscription has ended. Please renew.")},
                             status=status.HTTP_403_FORBIDDEN)
         meal_completion = MealCompletion.objects.filter(session_id=session_id, meal_id=meal_id,
                                                         user=request.user).first()
+        if (not meal_completion and lazy_materialization_enabled()
+                and session.program_id == user_program.program_id and session.meals.filter(id=meal_id).exists()):
+            # Lazy mode: the user's rows for this session are created on first use
+            materialize_session(request.user, session)
+            meal_completion = MealCompletion.objects.filter(session_id=session_id, meal_id=meal_id,
+                                                            user=request.user).first()
         if not meal_completion:
             return Response({"error": _("Session and Meal combination not found.")}, status=status.HTTP_404_NOT_FOUND)
-        if meal_completion.is_completed:
-            return Response({"message": _("This meal has already been completed.")}, status=status.HTTP_200_OK)
 
-        # Mark the meal as completed
-        meal_completion.is_completed = True
-        meal_completion.completion_date = now().date()
-        meal_completion.save()
+        # Mark the meal as completed. The row is re-read under its lock, so of two
+        # concurrent submits only the first applies the rollup delta
+        with transaction.atomic():
+            meal_completion = MealCompletion.objects.select_for_update().get(pk=meal_completion.pk)
+            already_completed = meal_completion.is_completed
+            if not already_completed:
+                meal_completion.is_completed = True
+                meal_completion.completion_date = now().date()
+                meal_completion.save()
+                record_meal_completion(request.user, meal, session, meal_completion.completion_date)
+        if already_completed:
+            return Response({"message": _("This meal has already been completed.")}, status=status.HTTP_200_OK)
 
         # Check and mark session as completed if conditions are met
         session_completed = maybe_mark_session_completed(request.user, session)
@@ -394,12 +414,14 @@ class UserDailyMealsView(APIView):
         }
     )
     def get(self, request):
-        today = localdate()
-        user = request.user
-        user_program = UserProgram.objects.filter(user=user, is_active=True).first()
-        if not user_program or not user_program.is_subscription_active():
+        if not get_entitlements(request).has_access:
             return Response({"error": _("Your subscription has ended. Please renew.")},
                             status=status.HTTP_403_FORBIDDEN)
+        return progress_response(request, lambda: self._get(request))
+
+    def _get(self, request):
+        today = localdate()
+        user = request.user
         user_sessions = SessionCompletion.objects.filter(user=user, is_completed=True,
                                                          completion_date=today).values_list('session_id', flat=True)
         if not user_sessions:
@@ -446,11 +468,14 @@ class MealDetailView(APIView):
         }
     )
     def get(self, request, meal_id):
-        user = request.user
-        user_program = UserProgram.objects.filter(user=user, is_active=True).first()
-        if not user_program or not user_program.is_subscription_active():
+        if not get_entitlements(request).has_access:
             return Response({"error": _("Your subscription has ended. Please renew.")},
                             status=status.HTTP_403_FORBIDDEN)
+        return catalog_response(request, lambda: self._get(request, meal_id))
+
+    def _get(self, request, meal_id):
+        user = request.user
+        user_program = get_entitlements(request).user_program
 
         meal = Meal.objects.prefetch_related('steps').filter(
             id=meal_id,
@@ -2,6 +2,7 @@ from payme.types import response
 from payme.views import PaymeWebHookAPIView
 from payme.models import PaymeTransactions
 from users_app.models import UserSubscription
+from users_app.entitlements import invalidate_entitlements
 from django.utils import timezone
 from datetime import timedelta
 from rest_framework.response import Response
@@ -167,6 +168,7 @@ class PaymeCallBackAPIView(PaymeWebHookAPIView):
                 user=user,
                 is_active=True
             ).exclude(id=subscription.id).update(is_active=False, end_date=None)
+            invalidate_entitlements(user.id)
 
             # Extend the existing subscription
             add_days = SUBSCRIPTION_DAYS.get(subscription.pending_extension_type or subscription.subscription_type, 30)
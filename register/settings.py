@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 import os
 from pathlib import Path
 from datetime import timedelta
+from celery.schedules import crontab
 from django.utils.translation import gettext_lazy as _
 from dotenv import load_dotenv
 
@@ -93,6 +94,10 @@ REST_FRAMEWORK = {
 
 }
 
+# Opt-in cursor pagination of the user-facing listings (exercise.pagination)
+CURSOR_PAGE_SIZE = int(os.getenv('CURSOR_PAGE_SIZE', 20))
+CURSOR_MAX_PAGE_SIZE = int(os.getenv('CURSOR_MAX_PAGE_SIZE', 100))
+
 CORS_ALLOW_ALL_ORIGINS = True
 
 
@@ -206,6 +211,27 @@ CACHES = {
     }
 }
 
+TRANSLATION_LOCAL_CACHE_SIZE = int(os.getenv('TRANSLATION_LOCAL_CACHE_SIZE', 2048))
+TRANSLATION_SHARED_CACHE_TIMEOUT = int(os.getenv('TRANSLATION_SHARED_CACHE_TIMEOUT', 60 * 60 * 24 * 30))
+
+# Tried in order; a provider whose circuit breaker is open is skipped
+TRANSLATION_PROVIDERS = [
+    name.strip() for name in os.getenv('TRANSLATION_PROVIDERS', 'memory,google').split(',') if name.strip()
+]
+TRANSLATION_PROVIDER_OPTIONS = {
+    'google': {'timeout': float(os.getenv('TRANSLATION_GOOGLE_TIMEOUT', 5))},
+    'memory': {'path': os.getenv('TRANSLATION_MEMORY_PATH', str(BASE_DIR / 'users_app' / 'translation_memory.json'))},
+}
+TRANSLATION_BREAKER_THRESHOLD = int(os.getenv('TRANSLATION_BREAKER_THRESHOLD', 5))
+TRANSLATION_BREAKER_RESET_TIMEOUT = int(os.getenv('TRANSLATION_BREAKER_RESET_TIMEOUT', 60))
+
+# "eager": create every completion row when a program is assigned
+# "lazy": create a session's completion rows when the user first uses it
+SESSION_MATERIALIZATION = os.getenv('SESSION_MATERIALIZATION', 'eager')
+
+# Upper bound for the shared entitlement cache; entries never outlive the subscription
+ENTITLEMENT_CACHE_TIMEOUT = int(os.getenv('ENTITLEMENT_CACHE_TIMEOUT', 60 * 60 * 24))
+
 
 
 TIME_ZONE = "Asia/Tashkent"
@@ -213,6 +239,32 @@ USE_I18N = True
 USE_L10N = True
 USE_TZ = True
 
+CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    # Right after midnight so is_active can be trusted for the whole day
+    'expire-subscriptions': {
+        'task': 'users_app.tasks.expire_subscriptions',
+        'schedule': crontab(hour=0, minute=5),
+    },
+    # Catches changes no signal sees (bulk updates, the expiry sweep)
+    'refresh-dashboard-metrics': {
+        'task': 'admin_app.tasks.refresh_dashboard_metrics_task',
+        'schedule': crontab(minute='*/15'),
+    },
+}
+SUBSCRIPTION_EXPIRY_BATCH_SIZE = int(os.getenv('SUBSCRIPTION_EXPIRY_BATCH_SIZE', 1000))
+
+# Admin dashboard snapshot (admin_app.metrics): changes within DEBOUNCE seconds share one
+# refresh; a snapshot older than MAX_AGE seconds is served but flagged stale
+DASHBOARD_METRICS_DEBOUNCE = int(os.getenv('DASHBOARD_METRICS_DEBOUNCE', 60))
+DASHBOARD_METRICS_MAX_AGE = int(os.getenv('DASHBOARD_METRICS_MAX_AGE', 60 * 15))
+
+# Compiled program snapshots (exercise.snapshots), one file per program, goal, language and
+# content version; must be shared by all workers of a host. Content edits within
+# DEBOUNCE seconds share one rebuild
+PROGRAM_SNAPSHOT_DIR = os.getenv('PROGRAM_SNAPSHOT_DIR', os.path.join(BASE_DIR, 'snapshots'))
+PROGRAM_SNAPSHOT_DEBOUNCE = int(os.getenv('PROGRAM_SNAPSHOT_DEBOUNCE', 30))
+
 
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -0,0 +1,200 @@
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from users_app.entitlements import get_entitlements
+
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------
+# Content version
+# ------------------------------
+# One global counter for the admin-authored catalog (programs, sessions, blocks,
+# exercises, meals, steps). Every cached response embeds it in its key, so bumping
+# it retires all of them at once; old entries simply expire.
+CONTENT_VERSION_KEY = 'content:version'
+
+# Sent after the content version has moved on (outside any transaction)
+content_version_changed = Signal()
+
+_local = threading.local()
+
+
+def _local_ttl():
+    return getattr(settings, 'CONTENT_VERSION_LOCAL_TTL', 5)
+
+
+def get_content_version():
+    """
+    The current content version, or None when the cache is unavailable. The value
+    is memoized in-process for CONTENT_VERSION_LOCAL_TTL seconds so that a cached
+    read costs a single cache GET.
+    """
+    now = time.monotonic()
+    memo = getattr(_local, 'version', None)
+    if memo and now - memo[1] < _local_ttl():
+        return memo[0]
+    try:
+        version = cache.get(CONTENT_VERSION_KEY)
+        if version is None:
+            # Start from the clock, not 1: a lost counter must never reuse old keys
+            cache.add(CONTENT_VERSION_KEY, int(time.time() * 1000), timeout=None)
+            version = cache.get(CONTENT_VERSION_KEY)
+    except Exception as e:
+        logger.warning(f"Response cache unavailable: {e}")
+        return None
+    _local.version = (version, now)
+    return version
+
+
+def _bump():
+    _local.version = None
+    try:
+        cache.incr(CONTENT_VERSION_KEY)
+    except ValueError:
+        cache.add(CONTENT_VERSION_KEY, int(time.time() * 1000), timeout=None)
+    except Exception as e:
+        logger.warning(f"Could not bump content version: {e}")
+        return
+    content_version_changed.send(sender=None)
+
+
+def bump_content_version():
+    """ Invalidate every cached catalog response once the current transaction commits. """
+    transaction.on_commit(_bump)
+
+
+# ------------------------------
+# Progress version
+# ------------------------------
+# A per-user counter bumped whenever the user's completions (and so their session
+# list, daily meals and statistics) change. Not memoized: it changes on the
+# user's own requests.
+def progress_version_key(user_id):
+    return f"progress:version:{user_id}"
+
+
+def get_progress_version(user_id):
+    key = progress_version_key(user_id)
+    try:
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, int(time.time() * 1000), timeout=None)
+            version = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Response cache unavailable: {e}")
+        return None
+    return version
+
+
+def bump_progress_version(user_id):
+    """ Retire the ETags of a user's progress-dependent responses once the transaction commits. """
+    key = progress_version_key(user_id)
+
+    def bump():
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, int(time.time() * 1000), timeout=None)
+        except Exception as e:
+            logger.warning(f"Could not bump progress version: {e}")
+    transaction.on_commit(bump)
+
+
+# ------------------------------
+# Conditional GET and response cache
+# ------------------------------
+def response_digest(request, version, scope):
+    """ Hash of (host, endpoint URL incl. query string, content version, scope): the cache key and ETag. """
+    raw = "|".join([request.get_host(), request.get_full_path(), str(version), *map(str, scope)])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _not_modified(request, etag):
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match:
+        return False
+    tags = parse_etags(if_none_match)
+    return '*' in tags or etag in tags
+
+
+def versioned_response(request, build, gated=True, per_user=False, store=True):
+    """
+    Serve a read with a strong ETag and, optionally, from the response cache.
+
+    `build()` produces the Response as the view normally would. The key (and
+    ETag) covers the URL, the user's program, goal and language and the content
+    version; with `per_user` also the user, their progress version and today's
+    date. A matching If-None-Match gets 304 before anything is loaded or
+    serialized. With `store`, 200 bodies are kept in the cache.
+
+    With `gated`, the user's entitlements are checked first and users without
+    access always go through `build()` (which answers 403/404). Staff see
+    unfiltered content and are left alone.
+    """
+    user = request.user
+    if not user.is_authenticated or user.is_staff or user.is_superuser:
+        return build()
+
+    program_id = None
+    if gated:
+        entitlements = get_entitlements(request)
+        if not entitlements.has_access:
+            return build()
+        program_id = entitlements.program.pk
+
+    version = get_content_version()
+    if version is None:
+        return build()
+    scope = [program_id, user.goal, user.language]
+    if per_user:
+        progress_version = get_progress_version(user.pk)
+        if progress_version is None:
+            return build()
+        scope += [user.pk, progress_version, timezone.localdate()]
+    digest = response_digest(request, version, scope)
+    key, etag = f"response:{digest}", f'"{digest}"'
+
+    if _not_modified(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    if store:
+        try:
+            data = cache.get(key)
+        except Exception as e:
+            logger.warning(f"Response cache unavailable: {e}")
+            data = None
+        if data is not None:
+            return Response(data, status=status.HTTP_200_OK, headers={'ETag': etag})
+
+    response = build()
+    if response.status_code == status.HTTP_200_OK:
+        response['ETag'] = etag
+        if store:
+            try:
+                cache.set(key, response.data, timeout=getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60 * 60))
+            except Exception as e:
+                logger.warning(f"Response cache unavailable: {e}")
+    return response
+
+
+def catalog_response(request, build, gated=True):
+    """ Admin-authored content (blocks, exercises, meals, programs): cached and ETagged. """
+    return versioned_response(request, build, gated=gated)
+
+
+def progress_response(request, build, gated=True):
+    """ Per-user reads (session list, daily meals, statistics): ETagged, not stored. """
+    return versioned_response(request, build, gated=gated, per_user=True, store=False)
@@ -0,0 +1,51 @@
+from types import MappingProxyType
+
+
+# Translated display labels for the closed choice sets used by Program, User,
+# Exercise and Meal (GOAL_CHOICES, EXERCISE_TYPES, GOAL_TYPES, MEAL_TYPES).
+# The table is built once at import time and is read-only afterwards, so
+# rendering a choice label is a plain dict lookup with no network call.
+_LABELS = {
+    'en': {
+        'gain_muscle': "Gain Muscle",
+        'lose_weight': "Lose Weight",
+        'gain_weight': "Gain Weight",
+        'breakfast': "Breakfast",
+        'lunch': "Lunch",
+        'snack': "Snack",
+        'dinner': "Dinner",
+    },
+    'ru': {
+        'gain_muscle': "Набор мышечной массы",
+        'lose_weight': "Похудение",
+        'gain_weight': "Набор веса",
+        'breakfast': "Завтрак",
+        'lunch': "Обед",
+        'snack': "Перекус",
+        'dinner': "Ужин",
+    },
+    'uz': {
+        'gain_muscle': "Mushak massasini oshirish",
+        'lose_weight': "Vazn yo'qotish",
+        'gain_weight': "Vazn olish",
+        'breakfast': "Nonushta",
+        'lunch': "Tushlik",
+        'snack': "Yengil tamaddi",
+        'dinner': "Kechki ovqat",
+    },
+}
+
+CHOICE_LABELS = MappingProxyType({
+    language: MappingProxyType(labels) for language, labels in _LABELS.items()
+})
+
+DEFAULT_LANGUAGE = 'en'
+
+
+def choice_label(value, language):
+    """
+    Return the translated label of a choice value (e.g. 'lose_weight' -> 'Похудение').
+    Unknown languages fall back to English, unknown values to the raw value.
+    """
+    labels = CHOICE_LABELS.get(language) or CHOICE_LABELS[DEFAULT_LANGUAGE]
+    return labels.get(value, value)
@@ -0,0 +1,145 @@
+import logging
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from users_app.models import Program, UserProgram, UserSubscription
+
+
+logger = logging.getLogger(__name__)
+
+
+ENTITLEMENT_CACHE_TIMEOUT = getattr(settings, 'ENTITLEMENT_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def entitlement_cache_key(user_id):
+    return f"entitlements:{user_id}"
+
+
+def _seconds_until_expiry(end_date):
+    """ Seconds until the end of `end_date` (local time), i.e. when the subscription lapses. """
+    expires_at = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+    return int((expires_at - timezone.now()).total_seconds())
+
+
+def load_entitlement_record(user_id):
+    """
+    The user's (active program, program goal, subscription end date) as a plain dict,
+    from the shared cache when possible. The cache entry never outlives the subscription.
+    """
+    key = entitlement_cache_key(user_id)
+    try:
+        record = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Entitlement cache unavailable: {e}")
+        record = None
+    if record is not None:
+        return record
+
+    user_program = UserProgram.objects.filter(
+        user_id=user_id,
+        is_active=True
+    ).values('id', 'program_id', 'program__program_goal').first()
+    # is_active is kept current by the nightly expire_subscriptions sweep
+    subscription = UserSubscription.objects.filter(
+        user_id=user_id,
+        is_active=True
+    ).values('id', 'end_date').first()
+
+    record = {
+        'user_program_id': user_program['id'] if user_program else None,
+        'program_id': user_program['program_id'] if user_program else None,
+        'program_goal': user_program['program__program_goal'] if user_program else None,
+        'subscription_id': subscription['id'] if subscription else None,
+        'subscription_end_date': subscription['end_date'] if subscription else None,
+    }
+    timeout = ENTITLEMENT_CACHE_TIMEOUT
+    if subscription:
+        timeout = min(timeout, _seconds_until_expiry(subscription['end_date']))
+    if timeout > 0:
+        try:
+            cache.set(key, record, timeout=timeout)
+        except Exception as e:
+            logger.warning(f"Entitlement cache unavailable: {e}")
+    return record
+
+
+def invalidate_entitlements(user_id):
+    """ Drop the cached entitlements of a user once the current transaction commits. """
+    def delete():
+        try:
+            cache.delete(entitlement_cache_key(user_id))
+        except Exception as e:
+            logger.warning(f"Entitlement cache unavailable: {e}")
+    transaction.on_commit(delete)
+
+
+class Entitlements:
+    """
+    What a user is entitled to on this request: their active UserProgram and
+    active UserSubscription. They are read once per request from the shared
+    cache (or the database on a miss) and reused by permissions, get_queryset()
+    and the view body. The instances only carry the cached fields; anything
+    else is loaded from the database on access.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def record(self):
+        return load_entitlement_record(self.user.pk)
+
+    @cached_property
+    def subscription(self):
+        end_date = self.record['subscription_end_date']
+        if not end_date or end_date < timezone.now().date():
+            return None
+        return UserSubscription.from_db(
+            'default',
+            ['id', 'user_id', 'end_date', 'is_active'],
+            [self.record['subscription_id'], self.user.pk, end_date, True]
+        )
+
+    @property
+    def has_active_subscription(self):
+        return self.subscription is not None
+
+    @cached_property
+    def user_program(self):
+        if not self.record['user_program_id']:
+            return None
+        user_program = UserProgram.from_db(
+            'default',
+            ['id', 'user_id', 'program_id', 'is_active'],
+            [self.record['user_program_id'], self.user.pk, self.record['program_id'], True]
+        )
+        user_program.user = self.user
+        user_program.program = Program.from_db(
+            'default', ['id', 'program_goal'], [self.record['program_id'], self.record['program_goal']]
+        )
+        # Prime UserProgram.is_subscription_active() for this request
+        user_program._subscription_active = self.has_active_subscription
+        return user_program
+
+    @property
+    def program(self):
+        return self.user_program.program if self.user_program else None
+
+    @property
+    def has_access(self):
+        """ An active program and an active subscription. """
+        return self.user_program is not None and self.has_active_subscription
+
+
+def get_entitlements(request):
+    """ The Entitlements of request.user, created once per request. """
+    http_request = getattr(request, '_request', request)  # DRF Request wraps the HttpRequest
+    entitlements = getattr(http_request, '_entitlements', None)
+    if entitlements is None or entitlements.user != request.user:
+        entitlements = http_request._entitlements = Entitlements(request.user)
+    return entitlements
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from users_app.progress import backfill_session_completion_program
+
+
+class Command(BaseCommand):
+    help = "Copy program and session_number from Session onto SessionCompletion rows that lack them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Rows updated per UPDATE statement")
+
+    def handle(self, *args, **options):
+        total = backfill_session_completion_program(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {total} SessionCompletion rows."))
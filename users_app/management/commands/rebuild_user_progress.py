@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from users_app.progress import rebuild_user_progress
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily UserProgress rollup from the block and meal completion history."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help="Only rebuild this user's rows (can be repeated)")
+
+    def handle(self, *args, **options):
+        rows = rebuild_user_progress(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} UserProgress rows."))
@@ -2,27 +2,77 @@ from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, Permis
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 from django.utils.translation import gettext_lazy as _
-from googletrans import Translator
 from django.utils import timezone
 from django.utils.timezone import now
 from datetime import timedelta, datetime, date
 
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from users_app.translation import (schedule_translation, source_fingerprint, record_avoided_translations,
+                                   TRANSLATION_LANGUAGES, FAILED_FINGERPRINT)
+from users_app.choice_labels import choice_label
 
 
 
-translator = Translator()
+class TranslatedFieldsMixin(models.Model):
+    """
+    Translates the source fields listed in `translated_fields` in the background.
 
+    Every source field has `<field>_uz/_ru/_en` columns, and `translation_fingerprints`
+    stores the sha1 of the source text each field was last translated from. save()
+    persists the row right away and hands only the fields whose text no longer matches
+    its fingerprint to a Celery task; until it runs, serializers fall back to the source text.
+    """
+    translation_fingerprints = models.JSONField(default=dict, blank=True, editable=False)
 
-def translate_text(text, target_language):
-    try:
-        translation = translator.translate(text, dest=target_language)
-        return translation.text if translation else text
-    except Exception as e:
-        print(f"Translation error: {e}")
-        return text
+    translated_fields = ()
 
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._translation_sources = {
+            name: instance.__dict__[name] for name in cls.translated_fields if name in instance.__dict__
+        }
+        return instance
+
+    def get_changed_translated_fields(self):
+        # A field needs work when its text no longer matches the fingerprint and was
+        # not already handed off as-is (loaded unchanged, or queued by an earlier save),
+        # or when its last translation failed
+        fingerprints = self.translation_fingerprints or {}
+        handled = getattr(self, '_translation_sources', {})
+        return [
+            name for name in self.translated_fields
+            if fingerprints.get(name) == FAILED_FINGERPRINT
+            or (fingerprints.get(name) != source_fingerprint(getattr(self, name))
+                and (name not in handled or handled[name] != getattr(self, name)))
+        ]
+
+    def save(self, *args, **kwargs):
+        changed = self.get_changed_translated_fields()
+        record_avoided_translations(
+            (len(self.translated_fields) - len(changed)) * len(TRANSLATION_LANGUAGES)
+        )
+
+        fingerprints = dict(self.translation_fingerprints or {})
+        for name in changed:
+            # Drop stale translations; the task records the new fingerprint
+            for language in TRANSLATION_LANGUAGES:
+                setattr(self, f"{name}_{language}", '')
+            if getattr(self, name):
+                fingerprints.pop(name, None)
+            else:
+                fingerprints[name] = source_fingerprint(None)  # nothing to translate
+        self.translation_fingerprints = fingerprints
+        super().save(*args, **kwargs)
+
+        pending = [name for name in changed if getattr(self, name)]
+        if pending:
+            schedule_translation(self, pending)
+        self._translation_sources = {name: getattr(self, name) for name in self.translated_fields}
 
 
 def default_notification_preferences():
@@ -114,19 +164,38 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email_or_phone'
     REQUIRED_FIELDS = ['first_name', 'last_name']
 
+    class Meta:
+        indexes = [
+            # Admin user browser: newest first, optionally filtered
+            models.Index(fields=['date_joined', 'id'], name='user_joined_id'),
+            models.Index(fields=['country', 'date_joined', 'id'], name='user_country_joined_id'),
+            models.Index(fields=['date_joined', 'id'], condition=models.Q(is_premium=True),
+                         name='user_premium_joined_id'),
+            models.Index(fields=['date_joined', 'id'], condition=models.Q(is_active=False),
+                         name='user_inactive_joined_id'),
+        ]
+
     def __str__(self):
         return self.email_or_phone
 
 
 class UserProgress(models.Model):
+    """
+    Daily rollup of a user's completions, kept up to date by the completion views
+    (see users_app.progress) and rebuilt with `manage.py rebuild_user_progress`.
+    Only blocks and meals matching the user's goal are counted.
+    """
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     date = models.DateField()
-    completed_sessions = models.IntegerField(default=0)
-    total_calories_burned = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
-    calories_gained = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
+    completed_sessions = models.IntegerField(default=0)  # Completed blocks that day
+    total_calories_burned = models.DecimalField(max_digits=9, decimal_places=2, default=0.00)
+    calories_gained = models.DecimalField(max_digits=9, decimal_places=2, default=0.00)
     missed_sessions = models.IntegerField(default=0)
     week_number = models.IntegerField()
-    program = models.ForeignKey('Program', on_delete=models.CASCADE)  # Link to the program for tracking
+    program = models.ForeignKey('Program', on_delete=models.CASCADE, null=True, blank=True)  # Link to the program for tracking
+
+    class Meta:
+        unique_together = ('user', 'date')
 
 
 class Program(models.Model):
@@ -143,14 +212,10 @@ class Program(models.Model):
     is_active = models.BooleanField(default=True)
 
     def save(self, *args, **kwargs):
-        # Translate the display value of program_goal (e.g., "Gain Muscle")
-        display_goal = self.get_program_goal_display()
-        if not self.program_goal_uz:
-            self.program_goal_uz = translate_text(display_goal, 'uz')
-        if not self.program_goal_ru:
-            self.program_goal_ru = translate_text(display_goal, 'ru')
-        if not self.program_goal_en:
-            self.program_goal_en = translate_text(display_goal, 'en')
+        # program_goal is a closed choice set, so its labels come from the static table
+        self.program_goal_uz = choice_label(self.program_goal, 'uz')
+        self.program_goal_ru = choice_label(self.program_goal, 'ru')
+        self.program_goal_en = choice_label(self.program_goal, 'en')
         super(Program, self).save(*args, **kwargs)
 
     def __str__(self):
@@ -177,6 +242,14 @@ class UserSubscription(models.Model):
                 name='unique_active_subscription_per_user'
             )
         ]
+        indexes = [
+            # Entitlements: a user's active subscription and its end_date
+            models.Index(fields=['user', 'end_date'], condition=models.Q(is_active=True),
+                         name='active_subscription_user_end'),
+            # expire_subscriptions: active rows past their end_date
+            models.Index(fields=['end_date'], condition=models.Q(is_active=True),
+                         name='active_subscription_end_date'),
+        ]
 
     @property
     def amount(self):
@@ -197,6 +270,13 @@ class UserSubscription(models.Model):
         self.user.is_premium = self.is_active
         self.user.save()
         super().save(*args, **kwargs)
+        from users_app.entitlements import invalidate_entitlements  # avoid circular import
+        invalidate_entitlements(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        from users_app.entitlements import invalidate_entitlements
+        invalidate_entitlements(self.user_id)
+        return super().delete(*args, **kwargs)
 
     def is_subscription_active(self):
         return self.is_active and self.end_date >= timezone.now().date()
@@ -240,6 +320,10 @@ class UserProgram(models.Model):
     progress = models.IntegerField(default=0)
     is_active = models.BooleanField(default=True)
 
+    # Progress cursor: the highest completed session and when it was completed
+    last_completed_session_number = models.IntegerField(default=0)
+    last_completed_date = models.DateField(null=True, blank=True)
+
     # REMOVE is_paid & subscription_type (Handled in UserSubscription)
     amount = models.IntegerField(blank=True, null=True)
     payment_method = models.CharField(max_length=255, blank=True, null=True)
@@ -248,6 +332,18 @@ class UserProgram(models.Model):
     def is_paid(self):
         return self.is_subscription_active()
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if self.user_id:
+            from users_app.entitlements import invalidate_entitlements  # avoid circular import
+            invalidate_entitlements(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        if self.user_id:
+            from users_app.entitlements import invalidate_entitlements
+            invalidate_entitlements(self.user_id)
+        return super().delete(*args, **kwargs)
+
     def calculate_progress(self):
         """
         Calculates how many sessions are completed vs total sessions in self.program.
@@ -259,7 +355,7 @@ class UserProgram(models.Model):
         total_sessions = self.program.total_sessions
         completed_sessions = SessionCompletion.objects.filter(
             user=self.user,
-            session__program=self.program,
+            program=self.program,
             is_completed=True
         ).count()
 
@@ -269,11 +365,14 @@ class UserProgram(models.Model):
 
 
     def is_subscription_active(self):
-        return UserSubscription.objects.filter(
-            user=self.user,
-            is_active=True,
-            end_date__gte=timezone.now().date()
-        ).exists()
+        # Memoized per instance; users_app.entitlements primes it from the request
+        cached = getattr(self, '_subscription_active', None)
+        if cached is None:
+            cached = self._subscription_active = UserSubscription.objects.filter(
+                user=self.user,
+                is_active=True
+            ).exists()
+        return cached
 
     def __str__(self):
         """
@@ -303,6 +402,11 @@ class Session(models.Model):
         if is_new:
             self.program.total_sessions += 1
             self.program.save()
+        else:
+            # Keep the copies on the completion rows in step
+            self.completions.exclude(
+                program_id=self.program_id, session_number_private=self.session_number
+            ).update(program_id=self.program_id, session_number_private=self.session_number)
     def __str__(self):
         return f"Session #{self.session_number} - Program: {self.program.program_goal}"
 
@@ -310,6 +414,10 @@ class Session(models.Model):
 class SessionCompletion(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="session_completions")
     session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name="completions")
+    # program and session_number_private are copies of session.program / session.session_number
+    # so listings can filter and sort without joining Session (kept in sync by Session.save)
+    program = models.ForeignKey(Program, on_delete=models.CASCADE, null=True, blank=True,
+                                related_name="session_completions")
     is_completed = models.BooleanField(default=False)
     completion_date = models.DateField(null=True, blank=True)
     session_date = models.DateField(null=True, blank=True)  # New field for planned date
@@ -318,10 +426,21 @@ class SessionCompletion(models.Model):
 
     class Meta:
         unique_together = ('user', 'session')  # Ensures unique tracking per user-session combination
+        indexes = [
+            # Session listing / progress cursor: a user's (in)complete sessions in program order
+            models.Index(fields=['user', 'program', 'is_completed', 'session_number_private'],
+                         name='sc_user_program_number'),
+            # Reset: the user's most recently completed session
+            models.Index(fields=['user', '-completion_date'], condition=models.Q(is_completed=True),
+                         name='sc_user_completed_date'),
+        ]
 
     def save(self, *args, **kwargs):
         if self.is_completed and not self.completion_date:
             self.completion_date = timezone.now().date()
+        if self.program_id is None or self.session_number_private is None:
+            self.program_id = self.session.program_id
+            self.session_number_private = self.session.session_number
         super(SessionCompletion, self).save(*args, **kwargs)
 
     def __str__(self):
@@ -330,7 +449,7 @@ class SessionCompletion(models.Model):
 
 
 
-class Exercise(models.Model):
+class Exercise(TranslatedFieldsMixin, models.Model):
     EXERCISE_TYPES = (
         ('gain_muscle', 'Gain Muscle'),
         ('lose_weight', 'Lose Weight'),
@@ -356,24 +475,14 @@ class Exercise(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    def save(self, *args, **kwargs):
-        # Always update translation fields, or add a condition comparing new and old values
-        self.name_uz = translate_text(self.name, 'uz')
-        self.name_ru = translate_text(self.name, 'ru')
-        self.name_en = translate_text(self.name, 'en')
-
-        self.description_uz = translate_text(self.description, 'uz')
-        self.description_ru = translate_text(self.description, 'ru')
-        self.description_en = translate_text(self.description, 'en')
-
-        super(Exercise, self).save(*args, **kwargs)
+    translated_fields = ('name', 'description')
 
     def __str__(self):
         return self.name
 
 
 
-class ExerciseBlock(models.Model):
+class ExerciseBlock(TranslatedFieldsMixin, models.Model):
     session = models.OneToOneField(
         Session, on_delete=models.CASCADE, related_name='block', blank=True, null=True
     )
@@ -403,22 +512,7 @@ class ExerciseBlock(models.Model):
 
     exercises = models.ManyToManyField(Exercise, related_name='blocks', blank=True)
 
-    def save(self, *args, **kwargs):
-        # Always update translation fields regardless of previous values
-        self.block_name_uz = translate_text(self.block_name, 'uz')
-        self.block_name_ru = translate_text(self.block_name, 'ru')
-        self.block_name_en = translate_text(self.block_name, 'en')
-
-        if self.description:
-            self.description_uz = translate_text(self.description, 'uz')
-            self.description_ru = translate_text(self.description, 'ru')
-            self.description_en = translate_text(self.description, 'en')
-        else:
-            self.description_uz = ''
-            self.description_ru = ''
-            self.description_en = ''
-
-        super(ExerciseBlock, self).save(*args, **kwargs)
+    translated_fields = ('block_name', 'description')
 
     def __str__(self):
         return self.block_name
@@ -437,6 +531,11 @@ class ExerciseBlockCompletion(models.Model):
 
     class Meta:
         unique_together = ('user', 'block')
+        indexes = [
+            # Statistics / rollup rebuild / reset: completed blocks of a user by date
+            models.Index(fields=['user', 'completion_date'], condition=models.Q(is_completed=True),
+                         name='ebc_user_completed_date'),
+        ]
 
     def save(self, *args, **kwargs):
         if self.is_completed and not self.completion_date:
@@ -444,7 +543,7 @@ class ExerciseBlockCompletion(models.Model):
         super().save(*args, **kwargs)
 
 
-class Meal(models.Model):
+class Meal(TranslatedFieldsMixin, models.Model):
     """
     Meal model now contains all fields formerly in Preparation (except water_usage,
     which is removed because water_content already exists).
@@ -484,27 +583,13 @@ class Meal(models.Model):
     description_en = models.TextField(blank=True, null=True)
     video_url = models.URLField(max_length=500, blank=True, null=True)
 
+    translated_fields = ('food_name', 'description')
+
     def save(self, *args, **kwargs):
-        # Translate food_name
-        self.food_name_uz = translate_text(self.food_name, 'uz')
-        self.food_name_ru = translate_text(self.food_name, 'ru')
-        self.food_name_en = translate_text(self.food_name, 'en')
-
-        # Translate meal_type (display value)
-        display_meal_type = self.get_meal_type_display()
-        self.meal_type_uz = translate_text(display_meal_type, 'uz')
-        self.meal_type_ru = translate_text(display_meal_type, 'ru')
-        self.meal_type_en = translate_text(display_meal_type, 'en')
-
-        # Translate description
-        if self.description:
-            self.description_uz = translate_text(self.description, 'uz')
-            self.description_ru = translate_text(self.description, 'ru')
-            self.description_en = translate_text(self.description, 'en')
-        else:
-            self.description_uz = ''
-            self.description_ru = ''
-            self.description_en = ''
+        # meal_type labels come from the static choice table
+        self.meal_type_uz = choice_label(self.meal_type, 'uz')
+        self.meal_type_ru = choice_label(self.meal_type, 'ru')
+        self.meal_type_en = choice_label(self.meal_type, 'en')
         super(Meal, self).save(*args, **kwargs)
 
     def __str__(self):
@@ -527,6 +612,11 @@ class MealCompletion(models.Model):
 
     class Meta:
         unique_together = ('user', 'session', 'meal')  # Ensures unique tracking per user-session-meal combination
+        indexes = [
+            # Statistics / rollup rebuild: completed meals of a user by date
+            models.Index(fields=['user', 'completion_date'], condition=models.Q(is_completed=True),
+                         name='mc_user_completed_date'),
+        ]
 
     def save(self, *args, **kwargs):
         if self.is_completed and not self.completion_date:
@@ -537,7 +627,7 @@ class MealCompletion(models.Model):
         status = "Completed" if self.is_completed else "Pending"
         return f"{self.user.email_or_phone} - {self.meal.food_name} ({status})"
 
-class MealSteps(models.Model):
+class MealSteps(TranslatedFieldsMixin, models.Model):
     """
     Each Meal can have multiple steps.
     (Replaces the old PreparationSteps model.)
@@ -559,6 +649,8 @@ class MealSteps(models.Model):
     step_number = models.PositiveIntegerField(default=1, verbose_name=_("Step Number"))
     step_time = models.CharField(max_length=10, blank=True, null=True, verbose_name=_("Step Time (minutes)"))
 
+    translated_fields = ('title', 'text')
+
     class Meta:
         verbose_name = _("Meal Step")
         verbose_name_plural = _("Meal Steps")
@@ -569,27 +661,6 @@ class MealSteps(models.Model):
         if not self.pk:
             last_step = MealSteps.objects.filter(meal=self.meal).order_by('step_number').last()
             self.step_number = (last_step.step_number + 1) if last_step else 1
-
-        # Always update the title translations if a title is provided.
-        if self.title:
-            self.title_uz = translate_text(self.title, 'uz')
-            self.title_ru = translate_text(self.title, 'ru')
-            self.title_en = translate_text(self.title, 'en')
-        else:
-            self.title_uz = ''
-            self.title_ru = ''
-            self.title_en = ''
-
-        # Always update the text translations if text is provided.
-        if self.text:
-            self.text_uz = translate_text(self.text, 'uz')
-            self.text_ru = translate_text(self.text, 'ru')
-            self.text_en = translate_text(self.text, 'en')
-        else:
-            self.text_uz = ''
-            self.text_ru = ''
-            self.text_en = ''
-
         super(MealSteps, self).save(*args, **kwargs)
 
     def __str__(self):
@@ -597,7 +668,7 @@ class MealSteps(models.Model):
 
 
 
-class Notification(models.Model):
+class Notification(TranslatedFieldsMixin, models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     message = models.TextField()
     message_uz = models.TextField(blank=True, null=True)
@@ -609,16 +680,7 @@ class Notification(models.Model):
     notification_type = models.CharField(max_length=50, default="general")  # e.g., "reminder", "update"
     scheduled_time = models.TimeField(null=True, blank=True)
 
-    def save(self, *args, **kwargs):
-        if self.message:
-            self.message_uz = translate_text(self.message, 'uz')
-            self.message_ru = translate_text(self.message, 'ru')
-            self.message_en = translate_text(self.message, 'en')
-        else:
-            self.message_uz = ''
-            self.message_ru = ''
-            self.message_en = ''
-        super(Notification, self).save(*args, **kwargs)
+    translated_fields = ('message',)
 
     def __str__(self):
         return f"Notification for {self.user.email_or_phone} - {self.sent_at}"
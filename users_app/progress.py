@@ -0,0 +1,210 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Count, Sum, Max, Exists, OuterRef, Subquery
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from users_app.caching import bump_progress_version
+from users_app.models import (UserProgram, UserProgress, Session, SessionCompletion, MealCompletion,
+                              ExerciseBlockCompletion, Exercise)
+
+
+# ------------------------------
+# Session materialization mode
+# ------------------------------
+# "eager": every session/meal/block completion row is created when the program is
+#          assigned (create_sessions_for_user).
+# "lazy":  rows are created the first time the user touches a session; pending
+#          sessions are derived from the program plus the cursor on UserProgram.
+EAGER = 'eager'
+LAZY = 'lazy'
+
+
+def lazy_materialization_enabled():
+    return getattr(settings, 'SESSION_MATERIALIZATION', EAGER) == LAZY
+
+
+def materialize_session(user, session, session_date=None):
+    """
+    Create the user's completion rows for one session (session, its meals and its
+    block) if they do not exist yet. Safe to call repeatedly and concurrently.
+    """
+    session_date = session_date or timezone.now().date()
+    meal_ids = list(session.meals.values_list('id', flat=True))
+    block = getattr(session, 'block', None)
+
+    with transaction.atomic():
+        SessionCompletion.objects.bulk_create([
+            SessionCompletion(user=user, session=session, program_id=session.program_id, is_completed=False,
+                              session_number_private=session.session_number, session_date=session_date)
+        ], ignore_conflicts=True)
+        MealCompletion.objects.bulk_create([
+            MealCompletion(user=user, session=session, meal_id=meal_id, is_completed=False, meal_date=session_date)
+            for meal_id in meal_ids
+        ], ignore_conflicts=True)
+        if block:
+            ExerciseBlockCompletion.objects.bulk_create([
+                ExerciseBlockCompletion(user=user, block=block, is_completed=False)
+            ], ignore_conflicts=True)
+    bump_progress_version(user.pk)
+
+
+# ------------------------------
+# Per-user progress cursor
+# ------------------------------
+def advance_progress_cursor(user, session, completion_date=None):
+    """ Record that `session` was completed; the cursor only ever moves forward here. """
+    UserProgram.objects.filter(user=user, program_id=session.program_id).update(
+        last_completed_session_number=Greatest(F('last_completed_session_number'), session.session_number),
+        last_completed_date=completion_date or timezone.now().date(),
+    )
+    bump_progress_version(user.pk)
+
+
+def refresh_progress_cursor(user, program):
+    """ Rebuild the cursor from the user's completed sessions (after a reset, or for old rows). """
+    last_completed = SessionCompletion.objects.filter(
+        user=user,
+        program=program,
+        is_completed=True
+    ).order_by('-session_number_private').values('session_number_private', 'completion_date').first()
+
+    number = last_completed['session_number_private'] if last_completed else 0
+    completion_date = last_completed['completion_date'] if last_completed else None
+    UserProgram.objects.filter(user=user, program=program).update(
+        last_completed_session_number=number,
+        last_completed_date=completion_date,
+    )
+    bump_progress_version(user.pk)
+    return number, completion_date
+
+
+def pending_sessions(user, program):
+    """ The program's sessions the user has not completed, in order (a queryset, so it can be paginated). """
+    completed = SessionCompletion.objects.filter(user=user, is_completed=True).values('session_id')
+    return (
+        Session.objects.filter(program=program).exclude(id__in=completed).order_by('session_number')
+    )
+
+
+def next_unlocked_session_number(last_completed_number, last_completed_date, first_pending_number, today=None):
+    """
+    Sessions unlock one per day: the session after the last completed one opens
+    the day after it was completed.
+    """
+    if not last_completed_number or not last_completed_date:
+        return first_pending_number
+    today = today or timezone.now().date()
+    if today < last_completed_date + timedelta(days=1):
+        return last_completed_number
+    return last_completed_number + 1
+
+
+# ------------------------------
+# Daily rollup (UserProgress)
+# ------------------------------
+def apply_progress_delta(user, program_id, day, sessions=0, burned=0, gained=0):
+    """ Add (or with negative values, remove) one day's totals in the user's rollup row. """
+    if day is None or not (sessions or burned or gained):
+        return
+    row, _ = UserProgress.objects.get_or_create(
+        user=user,
+        date=day,
+        defaults={'program_id': program_id, 'week_number': day.isocalendar()[1]}
+    )
+    UserProgress.objects.filter(pk=row.pk).update(
+        completed_sessions=F('completed_sessions') + sessions,
+        total_calories_burned=F('total_calories_burned') + burned,
+        calories_gained=F('calories_gained') + gained,
+    )
+    bump_progress_version(user.pk)
+
+
+def record_block_completion(user, block, completion_date, sign=1):
+    """ Roll a block (un)completion into the rollup; sign is +1 to add it, -1 to take it back. """
+    if not block.exercises.filter(exercise_type=user.goal).exists():
+        return
+    program_id = block.session.program_id if block.session_id else None
+    apply_progress_delta(user, program_id, completion_date, sessions=sign, burned=sign * block.calories_burned)
+
+
+def record_meal_completion(user, meal, session, completion_date, sign=1):
+    """ Roll a meal (un)completion into the rollup; sign is +1 to add it, -1 to take it back. """
+    if meal.goal_type != user.goal:
+        return
+    apply_progress_delta(user, session.program_id, completion_date, gained=sign * meal.calories)
+
+
+def rebuild_user_progress(user_ids=None):
+    """
+    Recompute the rollup from the completion tables, for the given users or for
+    everyone. Returns the number of UserProgress rows written.
+    """
+    goal_exercise = Exercise.objects.filter(blocks=OuterRef('block_id'), exercise_type=OuterRef('user__goal'))
+    blocks = (
+        ExerciseBlockCompletion.objects
+        .filter(is_completed=True, completion_date__isnull=False)
+        .filter(Exists(goal_exercise))
+    )
+    meals = MealCompletion.objects.filter(
+        is_completed=True, completion_date__isnull=False, meal__goal_type=F('user__goal')
+    )
+    existing = UserProgress.objects.all()
+    if user_ids is not None:
+        blocks = blocks.filter(user_id__in=user_ids)
+        meals = meals.filter(user_id__in=user_ids)
+        existing = existing.filter(user_id__in=user_ids)
+
+    totals = {}
+
+    def row_for(user_id, day, program_id):
+        row = totals.get((user_id, day))
+        if row is None:
+            row = totals[(user_id, day)] = UserProgress(
+                user_id=user_id, date=day, week_number=day.isocalendar()[1], program_id=program_id,
+                completed_sessions=0, total_calories_burned=0, calories_gained=0,
+            )
+        return row
+
+    for item in (blocks.order_by().values('user_id', 'completion_date')
+                 .annotate(count=Count('id'), burned=Sum('block__calories_burned'),
+                           program_id=Max('block__session__program_id'))):
+        row = row_for(item['user_id'], item['completion_date'], item['program_id'])
+        row.completed_sessions = item['count']
+        row.total_calories_burned = item['burned'] or 0
+
+    for item in (meals.order_by().values('user_id', 'completion_date')
+                 .annotate(gained=Sum('meal__calories'), program_id=Max('session__program_id'))):
+        row = row_for(item['user_id'], item['completion_date'], item['program_id'])
+        row.calories_gained = item['gained'] or 0
+
+    with transaction.atomic():
+        existing.delete()
+        UserProgress.objects.bulk_create(totals.values(), batch_size=1000)
+    return len(totals)
+
+
+# ------------------------------
+# SessionCompletion.program backfill
+# ------------------------------
+def backfill_session_completion_program(batch_size=5000):
+    """
+    Copy program and session_number from Session onto SessionCompletion rows that
+    lack them (written before the columns existed). Runs after every migrate, so
+    listings filtering on program_id never see such rows; returns the rows updated.
+    """
+    session = Session.objects.filter(pk=OuterRef('session_id'))
+    missing = SessionCompletion.objects.filter(program__isnull=True).order_by('id')
+
+    total = 0
+    while True:
+        ids = list(missing.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        total += SessionCompletion.objects.filter(id__in=ids).update(
+            program_id=Subquery(session.values('program_id')[:1]),
+            session_number_private=Subquery(session.values('session_number')[:1]),
+        )
+    return total
@@ -1,7 +1,12 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_migrate, m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
+from users_app.caching import bump_content_version, bump_progress_version
+from users_app.progress import backfill_session_completion_program
+from users_app.models import (Exercise, ExerciseBlock, Meal, MealSteps, Program, Session, SessionCompletion,
+                              MealCompletion, ExerciseBlockCompletion, UserProgram)
+
 @receiver(post_migrate)
 def create_superuser(sender, **kwargs):
     User = get_user_model()
@@ -22,3 +27,53 @@ def create_superuser(sender, **kwargs):
         print("Superuser created successfully!")
     else:
         print("Superuser already exists.")
+
+
+@receiver(post_migrate)
+def backfill_completion_program(sender, **kwargs):
+    # Part of every deploy (migrate runs on start): rows written before
+    # SessionCompletion.program existed must not drop out of the listings
+    if sender.name != 'users_app':
+        return
+    total = backfill_session_completion_program()
+    if total:
+        print(f"Backfilled program on {total} SessionCompletion rows.")
+
+
+# ------------------------------
+# Catalog changes retire cached responses (users_app.caching)
+# ------------------------------
+CATALOG_MODELS = (Program, Session, ExerciseBlock, Exercise, Meal, MealSteps)
+
+
+def bump_content_version_on_change(sender, **kwargs):
+    bump_content_version()
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(bump_content_version_on_change, sender=model,
+                      dispatch_uid=f"content_version_save_{model.__name__}")
+    post_delete.connect(bump_content_version_on_change, sender=model,
+                        dispatch_uid=f"content_version_delete_{model.__name__}")
+
+for through in (Session.meals.through, ExerciseBlock.exercises.through):
+    m2m_changed.connect(bump_content_version_on_change, sender=through,
+                        dispatch_uid=f"content_version_m2m_{through.__name__}")
+
+
+# ------------------------------
+# Completion changes retire the user's progress ETags
+# ------------------------------
+PROGRESS_MODELS = (SessionCompletion, MealCompletion, ExerciseBlockCompletion, UserProgram)
+
+
+def bump_progress_version_on_change(sender, instance, **kwargs):
+    if instance.user_id:
+        bump_progress_version(instance.user_id)
+
+
+for model in PROGRESS_MODELS:
+    post_save.connect(bump_progress_version_on_change, sender=model,
+                      dispatch_uid=f"progress_version_save_{model.__name__}")
+    post_delete.connect(bump_progress_version_on_change, sender=model,
+                        dispatch_uid=f"progress_version_delete_{model.__name__}")
@@ -0,0 +1,72 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from users_app.entitlements import invalidate_entitlements
+from users_app.models import User, UserSubscription
+
+
+logger = logging.getLogger(__name__)
+
+
+EXPIRY_STATS_KEY = 'subscriptions:expiry'
+
+
+def expired_subscriptions(today=None):
+    """ Subscriptions still flagged active whose end_date has passed (or was never set). """
+    today = today or timezone.now().date()
+    return UserSubscription.objects.filter(is_active=True).filter(Q(end_date__lt=today) | Q(end_date__isnull=True))
+
+
+def expire_subscriptions(today=None, batch_size=None):
+    """
+    Flip expired subscriptions to inactive and take premium away from their users,
+    with one UPDATE per table per batch (save() is not called). Once this has run
+    for the day, is_active alone tells whether a subscription is live.
+
+    Returns {"subscriptions": n, "users": n}; the last run is also kept in the cache.
+    """
+    today = today or timezone.now().date()
+    batch_size = batch_size or getattr(settings, 'SUBSCRIPTION_EXPIRY_BATCH_SIZE', 1000)
+    expired = expired_subscriptions(today)
+
+    subscriptions = users = 0
+    while True:
+        batch = list(expired.order_by('id').values_list('id', 'user_id')[:batch_size])
+        if not batch:
+            break
+        user_ids = {user_id for _, user_id in batch}
+        with transaction.atomic():
+            # Re-check the expiry in the UPDATE so a renewal in between is left alone
+            subscriptions += expired.filter(id__in=[pk for pk, _ in batch]).update(is_active=False)
+            users += (
+                User.objects
+                .filter(id__in=user_ids, is_premium=True)
+                .exclude(subscriptions__is_active=True)
+                .update(is_premium=False)
+            )
+            for user_id in user_ids:
+                invalidate_entitlements(user_id)
+        if len(batch) < batch_size:
+            break
+
+    stats = {"subscriptions": subscriptions, "users": users}
+    logger.info(f"Expired {subscriptions} subscriptions, {users} users lost premium")
+    try:
+        cache.set(EXPIRY_STATS_KEY, {**stats, "date": str(today), "ran_at": timezone.now().isoformat()},
+                  timeout=None)
+    except Exception as e:
+        logger.warning(f"Could not store subscription expiry stats: {e}")
+    return stats
+
+
+def get_expiry_stats():
+    """ The result of the last expire_subscriptions() run, or None. """
+    try:
+        return cache.get(EXPIRY_STATS_KEY)
+    except Exception:
+        return None
@@ -1,6 +1,12 @@
 from celery import shared_task
+from django.apps import apps
 from .models import Notification
 from .notifications import NotificationService
+from .translation import (TRANSLATION_LANGUAGES, FAILED_FINGERPRINT, translate_many, source_fingerprint,
+                          record_avoided_translations)
+from .subscriptions import expire_subscriptions as sweep_expired_subscriptions
+from .caching import bump_content_version
+import logging
 import os
 import django
 
@@ -8,6 +14,8 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'register.settings')
 django.setup()
 
 
+logger = logging.getLogger(__name__)
+
 
 @shared_task
 def send_scheduled_notification(notification_id):
@@ -18,3 +26,62 @@ def send_scheduled_notification(notification_id):
         notification.save()
     except Notification.DoesNotExist:
         print(f"Notification with ID {notification_id} does not exist.")
+
+
+@shared_task
+def translate_model_fields(items):
+    """
+    Fill the `<field>_uz/_ru/_en` columns for a batch of saved objects.
+
+    `items` is a list of [model_label, pk, [source_field, ...]]. Fields whose
+    stored fingerprint still matches the source text are skipped. All remaining
+    texts of the batch go through translate_many(), and each object is written
+    back with a single UPDATE that bypasses save() (and so does not re-enqueue
+    itself).
+    """
+    loaded = []
+    avoided = 0
+    for model_label, pk, fields in items:
+        model = apps.get_model(model_label)
+        values = model.objects.filter(pk=pk).values(*fields, 'translation_fingerprints').first()
+        if values is None:
+            logger.info(f"Skipping translation of deleted {model_label} #{pk}")
+            continue
+        fingerprints = values.pop('translation_fingerprints') or {}
+        todo = {
+            field: text for field, text in values.items()
+            if fingerprints.get(field) != source_fingerprint(text)
+        }
+        avoided += (len(values) - len(todo)) * len(TRANSLATION_LANGUAGES)
+        if todo:
+            loaded.append((model, pk, todo, fingerprints))
+    record_avoided_translations(avoided)
+
+    # One batched upstream call per language for the whole batch
+    texts = [text for _, _, values, _ in loaded for text in values.values() if text]
+    translations = translate_many(texts, TRANSLATION_LANGUAGES, fallback=False)
+
+    written = 0
+    for model, pk, values, fingerprints in loaded:
+        update = {}
+        for field, text in values.items():
+            if text and any(text not in translations[language] for language in TRANSLATION_LANGUAGES):
+                # Keep the old columns and mark the field, so the next save retries it
+                logger.warning(f"Translation of {model._meta.label_lower} #{pk}.{field} failed, will retry")
+                fingerprints[field] = FAILED_FINGERPRINT
+                continue
+            for language in TRANSLATION_LANGUAGES:
+                update[f"{field}_{language}"] = translations[language][text] if text else ''
+            fingerprints[field] = source_fingerprint(text)
+        update['translation_fingerprints'] = fingerprints
+        # Only write if the source text is still what we translated
+        written += model.objects.filter(pk=pk, **values).update(**update)
+    if written:
+        # The UPDATE bypasses the post_save signal, so retire cached responses here
+        bump_content_version()
+
+
+@shared_task
+def expire_subscriptions():
+    """ Nightly (CELERY_BEAT_SCHEDULE): deactivate lapsed subscriptions in bulk. """
+    return sweep_expired_subscriptions()
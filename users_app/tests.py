@@ -1,3 +1,490 @@
-from django.test import TestCase
+import threading
+from unittest import skipUnless
+from unittest.mock import MagicMock, patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from users_app.models import Meal, MealSteps
+from users_app.translation import translate_many, translate_text, translation_batch, translation_cache
+from users_app.translation_providers import (
+    CircuitBreaker, NoopTranslationProvider, ProviderChain, TranslationMemoryProvider,
+    reset_translation_provider,
+)
+
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+GOOGLE_ONLY = ['google']
+
+
+def fake_batch_translate(texts, dest):
+    return [MagicMock(text=f"{text} [{dest}]") for text in texts]
+
+
+@override_settings(CACHES=LOCMEM_CACHE, TRANSLATION_PROVIDERS=GOOGLE_ONLY)
+class TranslationCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        translation_cache.clear_local()
+        reset_translation_provider()
+
+    @patch("users_app.translation_providers.Translator")
+    def test_repeated_text_is_translated_once(self, translator_class):
+        mock_translator = translator_class.return_value
+        mock_translator.translate.return_value = [MagicMock(text="Mushak massasini oshirish")]
+
+        first = translate_text("Gain Muscle", "uz")
+        second = translate_text("Gain Muscle", "uz")
+
+        self.assertEqual(first, "Mushak massasini oshirish")
+        self.assertEqual(second, first)
+        mock_translator.translate.assert_called_once_with(["Gain Muscle"], dest="uz")
+        self.assertGreaterEqual(translation_cache.get_stats()["local_hits"], 1)
+
+    @patch("users_app.translation_providers.Translator")
+    def test_shared_tier_survives_local_eviction(self, translator_class):
+        mock_translator = translator_class.return_value
+        mock_translator.translate.return_value = [MagicMock(text="Похудение")]
+
+        translate_text("Lose Weight", "ru")
+        translation_cache.clear_local()
+        self.assertEqual(translate_text("Lose Weight", "ru"), "Похудение")
+
+        mock_translator.translate.assert_called_once()
+        self.assertGreaterEqual(translation_cache.get_stats()["shared_hits"], 1)
+
+    @patch("users_app.translation_providers.Translator")
+    def test_failed_translation_is_not_cached(self, translator_class):
+        mock_translator = translator_class.return_value
+        mock_translator.translate.side_effect = Exception("network down")
+
+        self.assertEqual(translate_text("Dinner", "uz"), "Dinner")
+        self.assertIsNone(translation_cache.get("Dinner", "uz"))
+
+
+@override_settings(CACHES=LOCMEM_CACHE, TRANSLATION_PROVIDERS=GOOGLE_ONLY)
+class TranslateManyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        translation_cache.clear_local()
+        reset_translation_provider()
+
+    @patch("users_app.translation_providers.Translator")
+    def test_one_upstream_call_per_language_for_misses_only(self, translator_class):
+        mock_translator = translator_class.return_value
+        mock_translator.translate.side_effect = fake_batch_translate
+        translation_cache.set("Boil", "uz", "Qaynatish")
+
+        result = translate_many(["Boil", "Serve", "Boil", "", "Chop"], ["uz", "ru", "en"])
+
+        self.assertEqual(mock_translator.translate.call_count, 3)
+        mock_translator.translate.assert_any_call(["Serve", "Chop"], dest="uz")
+        mock_translator.translate.assert_any_call(["Boil", "Serve", "Chop"], dest="ru")
+        self.assertEqual(result["uz"]["Boil"], "Qaynatish")
+        self.assertEqual(result["ru"]["Chop"], "Chop [ru]")
+
+    @patch("users_app.translation_providers.Translator")
+    def test_concurrent_callers_share_one_request(self, translator_class):
+        mock_translator = translator_class.return_value
+        started, release = threading.Event(), threading.Event()
+
+        def slow_translate(texts, dest):
+            started.set()
+            release.wait(5)
+            return fake_batch_translate(texts, dest)
+
+        mock_translator.translate.side_effect = slow_translate
+        results = []
+        first = threading.Thread(target=lambda: results.append(translate_many(["Dinner"], ["uz"])))
+        first.start()
+        started.wait(5)
+        second = threading.Thread(target=lambda: results.append(translate_many(["Dinner"], ["uz"])))
+        second.start()
+        release.set()
+        first.join(5)
+        second.join(5)
+
+        self.assertEqual(mock_translator.translate.call_count, 1)
+        self.assertEqual([r["uz"]["Dinner"] for r in results], ["Dinner [uz]"] * 2)
+
+    @patch("users_app.translation_providers.Translator")
+    def test_meal_with_steps_costs_one_call_per_language(self, translator_class):
+        mock_translator = translator_class.return_value
+        from users_app.tasks import translate_model_fields
+
+        mock_translator.translate.side_effect = fake_batch_translate
+        with patch("users_app.tasks.translate_model_fields.delay") as mock_delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                with translation_batch():
+                    meal = Meal.objects.create(meal_type='dinner', food_name="Soup", description="Hot soup",
+                                               calories=200, water_content=300, preparation_time=30)
+                    for number in range(10):
+                        MealSteps.objects.create(meal=meal, title=f"Step {number}", text=f"Do thing {number}")
+
+        translate_model_fields(mock_delay.call_args.args[0])
+        self.assertEqual(mock_translator.translate.call_count, 3)
+        self.assertEqual(meal.steps.get(title="Step 3").text_ru, "Do thing 3 [ru]")
+
+
+class ChoiceLabelTableTests(TestCase):
+    def test_every_choice_has_a_label_in_every_language(self):
+        from users_app.choice_labels import CHOICE_LABELS
+        from users_app.models import Exercise, Meal, Program, User
+
+        choice_sets = [User.GOAL_CHOICES, Program.GOAL_CHOICES, Exercise.EXERCISE_TYPES,
+                       Meal.GOAL_TYPES, Meal.MEAL_TYPES]
+        for language, _label in User.LANGUAGE_CHOICES:
+            for choices in choice_sets:
+                for value, display in choices:
+                    self.assertIn(value, CHOICE_LABELS[language])
+                    if language == 'en':
+                        self.assertEqual(CHOICE_LABELS[language][value], display)
+
+    def test_table_is_read_only(self):
+        from users_app.choice_labels import CHOICE_LABELS
+
+        with self.assertRaises(TypeError):
+            CHOICE_LABELS['en']['gain_muscle'] = "changed"
+
+
+@override_settings(CACHES=LOCMEM_CACHE, TRANSLATION_PROVIDERS=GOOGLE_ONLY)
+class DeferredTranslationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        translation_cache.clear_local()
+        reset_translation_provider()
+
+    def create_meal(self, **kwargs):
+        defaults = dict(meal_type='lunch', food_name="Chicken", calories=300,
+                        water_content=100, preparation_time=20)
+        defaults.update(kwargs)
+        return Meal.objects.create(**defaults)
+
+    @patch("users_app.tasks.translate_model_fields.delay")
+    def test_meal_and_steps_share_one_task(self, mock_delay):
+        with self.captureOnCommitCallbacks(execute=True):
+            with translation_batch():
+                meal = self.create_meal(description="Boil it")
+                MealSteps.objects.create(meal=meal, title="Boil", text="Boil water")
+                MealSteps.objects.create(meal=meal, title="Serve")
+
+        mock_delay.assert_called_once()
+        items = mock_delay.call_args.args[0]
+        self.assertEqual(len(items), 3)
+        self.assertEqual(items[0], ['users_app.meal', meal.pk, ['food_name', 'description']])
+        self.assertEqual(items[2][2], ['title'])
+
+    @patch("users_app.tasks.translate_model_fields.delay")
+    def test_unchanged_source_is_not_requeued(self, mock_delay):
+        meal = self.create_meal()
+        meal = Meal.objects.get(pk=meal.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            meal.calories = 350
+            meal.save()
+        mock_delay.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            meal.food_name = "Beef"
+            meal.save()
+        self.assertEqual(mock_delay.call_args.args[0], [['users_app.meal', meal.pk, ['food_name']]])
+
+    @patch("users_app.translation_providers.Translator")
+    def test_task_writes_translations(self, translator_class):
+        mock_translator = translator_class.return_value
+        from users_app.tasks import translate_model_fields
+
+        mock_translator.translate.side_effect = fake_batch_translate
+        with patch("users_app.tasks.translate_model_fields.delay"):
+            meal = self.create_meal()
+
+        translate_model_fields([['users_app.meal', meal.pk, ['food_name', 'description']]])
+        meal.refresh_from_db()
+        self.assertEqual(meal.food_name_uz, "Chicken [uz]")
+        self.assertEqual(meal.food_name_ru, "Chicken [ru]")
+        self.assertEqual(meal.description_en, '')
+        self.assertEqual(meal.meal_type_ru, "Обед")
+
+    @patch("users_app.translation_providers.Translator")
+    def test_fingerprint_skips_unchanged_fields(self, translator_class):
+        mock_translator = translator_class.return_value
+        from users_app.tasks import translate_model_fields
+
+        mock_translator.translate.side_effect = fake_batch_translate
+        with self.captureOnCommitCallbacks():
+            meal = self.create_meal(description="Grill it")
+        translate_model_fields([['users_app.meal', meal.pk, ['food_name', 'description']]])
+        self.assertEqual(mock_translator.translate.call_count, 3)
+
+        # A duplicate task finds matching fingerprints and does nothing
+        translate_model_fields([['users_app.meal', meal.pk, ['food_name', 'description']]])
+        self.assertEqual(mock_translator.translate.call_count, 3)
+
+        meal.refresh_from_db()
+        with patch("users_app.tasks.translate_model_fields.delay") as mock_delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                meal.preparation_time = 45
+                meal.save()
+        mock_delay.assert_not_called()
+        self.assertEqual(meal.food_name_en, "Chicken [en]")
+        self.assertGreaterEqual(cache.get('translation:avoided'), 12)
+
+    @patch("users_app.translation_providers.Translator")
+    def test_outage_is_not_recorded_as_a_translation(self, translator_class):
+        mock_translator = translator_class.return_value
+        from users_app.tasks import translate_model_fields
+
+        mock_translator.translate.side_effect = Exception("network down")
+        with self.captureOnCommitCallbacks():
+            meal = self.create_meal(food_name="Push up")
+        translate_model_fields([['users_app.meal', meal.pk, ['food_name']]])
+        meal.refresh_from_db()
+        self.assertEqual(meal.food_name_uz, '')  # not the English source
+
+        # Provider back: the next save queues the field again and it gets translated
+        mock_translator.translate.side_effect = fake_batch_translate
+        reset_translation_provider()
+        with patch("users_app.tasks.translate_model_fields.delay") as mock_delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                meal.calories = 310
+                meal.save()
+        self.assertEqual(mock_delay.call_args.args[0], [['users_app.meal', meal.pk, ['food_name']]])
+        translate_model_fields(mock_delay.call_args.args[0])
+        meal.refresh_from_db()
+        self.assertEqual(meal.food_name_uz, "Push up [uz]")
+        self.assertEqual(meal.food_name_ru, "Push up [ru]")
+
+
+class FailingProvider(NoopTranslationProvider):
+    name = 'failing'
+
+    def __init__(self):
+        self.calls = 0
+
+    def translate(self, texts, target_language):
+        self.calls += 1
+        raise Exception("timed out")
+
+
+class TranslationProviderTests(TestCase):
+    def test_chain_falls_back_to_next_provider_for_unknown_texts(self):
+        memory = TranslationMemoryProvider(entries={'ru': {"Breakfast": "Завтрак"}})
+        fallback = TranslationMemoryProvider(entries={'ru': {"Dinner": "Ужин"}})
+        fallback.name = 'fallback'
+        chain = ProviderChain([memory, fallback, NoopTranslationProvider()])
+
+        result = chain.translate(["Breakfast", "Dinner", "Snack"], 'ru')
+        self.assertEqual(result, {"Breakfast": "Завтрак", "Dinner": "Ужин"})
+
+    def test_open_breaker_skips_failing_provider(self):
+        failing = FailingProvider()
+        memory = TranslationMemoryProvider(entries={'uz': {"Lunch": "Tushlik"}})
+        chain = ProviderChain([failing, memory], failure_threshold=2, reset_timeout=60)
+
+        for _ in range(3):
+            self.assertEqual(chain.translate(["Lunch"], 'uz'), {"Lunch": "Tushlik"})
+        self.assertEqual(failing.calls, 2)
+        self.assertTrue(chain.breakers['failing'].is_open)
+
+    def test_breaker_lets_a_trial_call_through_after_reset_timeout(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertFalse(breaker.is_open)
+
+    @override_settings(CACHES=LOCMEM_CACHE, TRANSLATION_PROVIDERS=['memory', 'noop'])
+    def test_bundled_memory_translates_view_messages_offline(self):
+        cache.clear()
+        translation_cache.clear_local()
+        self.assertEqual(translate_text("Program deleted successfully", 'ru'), "Программа успешно удалена")
+        self.assertEqual(translate_text("Something new", 'ru'), "Something new")
+
+
+class SessionMaterializationTests(TestCase):
+    def setUp(self):
+        from users_app.models import ExerciseBlock, Program, Session, User
+
+        self.user = User.objects.create_user("+998901234567", password="secret")
+        self.program = Program.objects.create(program_goal='lose_weight')
+        meals = [
+            Meal.objects.create(meal_type=meal_type, food_name=meal_type, calories=100,
+                                water_content=100, preparation_time=10)
+            for meal_type in ('breakfast', 'lunch', 'snack', 'dinner')
+        ]
+        for number in range(1, 11):
+            session = Session.objects.create(program=self.program, session_number=number)
+            session.meals.set(meals)
+            ExerciseBlock.objects.create(session=session, block_name=f"Block {number}")
+
+    def test_creates_rows_in_constant_queries_and_counts_only_new_ones(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from users_app.models import ExerciseBlockCompletion, MealCompletion, SessionCompletion
+        from users_app.views import create_sessions_for_user
+
+        with CaptureQueriesContext(connection) as queries:
+            counts = create_sessions_for_user(self.user, self.program)
+        self.assertEqual(counts, (10, 40, 10))
+        self.assertLessEqual(len(queries), 10)
+
+        session_completion = SessionCompletion.objects.get(user=self.user, session__session_number=3)
+        self.assertEqual(session_completion.session_number_private, 3)
+        self.assertEqual(
+            MealCompletion.objects.filter(user=self.user, session=session_completion.session)
+            .values_list('meal_date', flat=True).distinct().get(),
+            session_completion.session_date,
+        )
+
+        SessionCompletion.objects.filter(user=self.user, session__session_number=10).delete()
+        self.assertEqual(create_sessions_for_user(self.user, self.program), (1, 0, 0))
+        self.assertEqual(ExerciseBlockCompletion.objects.filter(user=self.user).count(), 10)
+
+
+class SubscriptionExpiryTests(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from users_app.models import User, UserSubscription
+
+        self.today = timezone.now().date()
+        self.users = []
+        for index, days_left in enumerate((-3, -1, 0, 10)):
+            user = User.objects.create_user(f"+99890000000{index}", password="secret")
+            UserSubscription.objects.create(user=user, end_date=self.today + timedelta(days=days_left))
+            self.users.append(user)
+        # save() derives is_active; make the lapsed ones look like they were saved before expiring
+        UserSubscription.objects.update(is_active=True)
+        User.objects.filter(id__in=[user.id for user in self.users]).update(is_premium=True)
+
+    def test_sweep_flips_expired_rows_in_batches(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from users_app.models import User, UserSubscription
+        from users_app.subscriptions import expire_subscriptions, get_expiry_stats
+
+        with CaptureQueriesContext(connection) as queries:
+            stats = expire_subscriptions(batch_size=1)
+        # One UPDATE per table per batch, whatever the number of rows
+        updates = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 4)
+        self.assertEqual(stats, {"subscriptions": 2, "users": 2})
+        self.assertEqual(get_expiry_stats()["subscriptions"], 2)
+
+        self.assertEqual(
+            list(UserSubscription.objects.order_by('user_id').values_list('is_active', flat=True)),
+            [False, False, True, True],
+        )
+        self.assertEqual(
+            [User.objects.get(id=user.id).is_premium for user in self.users],
+            [False, False, True, True],
+        )
+        self.assertEqual(expire_subscriptions(), {"subscriptions": 0, "users": 0})
+
+
+@skipUnless(connection.vendor == 'postgresql', "EXPLAIN plans are only checked on PostgreSQL")
+class HotPathIndexTests(TestCase):
+    """ Each hot query must be answered through an index once the tables hold real volume. """
+    USERS = 200
+    SESSIONS = 30
+
+    @classmethod
+    def setUpTestData(cls):
+        from datetime import timedelta
+        from django.utils import timezone
+        from users_app.models import (ExerciseBlock, ExerciseBlockCompletion, MealCompletion, Program,
+                                      Session, SessionCompletion, User, UserSubscription)
+
+        today = timezone.now().date()
+        program = Program.objects.create(program_goal='lose_weight')
+        meal = Meal.objects.create(meal_type='lunch', food_name='lunch', calories=100,
+                                   water_content=100, preparation_time=10)
+        sessions = Session.objects.bulk_create([
+            Session(program=program, session_number=number) for number in range(1, cls.SESSIONS + 1)
+        ])
+        blocks = ExerciseBlock.objects.bulk_create([
+            ExerciseBlock(session=session, block_name=f"Block {session.session_number}") for session in sessions
+        ])
+        users = User.objects.bulk_create([
+            User(email_or_phone=f"+99891{index:07d}", password="!") for index in range(cls.USERS)
+        ])
+        cls.user = users[0]
+
+        session_rows, block_rows, meal_rows, subscription_rows = [], [], [], []
+        for user in users:
+            for session, block in zip(sessions, blocks):
+                done = session.session_number <= cls.SESSIONS // 2
+                day = today - timedelta(days=cls.SESSIONS - session.session_number) if done else None
+                session_rows.append(SessionCompletion(user=user, session=session, program=program, is_completed=done,
+                                                      completion_date=day,
+                                                      session_number_private=session.session_number))
+                block_rows.append(ExerciseBlockCompletion(user=user, block=block, is_completed=done,
+                                                          completion_date=day))
+                meal_rows.append(MealCompletion(user=user, session=session, meal=meal, is_completed=done,
+                                                completion_date=day))
+            # Renewal history: many lapsed rows and one active per user
+            subscription_rows += [
+                UserSubscription(user=user, end_date=today - timedelta(days=30 * months), is_active=False)
+                for months in range(1, 6)
+            ]
+            subscription_rows.append(UserSubscription(user=user, end_date=today + timedelta(days=10), is_active=True))
+
+        SessionCompletion.objects.bulk_create(session_rows, batch_size=2000)
+        ExerciseBlockCompletion.objects.bulk_create(block_rows, batch_size=2000)
+        MealCompletion.objects.bulk_create(meal_rows, batch_size=2000)
+        UserSubscription.objects.bulk_create(subscription_rows, batch_size=2000)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        cls.program, cls.today = program, today
+
+    def assertUsesIndex(self, queryset, index_name):
+        """ The queried table is read through `index_name`, never scanned. """
+        plan = queryset.explain()
+        self.assertNotIn(f"Seq Scan on {queryset.model._meta.db_table}", plan, plan)
+        self.assertIn(index_name, plan, f"expected {index_name}:\n{plan}")
+
+    def test_session_listing_and_cursor(self):
+        from users_app.models import SessionCompletion
+
+        # The listing's single pass over the user's rows (SessionViewSet._list)
+        self.assertUsesIndex(
+            SessionCompletion.objects.filter(user=self.user, program_id=self.program.id)
+            .order_by('session_number_private')
+            .values_list('session_id', 'session_number_private', 'is_completed', 'completion_date'),
+            'sc_user_program_number',
+        )
+        # Progress and the lazy cursor: the completed rows of the program
+        self.assertUsesIndex(
+            SessionCompletion.objects.filter(user=self.user, program_id=self.program.id, is_completed=True),
+            'sc_user_program_number',
+        )
+        self.assertUsesIndex(
+            SessionCompletion.objects.filter(user=self.user, is_completed=True).order_by('-completion_date')[:1],
+            'sc_user_completed_date',
+        )
+
+    def test_completions_by_date(self):
+        from datetime import timedelta
+        from users_app.models import ExerciseBlockCompletion, MealCompletion
+
+        week = [self.today - timedelta(days=6), self.today]
+        self.assertUsesIndex(
+            ExerciseBlockCompletion.objects.filter(user=self.user, is_completed=True, completion_date__range=week),
+            'ebc_user_completed_date',
+        )
+        self.assertUsesIndex(
+            MealCompletion.objects.filter(user=self.user, is_completed=True, completion_date__range=week),
+            'mc_user_completed_date',
+        )
+
+    def test_active_subscription_lookups(self):
+        from users_app.models import UserSubscription
+
+        self.assertUsesIndex(
+            UserSubscription.objects.filter(user=self.user, is_active=True).values('id', 'end_date'),
+            'active_subscription_user_end',
+        )
+        self.assertUsesIndex(
+            UserSubscription.objects.filter(is_active=True, end_date__lt=self.today),
+            'active_subscription_end_date',
+        )
@@ -0,0 +1,257 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from users_app.translation_providers import get_translation_provider
+
+
+logger = logging.getLogger(__name__)
+
+
+TRANSLATION_LANGUAGES = ('uz', 'ru', 'en')
+LOCAL_CACHE_SIZE = getattr(settings, 'TRANSLATION_LOCAL_CACHE_SIZE', 2048)
+SHARED_CACHE_TIMEOUT = getattr(settings, 'TRANSLATION_SHARED_CACHE_TIMEOUT', 60 * 60 * 24 * 30)
+INFLIGHT_WAIT_TIMEOUT = getattr(settings, 'TRANSLATION_INFLIGHT_WAIT_TIMEOUT', 30)
+
+
+AVOIDED_COUNTER_KEY = 'translation:avoided'
+
+# Stored in place of a field's fingerprint when its translation failed: never matches a
+# source text, and makes the next save queue the field again
+FAILED_FINGERPRINT = 'failed'
+
+
+def source_fingerprint(text):
+    """ sha1 of a source text; empty and missing texts share one fingerprint. """
+    return hashlib.sha1((text or '').encode('utf-8')).hexdigest()
+
+
+def translation_cache_key(text, target_language):
+    """ Shared-cache key: (sha1 of the source text, target language). """
+    return f"translation:{target_language}:{source_fingerprint(text)}"
+
+
+class TranslationCache:
+    """
+    Two-tier cache for translated strings.
+
+    Tier 1 is a small in-process LRU, so repeated strings ("Gain Muscle",
+    "Breakfast", ...) never leave the worker. Tier 2 is the Django cache
+    (Redis in production), shared by all workers and surviving restarts.
+    """
+
+    def __init__(self, maxsize=LOCAL_CACHE_SIZE, timeout=SHARED_CACHE_TIMEOUT):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"local_hits": 0, "shared_hits": 0, "misses": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._local[key] = value
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+    def get(self, text, target_language):
+        key = translation_cache_key(text, target_language)
+        with self._lock:
+            if key in self._local:
+                self._local.move_to_end(key)
+                self.stats["local_hits"] += 1
+                return self._local[key]
+
+        try:
+            value = cache.get(key)
+        except Exception as e:
+            logger.warning(f"Translation cache unavailable: {e}")
+            value = None
+
+        if value is None:
+            self._count("misses")
+            return None
+
+        self._count("shared_hits")
+        self._remember(key, value)
+        return value
+
+    def set(self, text, target_language, value):
+        key = translation_cache_key(text, target_language)
+        self._remember(key, value)
+        try:
+            cache.set(key, value, timeout=self.timeout)
+        except Exception as e:
+            logger.warning(f"Translation cache unavailable: {e}")
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, local_size=len(self._local))
+
+
+translation_cache = TranslationCache()
+
+
+def record_avoided_translations(count):
+    """ Count translations skipped because the source fingerprint was unchanged. """
+    if not count:
+        return
+    try:
+        if not cache.add(AVOIDED_COUNTER_KEY, count, timeout=None):
+            cache.incr(AVOIDED_COUNTER_KEY, count)
+    except Exception as e:
+        logger.warning(f"Translation cache unavailable: {e}")
+
+
+def get_translation_stats():
+    stats = translation_cache.get_stats()
+    try:
+        stats["avoided"] = cache.get(AVOIDED_COUNTER_KEY, 0)
+    except Exception:
+        stats["avoided"] = None
+    return stats
+
+
+# ------------------------------
+# Batched translation with request coalescing
+# ------------------------------
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _translate_upstream(texts, target_language):
+    """ One call down the provider chain; returns {text: translation} for the successes. """
+    return get_translation_provider().translate(list(texts), target_language)
+
+
+def translate_many(texts, languages, fallback=True):
+    """
+    Translate every text into every language: {language: {text: translation}}.
+
+    Inputs are deduplicated and looked up in the cache first; the misses go
+    upstream in one batched call per language. If another thread is already
+    translating the same (text, language), we wait for its result instead of
+    asking again. Failed translations fall back to the source text, or with
+    fallback=False are left out of the result.
+    """
+    unique_texts = [text for text in dict.fromkeys(texts) if text]
+    result = {language: {} for language in languages}
+
+    for language in languages:
+        resolved = result[language]
+        owned = []
+        waiting = {}
+        for text in unique_texts:
+            cached = translation_cache.get(text, language)
+            if cached is not None:
+                resolved[text] = cached
+                continue
+            key = (text, language)
+            with _inflight_lock:
+                future = _inflight.get(key)
+                if future is None:
+                    _inflight[key] = Future()
+                    owned.append(text)
+                else:
+                    waiting[text] = future
+
+        if owned:
+            translated = {}
+            try:
+                translated = _translate_upstream(owned, language)
+                for text, value in translated.items():
+                    translation_cache.set(text, language, value)
+            finally:
+                with _inflight_lock:
+                    for text in owned:
+                        _inflight.pop((text, language)).set_result(translated.get(text))
+            for text in owned:
+                if text in translated:
+                    resolved[text] = translated[text]
+                elif fallback:
+                    resolved[text] = text
+
+        for text, future in waiting.items():
+            try:
+                value = future.result(timeout=INFLIGHT_WAIT_TIMEOUT)
+            except Exception:
+                value = None
+            if value is not None:
+                resolved[text] = value
+            elif fallback:
+                resolved[text] = text
+
+    return result
+
+
+def translate_text(text, target_language):
+    if not text:
+        return text
+    return translate_many([text], [target_language])[target_language][text]
+
+
+# ------------------------------
+# Deferred translation of model fields
+# ------------------------------
+_batch = threading.local()
+
+
+def _enqueue_translation(items):
+    from users_app.tasks import translate_model_fields
+    try:
+        translate_model_fields.delay(items)
+    except Exception as e:
+        # Broker unavailable: fall back to translating in-process rather than losing the work
+        logger.warning(f"Could not enqueue translation task, translating inline: {e}")
+        translate_model_fields(items)
+
+
+def schedule_translation(instance, fields):
+    """
+    Queue translation of `fields` on a saved instance. The Celery task is sent
+    after the surrounding transaction commits; inside `translation_batch()` all
+    saves share a single task.
+    """
+    item = [instance._meta.label_lower, instance.pk, list(fields)]
+    items = getattr(_batch, 'items', None)
+    if items is not None:
+        items.append(item)
+        return
+    transaction.on_commit(lambda: _enqueue_translation([item]))
+
+
+@contextmanager
+def translation_batch():
+    """
+    Collect every schedule_translation() call made inside the block
+    (e.g. a Meal and all of its steps) into one translation task.
+    """
+    if getattr(_batch, 'items', None) is not None:
+        # Nested: the outermost batch sends the task
+        yield
+        return
+
+    _batch.items = []
+    try:
+        yield
+        items = _batch.items
+    finally:
+        del _batch.items
+
+    if items:
+        transaction.on_commit(lambda: _enqueue_translation(items))
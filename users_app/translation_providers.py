@@ -0,0 +1,209 @@
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from googletrans import Translator
+
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------
+# Providers
+# ------------------------------
+class TranslationProvider:
+    """
+    A translation backend. translate() returns {text: translation} for the texts
+    it could translate and raises on failure; texts it does not know are simply
+    left out so the next provider in the chain can try them.
+    """
+    name = None
+
+    def translate(self, texts, target_language):
+        raise NotImplementedError
+
+
+class GoogleTranslationProvider(TranslationProvider):
+    name = 'google'
+
+    def __init__(self, timeout=5):
+        self.timeout = timeout
+        self._translator = None
+        self._lock = threading.Lock()
+
+    @property
+    def translator(self):
+        # Created on first use so importing the app never touches the network
+        with self._lock:
+            if self._translator is None:
+                self._translator = Translator(timeout=self.timeout)
+            return self._translator
+
+    def translate(self, texts, target_language):
+        translations = self.translator.translate(list(texts), dest=target_language)
+        return {
+            text: translation.text
+            for text, translation in zip(texts, translations)
+            if translation and translation.text
+        }
+
+
+class TranslationMemoryProvider(TranslationProvider):
+    """
+    Local translation memory: a JSON file of {language: {source text: translation}}.
+    A missing file is treated as an empty memory.
+    """
+    name = 'memory'
+
+    def __init__(self, path=None, entries=None):
+        self.path = path
+        self._entries = entries
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            self._entries = self.load(self.path)
+        return self._entries
+
+    @staticmethod
+    def load(path):
+        if not path:
+            return {}
+        try:
+            with open(path, encoding='utf-8') as fp:
+                return json.load(fp)
+        except FileNotFoundError:
+            logger.info(f"Translation memory {path} not found, starting empty")
+            return {}
+
+    def translate(self, texts, target_language):
+        memory = self.entries.get(target_language, {})
+        return {text: memory[text] for text in texts if text in memory}
+
+
+class NoopTranslationProvider(TranslationProvider):
+    """ Translates nothing, so every text falls back to its source. """
+    name = 'noop'
+
+    def translate(self, texts, target_language):
+        return {}
+
+
+PROVIDER_CLASSES = {
+    provider.name: provider
+    for provider in (GoogleTranslationProvider, TranslationMemoryProvider, NoopTranslationProvider)
+}
+
+
+# ------------------------------
+# Circuit breaker and fallback chain
+# ------------------------------
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and skips the provider
+    for `reset_timeout` seconds; after that one trial call is let through.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Half-open: let this call through, the next failure re-opens
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class ProviderChain:
+    """ Ask each provider in turn for the texts the previous ones could not translate. """
+
+    def __init__(self, providers, failure_threshold=5, reset_timeout=60):
+        self.providers = list(providers)
+        self.breakers = {
+            provider.name: CircuitBreaker(failure_threshold, reset_timeout) for provider in self.providers
+        }
+
+    def translate(self, texts, target_language):
+        result = {}
+        remaining = list(texts)
+        for provider in self.providers:
+            if not remaining:
+                break
+            breaker = self.breakers[provider.name]
+            if not breaker.allow():
+                continue
+            try:
+                translated = provider.translate(remaining, target_language)
+            except Exception as e:
+                breaker.record_failure()
+                logger.warning(f"Translation error ({provider.name}): {e}")
+                continue
+            breaker.record_success()
+            result.update(translated)
+            remaining = [text for text in remaining if text not in translated]
+        return result
+
+
+_chain = None
+_chain_lock = threading.Lock()
+
+
+def build_provider_chain():
+    options = getattr(settings, 'TRANSLATION_PROVIDER_OPTIONS', {})
+    providers = []
+    for name in getattr(settings, 'TRANSLATION_PROVIDERS', ['google']):
+        if name not in PROVIDER_CLASSES:
+            raise ValueError(f"Unknown translation provider: {name}")
+        providers.append(PROVIDER_CLASSES[name](**options.get(name, {})))
+    return ProviderChain(
+        providers,
+        failure_threshold=getattr(settings, 'TRANSLATION_BREAKER_THRESHOLD', 5),
+        reset_timeout=getattr(settings, 'TRANSLATION_BREAKER_RESET_TIMEOUT', 60),
+    )
+
+
+def get_translation_provider():
+    global _chain
+    with _chain_lock:
+        if _chain is None:
+            _chain = build_provider_chain()
+        return _chain
+
+
+def reset_translation_provider():
+    global _chain
+    with _chain_lock:
+        _chain = None
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(setting, **kwargs):
+    if setting.startswith('TRANSLATION_'):
+        reset_translation_provider()
@@ -2,7 +2,7 @@
 from django.contrib.auth import authenticate, login, get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
 from users_app.models import (User, Notification, Program, UserProgram, MealCompletion, Session,
-                              ExerciseBlockCompletion, SessionCompletion)
+                              ExerciseBlockCompletion, SessionCompletion, UserProgress)
 
 from .models import Notification
 from django.core.exceptions import ValidationError as DjangoValidationError
@@ -14,6 +14,7 @@ import logging
 import re
 from datetime import datetime, timedelta
 from django.utils import timezone  # Correct
+from django.db import transaction
 
 from django.core.mail import send_mail
 from django.core.cache import cache
@@ -34,6 +35,9 @@ from register import settings
 from drf_yasg.utils import swagger_auto_schema
 from django.conf import settings
 from .tasks import send_scheduled_notification
+from .progress import lazy_materialization_enabled
+from .entitlements import invalidate_entitlements
+from .caching import bump_progress_version
 
 
 
@@ -108,57 +112,77 @@ def send_verification_email(subject, body, to_email):
 
 
 def create_sessions_for_user(user, program):
-    """Initialize sessions, meals, and blocks for a user."""
+    """
+    Initialize sessions, meals, and blocks for a user.
+
+    The program's sessions, meals and blocks are loaded up front, rows the user
+    already has are skipped in memory, and the rest are inserted with one
+    bulk_create per table inside a single transaction.
+    """
     logger.info(f"🔄 Creating sessions for {user.email_or_phone}...")
     if not program:
         logger.warning(f"⚠ No active program found for user {user.email_or_phone}. Skipping session creation.")
         return 0, 0, 0
+    if lazy_materialization_enabled():
+        logger.info(f"Lazy session materialization: rows for {user.email_or_phone} are created on first use")
+        return 0, 0, 0
 
-    sessions = program.sessions.order_by("session_number")
+    sessions = list(
+        program.sessions.select_related('block').prefetch_related('meals').order_by("session_number")
+    )
     start_date = timezone.now().date()
-    sessions_count = 0
-    meals_count = 0
-    blocks_count = 0
 
+    existing_sessions = set(
+        SessionCompletion.objects.filter(user=user, program=program).values_list('session_id', flat=True)
+    )
+    existing_meals = set(
+        MealCompletion.objects.filter(user=user, session__program=program).values_list('session_id', 'meal_id')
+    )
+    existing_blocks = set(
+        ExerciseBlockCompletion.objects.filter(user=user, block__session__program=program)
+        .values_list('block_id', flat=True)
+    )
+
+    session_completions = []
+    meal_completions = []
+    block_completions = []
     for index, session in enumerate(sessions, start=1):
         session_date = start_date + timedelta(days=index - 1)
         # SessionCompletion
-        session_completion, created = SessionCompletion.objects.get_or_create(
-            user=user,
-            session=session,
-            defaults={
-                'is_completed': False,
-                'session_number_private': session.session_number,
-                'session_date': session_date
-            }
-        )
-        if created:
-            sessions_count += 1
-            logger.debug(f"Created SessionCompletion: user={user.email_or_phone}, session={session.session_number}")
-        # MealCompletion
-        for meal in session.meals.all():
-            meal_completion, created = MealCompletion.objects.get_or_create(
+        if session.id not in existing_sessions:
+            session_completions.append(SessionCompletion(
                 user=user,
-                meal=meal,
                 session=session,
-                defaults={
-                    'is_completed': False,
-                    'meal_date': session_date
-                }
-            )
-            if created:
-                meals_count += 1
-                logger.debug(f"Created MealCompletion: user={user.email_or_phone}, meal={meal.id}")
+                program=program,
+                is_completed=False,
+                session_number_private=session.session_number,
+                session_date=session_date,
+            ))
+        # MealCompletion
+        for meal in session.meals.all():
+            if (session.id, meal.id) not in existing_meals:
+                existing_meals.add((session.id, meal.id))
+                meal_completions.append(MealCompletion(
+                    user=user,
+                    meal=meal,
+                    session=session,
+                    is_completed=False,
+                    meal_date=session_date,
+                ))
         # ExerciseBlockCompletion
-        if hasattr(session, 'block') and session.block:
-            block_completion, created = ExerciseBlockCompletion.objects.get_or_create(
-                user=user,
-                block=session.block,
-                defaults={'is_completed': False}
-            )
-            if created:
-                blocks_count += 1
-                logger.debug(f"Created ExerciseBlockCompletion: user={user.email_or_phone}, block={session.block.id}")
+        block = getattr(session, 'block', None)
+        if block and block.id not in existing_blocks:
+            existing_blocks.add(block.id)
+            block_completions.append(ExerciseBlockCompletion(user=user, block=block, is_completed=False))
+
+    # ignore_conflicts covers rows a concurrent request inserted in the meantime
+    with transaction.atomic():
+        SessionCompletion.objects.bulk_create(session_completions, ignore_conflicts=True)
+        MealCompletion.objects.bulk_create(meal_completions, ignore_conflicts=True)
+        ExerciseBlockCompletion.objects.bulk_create(block_completions, ignore_conflicts=True)
+    bump_progress_version(user.pk)
+
+    sessions_count, meals_count, blocks_count = len(session_completions), len(meal_completions), len(block_completions)
     logger.info(f"✅ Created {sessions_count} sessions, {meals_count} meals, {blocks_count} blocks for {user.email_or_phone}!")
     return sessions_count, meals_count, blocks_count
 
@@ -569,10 +593,15 @@ class UserProfileUpdateView(APIView):
 
             if reinitialize:
                 # Clean up old records
-                UserProgram.objects.filter(user=user).update(is_active=False)
+                UserProgram.objects.filter(user=user).update(
+                    is_active=False, last_completed_session_number=0, last_completed_date=None
+                )
+                invalidate_entitlements(user.id)
                 SessionCompletion.objects.filter(user=user).delete()
                 MealCompletion.objects.filter(user=user).delete()
                 ExerciseBlockCompletion.objects.filter(user=user).delete()
+                UserProgress.objects.filter(user=user).delete()
+                bump_progress_version(user.id)
 
                 # Initialize new program
                 if not matching_program: